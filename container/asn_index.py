@@ -0,0 +1,143 @@
+"""Offline IP → ASN/org lookup over a compact, memory-mapped prefix table.
+
+The source is an iptoasn-style TSV (``range_start  range_end  AS_number
+country  AS_description``, optionally gzipped), which ``build`` compiles into a
+flat binary file of sorted, fixed-width range records:
+
+    header   b"XRAYASN1", v4_count, v6_count, org_count, 0   (u32 big-endian)
+    v4       v4_count x (start[4], end[4], asn u32, org u32)
+    v6       v6_count x (start[16], end[16], asn u32, org u32)
+    orgs     (org_count + 1) x u32 offsets, then the UTF-8 org names
+
+Addresses are stored big-endian, so byte-string comparison is numeric
+comparison and a lookup is a binary search over the mmap with no parsing.
+
+Usage: python asn_index.py build ip2asn-combined.tsv.gz asn.idx
+"""
+
+import gzip
+import ipaddress
+import mmap
+import struct
+import sys
+from typing import Iterable
+
+MAGIC = b"XRAYASN1"
+HEADER = struct.Struct(">8sIIII")
+V4_WIDTH = 4 + 4 + 8
+V6_WIDTH = 16 + 16 + 8
+REF = struct.Struct(">II")  # (asn, org index) trailing every record
+
+
+def _read_lines(path: str) -> Iterable[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+def build(lines: Iterable[str]) -> bytes:
+    """Compile iptoasn-style TSV lines into the binary index format."""
+    v4: list[tuple[bytes, bytes, int, int]] = []
+    v6: list[tuple[bytes, bytes, int, int]] = []
+    orgs: dict[str, int] = {}
+
+    for line in lines:
+        parts = line.rstrip("\n").split("\t")
+        if len(parts) < 5:
+            continue
+        try:
+            start = ipaddress.ip_address(parts[0])
+            end = ipaddress.ip_address(parts[1])
+            asn = int(parts[2])
+        except ValueError:
+            continue
+        if asn == 0 or start.version != end.version:
+            continue  # "Not routed" or malformed
+        org = orgs.setdefault(parts[4].strip(), len(orgs))
+        table = v4 if start.version == 4 else v6
+        table.append((start.packed, end.packed, asn, org))
+
+    v4.sort()
+    v6.sort()
+
+    out = bytearray(HEADER.pack(MAGIC, len(v4), len(v6), len(orgs), 0))
+    for start, end, asn, org in v4 + v6:
+        out += start + end + REF.pack(asn, org)
+
+    names = [name.encode("utf-8") for name in orgs]  # dict keeps index order
+    offset = 0
+    for name in names:
+        out += struct.pack(">I", offset)
+        offset += len(name)
+    out += struct.pack(">I", offset)
+    for name in names:
+        out += name
+    return bytes(out)
+
+
+class AsnIndex:
+    """Binary-search lookups over a buffer produced by ``build``."""
+
+    def __init__(self, buf: bytes | mmap.mmap) -> None:
+        magic, self.v4_count, self.v6_count, self.org_count, _ = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("not an ASN index file")
+        self._buf = buf
+        self._v4_base = HEADER.size
+        self._v6_base = self._v4_base + self.v4_count * V4_WIDTH
+        self._org_offsets = self._v6_base + self.v6_count * V6_WIDTH
+        self._org_blob = self._org_offsets + (self.org_count + 1) * 4
+
+    @classmethod
+    def open(cls, path: str) -> "AsnIndex":
+        """Memory-map a compiled index, or build one in memory from a TSV dump."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) == MAGIC:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return cls(build(_read_lines(path)))
+
+    def lookup(self, ip: str) -> tuple[str, str] | None:
+        """Return ("AS<number>", org) for ``ip`` (IPv4 or IPv6), or None."""
+        try:
+            key = ipaddress.ip_address(ip).packed
+        except ValueError:
+            return None
+
+        if len(key) == 4:
+            base, count, width = self._v4_base, self.v4_count, V4_WIDTH
+        else:
+            base, count, width = self._v6_base, self.v6_count, V6_WIDTH
+        size = len(key)
+        buf = self._buf
+
+        # Rightmost record whose start <= key
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = base + mid * width
+            if buf[pos:pos + size] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+
+        pos = base + (lo - 1) * width
+        if buf[pos + size:pos + 2 * size] < key:
+            return None  # falls in a gap after that range
+        asn, org = REF.unpack_from(buf, pos + 2 * size)
+        return (f"AS{asn}", self._org_name(org))
+
+    def _org_name(self, index: int) -> str:
+        start, end = struct.unpack_from(">II", self._buf, self._org_offsets + index * 4)
+        return bytes(self._buf[self._org_blob + start:self._org_blob + end]).decode("utf-8")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        sys.exit("usage: python asn_index.py build <ip2asn.tsv[.gz]> <out.idx>")
+    data = build(_read_lines(sys.argv[2]))
+    with open(sys.argv[3], "wb") as out_file:
+        out_file.write(data)
+    index = AsnIndex(data)
+    print(f"{index.v4_count} IPv4 and {index.v6_count} IPv6 ranges, {index.org_count} orgs")
@@ -0,0 +1,131 @@
+"""Benchmark subdomain classification at 10k and 100k subdomains.
+
+Compares the Aho-Corasick ``_classify_one`` against the original per-keyword,
+per-label substring loop, and the reversed-label ``_detect_groups`` against the
+original per-host regex stemming (both kept here as reference
+implementations), checking that the fast paths find the same categories and
+the same numeric-stem groups. ``_detect_groups`` also builds shared-parent
+groups, which the regex does not, so its column includes that work.
+
+Usage (from container/): python -m benchmarks.bench_classify [sizes...]
+"""
+
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+
+from parsers import subdomain_parser
+
+BASE_DOMAIN = "example.com"
+FILLER = [
+    "www", "app", "shop", "blog", "node", "eu", "us", "prod", "int", "beta",
+    "svc", "web", "m", "docs", "help", "status", "jobs", "k8s", "edge01",
+]
+
+
+def classify_naive(subdomain: str, base_domain: str) -> tuple[str, str, str]:
+    """The pre-automaton implementation: categories x keywords x labels."""
+    prefix = subdomain
+    if subdomain.endswith("." + base_domain):
+        prefix = subdomain[: -(len(base_domain) + 1)]
+
+    labels = prefix.lower().replace("-", ".").replace("_", ".").split(".")
+
+    for cat_name, cf_opp, interest, keywords in subdomain_parser.CATEGORIES:
+        for kw in keywords:
+            for label in labels:
+                if kw == label or kw in label:
+                    return cat_name, cf_opp, interest
+    return subdomain_parser.DEFAULT_CATEGORY
+
+
+def detect_groups_regex(classified: list[dict], base_domain: str, min_group: int = 3) -> list[dict]:
+    """The original implementation: one regex substitution per host per category."""
+    groups = []
+    by_category: dict[str, list[dict]] = defaultdict(list)
+    for item in classified:
+        by_category[item["category"]].append(item)
+
+    for category, items in by_category.items():
+        stems: dict[str, list[dict]] = defaultdict(list)
+        for item in items:
+            sub = item["subdomain"]
+            prefix = sub
+            if sub.endswith("." + base_domain):
+                prefix = sub[: -(len(base_domain) + 1)]
+            stem = re.sub(r"[\d]+", "*", prefix)
+            if stem != prefix:
+                stems[stem].append(item)
+
+        for stem, members in stems.items():
+            if len(members) >= min_group:
+                groups.append({
+                    "prefix": stem + "." + base_domain,
+                    "count": len(members),
+                    "category": category,
+                    "members": [m["subdomain"] for m in members],
+                })
+    return groups
+
+
+def _group_key(group: dict) -> tuple:
+    return group["prefix"], group["category"], tuple(group["members"])
+
+
+def make_subdomains(count: int, seed: int = 1) -> list[str]:
+    """Deterministic mix of plain, numbered and keyword-bearing hostnames."""
+    rng = random.Random(seed)
+    keywords = [kw for *_, kws in subdomain_parser.CATEGORIES for kw in kws]
+    out = []
+    for _ in range(count):
+        labels = []
+        for _ in range(rng.randint(1, 3)):
+            word = rng.choice(keywords if rng.random() < 0.3 else FILLER)
+            if rng.random() < 0.3:
+                word += rng.choice(["-", ""]) + str(rng.randint(1, 99))
+            labels.append(word)
+        out.append(".".join(labels) + "." + BASE_DOMAIN)
+    return out
+
+
+def _time(func, subdomains: list[str]) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [func(s, BASE_DOMAIN) for s in subdomains]
+    return time.perf_counter() - start, results
+
+
+def _time_groups(func, classified: list[dict]) -> tuple[float, list]:
+    start = time.perf_counter()
+    groups = func(classified, BASE_DOMAIN)
+    return time.perf_counter() - start, groups
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'subdomains':>10}  {'naive ms':>9}  {'automaton ms':>12}  {'speedup':>7}"
+          f"  {'regex groups ms':>15}  {'label groups ms':>15}  {'groups':>6}")
+    for size in sizes:
+        subdomains = make_subdomains(size)
+        naive_s, naive = _time(classify_naive, subdomains)
+        fast_s, fast = _time(subdomain_parser._classify_one, subdomains)
+        mismatches = sum(1 for a, b in zip(naive, fast) if a != b)
+        if mismatches:
+            sys.exit(f"{mismatches} classification mismatches at {size} subdomains")
+
+        classified = [
+            {"subdomain": sub, "category": cat}
+            for sub, (cat, _, _) in zip(subdomains, fast)
+        ]
+        regex_s, regex_groups = _time_groups(detect_groups_regex, classified)
+        label_s, label_groups = _time_groups(subdomain_parser._detect_groups, classified)
+        numeric = [g for g in label_groups if g["kind"] == "numeric"]
+        if sorted(map(_group_key, numeric)) != sorted(map(_group_key, regex_groups)):
+            sys.exit(f"numeric group mismatch at {size} subdomains")
+
+        print(f"{size:>10}  {naive_s * 1000:>9.1f}  {fast_s * 1000:>12.1f}  {naive_s / fast_s:>6.1f}x"
+              f"  {regex_s * 1000:>15.1f}  {label_s * 1000:>15.1f}  {len(label_groups):>6}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10_000, 100_000])
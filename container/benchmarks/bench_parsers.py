@@ -0,0 +1,286 @@
+"""Microbenchmarks for every parser's ``parse_output`` over recorded tool output.
+
+Each case feeds one fixture from benchmarks/fixtures (or a larger variant
+built from it deterministically) to a parser and reports time per call,
+peak traced memory during a call, and the memory blocks the result keeps
+alive. Results can be saved as JSON and compared against a saved run or
+against another commit, whose parsers are extracted with ``git archive`` and
+benchmarked in a subprocess on the same fixtures.
+
+Usage (from container/):
+    python -m benchmarks.bench_parsers                  # run and print
+    python -m benchmarks.bench_parsers -k whois -k tls  # only matching cases
+    python -m benchmarks.bench_parsers --json out.json  # save results
+    python -m benchmarks.bench_parsers --compare out.json
+    python -m benchmarks.bench_parsers --against HEAD~3
+"""
+
+import argparse
+import gc
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+CONTAINER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIN_RUN_TIME = 0.2  # seconds per timing repeat
+REPEATS = 5
+REGRESSION = 1.10  # ratio flagged in comparisons
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# ---------------------------------------------------------------------------
+# Inputs: recorded fixtures and larger variants derived from them
+# ---------------------------------------------------------------------------
+
+def _subfinder(count: int) -> str:
+    """``count`` subfinder lines: the recording, then numbered siblings of its hosts."""
+    recorded = [json.loads(line) for line in _fixture("subfinder.jsonl").splitlines()]
+    lines = [json.dumps(r) for r in recorded[:count]]
+    i = 0
+    while len(lines) < count:
+        record = dict(recorded[i % len(recorded)])
+        label, _, parent = record["host"].partition(".")
+        record["host"] = f"{label}-{i // len(recorded)}.{parent}"
+        lines.append(json.dumps(record))
+        i += 1
+    return "\n".join(lines) + "\n"
+
+
+def _sslyze(full: bool) -> str:
+    """The recorded scan, or only the sections the in-process scan runs."""
+    if full:
+        return _fixture("sslyze.json")
+    data = json.loads(_fixture("sslyze.json"))
+    keep = {"certificate_info", "tls_1_0_cipher_suites", "tls_1_1_cipher_suites",
+            "tls_1_2_cipher_suites", "tls_1_3_cipher_suites"}
+    for server in data["server_scan_results"]:
+        server["scan_result"] = {k: v for k, v in server["scan_result"].items() if k in keep}
+    return json.dumps(data)
+
+
+def _whois(full: bool) -> str:
+    """Registry record only, or registry plus registrar record as the CLI prints it."""
+    text = _fixture("whois_com.txt")
+    if full:
+        return text
+    return text[: text.index("Domain Name: example.com")]
+
+
+def _httpx(extra_headers: int) -> str:
+    """The recorded httpx line with ``extra_headers`` more response headers."""
+    data = json.loads(_fixture("httpx.jsonl"))
+    head = data["response_header"].rstrip("\r\n")
+    extra = "".join(
+        f"\r\nX-Edge-Trace-{i}: hop={i};pop=fra{i % 9};cache=miss;ts=1760605965{i:04d}"
+        for i in range(extra_headers)
+    )
+    data["response_header"] = head + extra + "\r\n\r\n"
+    return json.dumps(data) + "\n"
+
+
+# (case name, parser module, input builder)
+CASES: list[tuple[str, str, Callable[[], str]]] = [
+    ("subdomains/60", "subdomain_parser", lambda: _subfinder(60)),
+    ("subdomains/5k", "subdomain_parser", lambda: _subfinder(5_000)),
+    ("subdomains/50k", "subdomain_parser", lambda: _subfinder(50_000)),
+    ("tls/min", "sslyze_parser", lambda: _sslyze(False)),
+    ("tls/full", "sslyze_parser", lambda: _sslyze(True)),
+    ("whois/registry", "whois_parser", lambda: _whois(False)),
+    ("whois/full", "whois_parser", lambda: _whois(True)),
+    ("headers/recorded", "headers_parser", lambda: _httpx(0)),
+    ("headers/500-extra", "headers_parser", lambda: _httpx(500)),
+    ("dns/recorded", "dns_parser", lambda: _fixture("dnsx.jsonl")),
+    ("waf/recorded", "wafw00f_parser", lambda: _fixture("wafw00f.json")),
+    ("technologies/recorded", "webtech_parser", lambda: _fixture("webtech.json")),
+]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def _time_per_call(func: Callable[[], object]) -> float:
+    """Best-of-REPEATS seconds per call, each repeat running at least MIN_RUN_TIME."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_RUN_TIME:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(MIN_RUN_TIME / elapsed))
+
+    best = elapsed / number
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _memory(func: Callable[[], object]) -> tuple[int, int]:
+    """(peak bytes traced during one call, blocks still held by its result)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        gc.collect()
+        retained = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def run(patterns: list[str]) -> dict:
+    results: dict[str, dict] = {}
+    for name, module_name, build in CASES:
+        if patterns and not any(p in name for p in patterns):
+            continue
+        try:
+            module = importlib.import_module(f"parsers.{module_name}")
+        except Exception as e:  # parser or one of its imports missing in this tree
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        stdout = build()
+        call = lambda: module.parse_output(stdout, "")  # noqa: E731
+        call()  # warm caches and lazy compiles outside the measurements
+        peak, retained = _memory(call)
+        results[name] = {
+            "input_bytes": len(stdout.encode()),
+            "us_per_call": _time_per_call(call) * 1e6,
+            "peak_kib": peak / 1024,
+            "retained_blocks": retained,
+        }
+    return results
+
+
+def _commit(root: str) -> str:
+    try:
+        return subprocess.run(
+            ["git", "-C", root, "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _report(results: dict, label: str) -> dict:
+    return {
+        "label": label,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Output and comparison
+# ---------------------------------------------------------------------------
+
+def print_table(report: dict) -> None:
+    print(f"# {report['label']} (Python {report['python']})")
+    print(f"{'case':<24} {'input KiB':>9} {'us/call':>11} {'peak KiB':>9} {'blocks':>8}")
+    for name, r in report["cases"].items():
+        if "skipped" in r:
+            print(f"{name:<24} skipped: {r['skipped']}")
+            continue
+        print(f"{name:<24} {r['input_bytes'] / 1024:>9.1f} {r['us_per_call']:>11.1f}"
+              f" {r['peak_kib']:>9.1f} {r['retained_blocks']:>8}")
+
+
+def print_comparison(base: dict, head: dict) -> bool:
+    """Print head vs base per case; True if any case got REGRESSION times slower."""
+    print(f"# {head['label']} vs {base['label']}")
+    print(f"{'case':<24} {'base us':>10} {'head us':>10} {'ratio':>6} {'peak KiB':>17}")
+    regressed = False
+    for name, h in head["cases"].items():
+        b = base["cases"].get(name)
+        if b is None or "skipped" in b or "skipped" in h:
+            print(f"{name:<24} (not in both runs)")
+            continue
+        ratio = h["us_per_call"] / b["us_per_call"]
+        flag = ""
+        if ratio >= REGRESSION:
+            flag, regressed = "  slower", True
+        elif ratio <= 1 / REGRESSION:
+            flag = "  faster"
+        print(f"{name:<24} {b['us_per_call']:>10.1f} {h['us_per_call']:>10.1f} {ratio:>6.2f}"
+              f" {b['peak_kib']:>8.1f}->{h['peak_kib']:<8.1f}{flag}")
+    return regressed
+
+
+def run_at_ref(ref: str, patterns: list[str]) -> dict:
+    """Benchmark the parsers as of git ``ref`` on this tree's fixtures."""
+    repo = os.path.dirname(CONTAINER)
+    archive = subprocess.run(
+        ["git", "-C", repo, "archive", "--format=tar", ref, "container"],
+        capture_output=True, check=True,
+    ).stdout
+    with tempfile.TemporaryDirectory() as tmp:
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(tmp)
+        out = os.path.join(tmp, "result.json")
+        cmd = [sys.executable, "-m", "benchmarks.bench_parsers",
+               "--root", os.path.join(tmp, "container"), "--label", ref, "--json", out]
+        for p in patterns:
+            cmd += ["-k", p]
+        subprocess.run(cmd, cwd=CONTAINER, check=True, stdout=subprocess.DEVNULL)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="patterns", action="append", default=[],
+                        help="only run cases whose name contains this (repeatable)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare against results saved with --json")
+    parser.add_argument("--against", help="compare against the parsers at this git ref")
+    parser.add_argument("--root", help=argparse.SUPPRESS)  # import parsers from here
+    parser.add_argument("--label", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.root:
+        sys.path.insert(0, args.root)
+    report = _report(run(args.patterns), args.label or _commit(CONTAINER) or "working tree")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+    elif args.against:
+        base = run_at_ref(args.against, args.patterns)
+
+    if base is None:
+        print_table(report)
+        return 0
+    return 1 if print_comparison(base, report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
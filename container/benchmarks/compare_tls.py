@@ -0,0 +1,102 @@
+"""Side-by-side accuracy and latency of the fast and full TLS engines.
+
+For each target the fast engine (tls_client handshakes) and the full engine
+(sslyze, in-process) scan the same host, one after the other, and the
+results are compared: protocol lists and certificates should be identical,
+the fast engine's cipher suites should all be in the full list, and a weak
+suite (see WEAK_MARKERS) in the full list should also be caught by fast.
+
+Usage (from container/):
+    python -m benchmarks.compare_tls example.com shop.example.com:8443
+    python -m benchmarks.compare_tls -f targets.txt --json out.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any
+
+from parsers import sslyze_parser, tls_fast_parser
+
+# Substrings of IANA suite names the fast engine's weak-class probes cover
+# (tls_client.WEAK_CIPHER_PROBES), plus CBC with SHA-1 by suffix
+WEAK_MARKERS = ("_RC4_", "_3DES_", "_NULL_", "_anon_", "TLS_RSA_WITH_")
+
+
+def _weak(suites: list[str]) -> set[str]:
+    return {s for s in suites if s.endswith("_CBC_SHA") or any(m in s for m in WEAK_MARKERS)}
+
+
+async def compare(target: str) -> dict[str, Any]:
+    if "://" not in target:
+        target = f"https://{target}"
+    started = time.perf_counter()
+    fast = await tls_fast_parser.run_async(target)
+    fast_s = time.perf_counter() - started
+    started = time.perf_counter()
+    full = await asyncio.to_thread(sslyze_parser.run_in_process, target)
+    full_s = time.perf_counter() - started
+
+    fast_suites, full_suites = set(fast["cipher_suites"]), set(full["cipher_suites"])
+    return {
+        "target": sslyze_parser.input_key(target),
+        "fast_ms": round(fast_s * 1000, 1),
+        "full_ms": round(full_s * 1000, 1),
+        "protocols_match": fast["protocols"] == full["protocols"],
+        "certificate_match": fast["certificate"] == full["certificate"],
+        "suites_subset": fast_suites <= full_suites,
+        "weak_found": bool(_weak(full["cipher_suites"])) == bool(_weak(fast["cipher_suites"])),
+        "suites": [len(fast_suites), len(full_suites)],
+        "fast": fast,
+        "full": full,
+    }
+
+
+def _print(rows: list[dict[str, Any]]) -> None:
+    checks = ("protocols_match", "certificate_match", "suites_subset", "weak_found")
+    print(f"{'target':<36} {'fast ms':>9} {'full ms':>9} {'speedup':>8}  suites  " + "  ".join(checks))
+    for row in rows:
+        speedup = row["full_ms"] / row["fast_ms"] if row["fast_ms"] else 0.0
+        flags = "  ".join(f"{'ok' if row[c] else 'DIFF':<{len(c)}}" for c in checks)
+        suites = "{}/{}".format(*row["suites"])
+        print(f"{row['target']:<36} {row['fast_ms']:>9.1f} {row['full_ms']:>9.1f} {speedup:>7.1f}x  {suites:>6}  {flags}")
+        for check, key in (("protocols_match", "protocols"), ("certificate_match", "certificate")):
+            if not row[check]:
+                print(f"    {key}: fast={row['fast'][key]} full={row['full'][key]}")
+        if not row["suites_subset"]:
+            extra = sorted(set(row["fast"]["cipher_suites"]) - set(row["full"]["cipher_suites"]))
+            print(f"    suites only in fast: {extra}")
+    if len(rows) > 1:
+        fast = statistics.median(r["fast_ms"] for r in rows)
+        full = statistics.median(r["full_ms"] for r in rows)
+        agree = sum(all(r[c] for c in checks) for r in rows)
+        print(f"median: fast {fast:.1f} ms, full {full:.1f} ms; {agree}/{len(rows)} targets fully agree")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help="host or host:port")
+    parser.add_argument("-f", "--file", help="file with one target per line")
+    parser.add_argument("--json", help="write the full comparison to this file")
+    args = parser.parse_args()
+
+    targets = list(args.targets)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            targets += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not targets:
+        parser.error("no targets")
+
+    rows = [asyncio.run(compare(t)) for t in targets]
+    _print(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    sys.exit(0 if all(r["protocols_match"] and r["suites_subset"] for r in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
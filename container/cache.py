@@ -0,0 +1,95 @@
+"""Per-tool result cache — bounded in-memory LRU with an optional SQLite tier.
+
+Entries are keyed by (tool_name, input_key) and expire after the tool's
+CACHE_TTL. Values are stored as JSON text so every hit hands out a fresh copy
+and the same encoding serves both tiers. The SQLite tier (enabled by pointing
+SCAN_CACHE_DB at a file) survives container sleep/wake.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any
+
+CACHE_ENABLED = os.environ.get("SCAN_CACHE", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.environ.get("SCAN_CACHE_MAX_ENTRIES", "2048"))
+CACHE_DB_PATH = os.environ.get("SCAN_CACHE_DB", "")  # empty = memory only
+
+PURGE_EVERY = 256  # disk writes between sweeps of expired rows
+
+
+class ToolCache:
+    """LRU of (tool, key) -> (stored_at, expires_at, json_text)."""
+
+    def __init__(self, max_entries: int, db_path: str = "") -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], tuple[float, float, str]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                " tool TEXT NOT NULL, key TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, expires_at REAL NOT NULL,"
+                " value TEXT NOT NULL, PRIMARY KEY (tool, key))"
+            )
+
+    def get(self, tool: str, key: str) -> tuple[Any, float] | None:
+        """Return (value, age_seconds) for a live entry, else None."""
+        now = time.time()
+        entry = self._entries.get((tool, key))
+
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT stored_at, expires_at, value FROM tool_cache WHERE tool = ? AND key = ?",
+                (tool, key),
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1], row[2])
+                self._remember((tool, key), entry)
+
+        if entry is None:
+            return None
+
+        stored_at, expires_at, text = entry
+        if expires_at <= now:
+            self._entries.pop((tool, key), None)
+            return None
+
+        self._entries.move_to_end((tool, key))
+        return json.loads(text), now - stored_at
+
+    def put(self, tool: str, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        now = time.time()
+        entry = (now, now + ttl, json.dumps(value, default=str))
+        self._remember((tool, key), entry)
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_cache (tool, key, stored_at, expires_at, value)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (tool, key, *entry),
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (now,))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM tool_cache")
+
+    def _remember(self, cache_key: tuple[str, str], entry: tuple[float, float, str]) -> None:
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+tool_cache = ToolCache(CACHE_MAX_ENTRIES, CACHE_DB_PATH)
@@ -0,0 +1,212 @@
+"""Compact response encoding: columnar subdomains, fast JSON, negotiated compression.
+
+The subdomains section of a big apex repeats every hostname three times
+(``subdomains``, ``sources``, ``classified``, plus group ``members``) and the
+same few category/source strings on every row. ``encode_report`` rewrites
+that section into one host table plus integer columns into small string
+dictionaries; ``decode_report`` restores the regular shape exactly.
+
+An encoded section looks like::
+
+    {"encoding": "columnar-v1",
+     "hosts": [...], "host_count": N,
+     "dicts": {"category": [...], "interest": [...], "cf_opportunity": [...], "source": [...]},
+     "sources": {"host": [i, ...], "source": [j, ...]},
+     "classified": {"host": [...], "category": [...], "interest": [...],
+                    "cf_opportunity": [...], "source": [...]},
+     "groups": [{..., "members": [i, ...]}], ...other keys unchanged}
+
+``hosts`` is the ``subdomains`` list (its first ``host_count`` entries) and
+every column indexes into it or into the matching ``dicts`` entry.
+
+``dumps`` uses orjson when it is installed and ``compress`` picks zstd
+(when zstandard is installed) or gzip from an Accept-Encoding header.
+
+Decode a saved response with ``python compact.py < response > report.json``.
+"""
+
+import gzip
+import json
+import sys
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is ~5x slower on big reports
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+SECTION_ENCODING = "columnar-v1"
+CLASSIFIED_COLUMNS = ("category", "interest", "cf_opportunity", "source")
+MIN_COMPRESS_BYTES = 1024  # smaller bodies are sent as-is
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard is not None else None
+
+
+# ---------------------------------------------------------------------------
+# Subdomain section: columnar encode / decode
+# ---------------------------------------------------------------------------
+
+class _Dictionary:
+    """Assigns each distinct string a small integer, in first-seen order."""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def encode_subdomains(section: dict[str, Any]) -> dict[str, Any]:
+    """Columnar form of a subdomains section (see module docstring)."""
+    if section.get("encoding") == SECTION_ENCODING:
+        return section
+    hosts: list[str] = list(section.get("subdomains", []))
+    host_index = {host: i for i, host in enumerate(hosts)}
+
+    def host_code(host: str) -> int:
+        index = host_index.get(host)
+        if index is None:  # not in the host list (never produced by the parser)
+            index = host_index[host] = len(hosts)
+            hosts.append(host)
+        return index
+
+    dicts = {column: _Dictionary() for column in CLASSIFIED_COLUMNS}
+    encoded: dict[str, Any] = {"encoding": SECTION_ENCODING}
+    for key, value in section.items():
+        if key == "subdomains":
+            continue
+        if key == "sources":
+            source = dicts["source"]
+            encoded["sources"] = {
+                "host": [host_code(host) for host in value],
+                "source": [source.code(name) for name in value.values()],
+            }
+        elif key == "classified":
+            columns: dict[str, list[int]] = {"host": []}
+            columns.update((column, []) for column in CLASSIFIED_COLUMNS)
+            for row in value:
+                columns["host"].append(host_code(row["subdomain"]))
+                for column in CLASSIFIED_COLUMNS:
+                    columns[column].append(dicts[column].code(row[column]))
+            encoded["classified"] = columns
+        elif key == "groups":
+            encoded["groups"] = [
+                {**group, "members": [host_code(m) for m in group["members"]]} for group in value
+            ]
+        else:
+            encoded[key] = value
+    encoded["hosts"] = hosts
+    encoded["host_count"] = len(section.get("subdomains", []))
+    encoded["dicts"] = {column: d.values for column, d in dicts.items()}
+    return encoded
+
+
+def decode_subdomains(section: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of encode_subdomains; other sections pass through unchanged."""
+    if section.get("encoding") != SECTION_ENCODING:
+        return section
+    hosts: list[str] = section["hosts"]
+    dicts: dict[str, list[str]] = section["dicts"]
+    decoded: dict[str, Any] = {"subdomains": hosts[: section["host_count"]]}
+    for key, value in section.items():
+        if key in ("encoding", "hosts", "host_count", "dicts"):
+            continue
+        if key == "sources":
+            names = dicts["source"]
+            decoded["sources"] = {
+                hosts[h]: names[s] for h, s in zip(value["host"], value["source"])
+            }
+        elif key == "classified":
+            columns = [(column, dicts[column], value[column]) for column in CLASSIFIED_COLUMNS]
+            decoded["classified"] = [
+                {"subdomain": hosts[h], **{column: names[codes[i]] for column, names, codes in columns}}
+                for i, h in enumerate(value["host"])
+            ]
+        elif key == "groups":
+            decoded["groups"] = [
+                {**group, "members": [hosts[m] for m in group["members"]]} for group in value
+            ]
+        else:
+            decoded[key] = value
+    return decoded
+
+
+def encode_report(report: dict[str, Any]) -> dict[str, Any]:
+    """A scan report with its subdomains section in columnar form."""
+    subdomains = report.get("subdomains")
+    if not isinstance(subdomains, dict):
+        return report
+    return {**report, "subdomains": encode_subdomains(subdomains)}
+
+
+def decode_report(report: dict[str, Any]) -> dict[str, Any]:
+    """Restore a report (or batch response) produced by encode_report."""
+    if isinstance(report.get("results"), list):
+        return {**report, "results": [decode_report(r) for r in report["results"]]}
+    for key in ("result", "partial"):  # GET /jobs/{id}
+        if isinstance(report.get(key), dict):
+            report = {**report, key: decode_report(report[key])}
+    subdomains = report.get("subdomains")
+    if not isinstance(subdomains, dict):
+        return report
+    return {**report, "subdomains": decode_subdomains(subdomains)}
+
+
+# ---------------------------------------------------------------------------
+# Serialization and compression
+# ---------------------------------------------------------------------------
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip())
+    return accepted
+
+
+def compress(body: bytes, accept_encoding: str) -> tuple[str | None, bytes]:
+    """(Content-Encoding or None, body) for the best coding the client accepts."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return None, body
+    accepted = _accepted(accept_encoding)
+    if _zstd_compressor is not None and "zstd" in accepted:
+        return "zstd", _zstd_compressor.compress(body)
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip", gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return None, body
+
+
+def decompress(body: bytes) -> bytes:
+    """Undo ``compress``, recognising gzip and zstd by their magic bytes."""
+    if body[:2] == b"\x1f\x8b":
+        return gzip.decompress(body)
+    if body[:4] == b"\x28\xb5\x2f\xfd":
+        if zstandard is None:
+            raise ValueError("zstd body but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+if __name__ == "__main__":
+    # Restore a saved (possibly compressed) compact response to the regular shape
+    json.dump(decode_report(json.loads(decompress(sys.stdin.buffer.read()))), sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,388 @@
+"""Asyncio DNS stub resolver with pooled UDP sockets, TCP fallback and a TTL cache.
+
+Queries go to the recursive servers in DNS_SERVERS (comma-separated
+``host[:port]``, ``[v6]:port`` for IPv6) or else the nameservers in
+/etc/resolv.conf, each over a small pool of connected UDP sockets whose
+replies are matched to waiting queries by message id. A truncated reply is
+retried over TCP; a timeout, SERVFAIL or REFUSED moves on to the next server.
+
+Answers are cached for the smallest TTL in the answer (capped at MAX_TTL).
+NXDOMAIN and empty (NODATA) answers are cached too, for the SOA's negative
+TTL (RFC 2308) or NEGATIVE_TTL when the server sent no SOA. Identical
+queries in flight at the same time share one exchange.
+"""
+
+import asyncio
+import os
+import random
+import socket
+import struct
+import time
+from collections import OrderedDict
+
+DNS_PORT = 53
+QUERY_TIMEOUT = 2.0  # seconds per exchange with one server
+ATTEMPTS = 2  # passes over the server list before giving up
+SOCKETS_PER_SERVER = int(os.environ.get("DNS_SOCKETS_PER_SERVER", "4"))
+EDNS_PAYLOAD = 1232  # UDP payload size advertised via EDNS0 (DNS flag day 2020)
+MAX_TTL = 24 * 60 * 60  # seconds an answer is cached at most
+NEGATIVE_TTL = 60  # seconds NXDOMAIN/NODATA is cached when there is no SOA
+CACHE_MAX_ENTRIES = int(os.environ.get("DNS_CACHE_MAX_ENTRIES", "8192"))
+RESOLV_CONF = "/etc/resolv.conf"
+
+RECORD_TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "AAAA": 28}
+TYPE_NAMES = {code: name for name, code in RECORD_TYPES.items()}
+OPT = 41
+CLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+
+
+class DnsError(Exception):
+    """No server gave a usable answer."""
+
+
+# ---------------------------------------------------------------------------
+# Wire format (RFC 1035)
+# ---------------------------------------------------------------------------
+
+def _encode_name(name: str) -> bytes:
+    encoded = b""
+    for label in name.rstrip(".").split("."):
+        raw = label.encode("idna") if not label.isascii() else label.encode()
+        if not 0 < len(raw) <= 63:
+            raise DnsError(f"invalid name: {name!r}")
+        encoded += bytes((len(raw),)) + raw
+    return encoded + b"\0"
+
+
+def _build_query(qid: int, name: str, qtype: int) -> bytes:
+    header = struct.pack("!HHHHHH", qid, FLAG_RD, 1, 0, 0, 1)
+    question = _encode_name(name) + struct.pack("!HH", qtype, CLASS_IN)
+    opt = b"\0" + struct.pack("!HHIH", OPT, EDNS_PAYLOAD, 0, 0)
+    return header + question + opt
+
+
+def _read_name(message: bytes, offset: int) -> tuple[str, int]:
+    """Decode a possibly compressed name; returns (name, offset after it)."""
+    labels: list[str] = []
+    end = -1
+    for _ in range(128):  # bounds pointer loops
+        length = message[offset]
+        if length & 0xC0 == 0xC0:
+            if end < 0:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | message[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels).lower(), end if end >= 0 else offset
+        labels.append(message[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    raise DnsError("name compression loop")
+
+
+def _read_rdata(message: bytes, rtype: int, offset: int, length: int) -> str | int | None:
+    """Value of one record: an address or host name; the negative TTL for SOA."""
+    if rtype == RECORD_TYPES["A"] and length == 4:
+        return socket.inet_ntop(socket.AF_INET, message[offset:offset + 4])
+    if rtype == RECORD_TYPES["AAAA"] and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, message[offset:offset + 16])
+    if rtype in (RECORD_TYPES["CNAME"], RECORD_TYPES["NS"]):
+        return _read_name(message, offset)[0]
+    if rtype == RECORD_TYPES["MX"]:
+        return _read_name(message, offset + 2)[0]  # host only, like dnsx
+    if rtype == RECORD_TYPES["SOA"]:
+        _, offset = _read_name(message, offset)  # mname
+        _, offset = _read_name(message, offset)  # rname
+        return struct.unpack_from("!I", message, offset + 16)[0]  # minimum
+    return None
+
+
+def _parse_response(
+    message: bytes, name: str, qtype: int
+) -> tuple[int, int, dict[str, list[str]], int | None]:
+    """Return (flags, min answer TTL, {type: values}, negative TTL from SOA or None).
+
+    Raises DnsError when the reply does not answer the question asked.
+    """
+    try:
+        _, flags, qdcount, ancount, nscount, _ = struct.unpack_from("!HHHHHH", message)
+        offset = 12
+        question = None
+        for _ in range(qdcount):
+            qname, offset = _read_name(message, offset)
+            question = (qname, struct.unpack_from("!H", message, offset)[0])
+            offset += 4
+        if question != (name.rstrip(".").lower(), qtype):
+            raise DnsError(f"reply is for {question}, not {name}")
+
+        records: dict[str, list[str]] = {}
+        min_ttl = MAX_TTL
+        negative_ttl = None
+        for index in range(ancount + nscount):
+            _, offset = _read_name(message, offset)
+            rtype, _, ttl, length = struct.unpack_from("!HHIH", message, offset)
+            offset += 10
+            value = _read_rdata(message, rtype, offset, length)
+            offset += length
+            if index >= ancount:
+                if isinstance(value, int):  # SOA: min(its TTL, minimum), RFC 2308
+                    negative_ttl = min(ttl, value)
+                continue
+            if isinstance(value, str) and rtype in TYPE_NAMES:
+                values = records.setdefault(TYPE_NAMES[rtype], [])
+                if value not in values:
+                    values.append(value)
+                min_ttl = min(min_ttl, ttl)
+    except (IndexError, struct.error, UnicodeError) as e:
+        raise DnsError(f"malformed reply: {e}") from e
+    return flags, min_ttl, records, negative_ttl
+
+
+# ---------------------------------------------------------------------------
+# Transports
+# ---------------------------------------------------------------------------
+
+class _UdpSocket(asyncio.DatagramProtocol):
+    """One connected UDP socket; replies are handed to queries by message id."""
+
+    def __init__(self) -> None:
+        self.transport: asyncio.DatagramTransport | None = None
+        self.pending: dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: object) -> None:
+        if len(data) < 12:
+            return
+        future = self.pending.pop(int.from_bytes(data[:2], "big"), None)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        # e.g. ICMP port unreachable on the connected socket
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.pending.clear()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        self.error_received(exc or ConnectionResetError("socket closed"))
+
+    async def exchange(self, name: str, qtype: int) -> bytes:
+        assert self.transport is not None
+        qid = random.getrandbits(16)
+        while qid in self.pending:
+            qid = random.getrandbits(16)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[qid] = future
+        try:
+            self.transport.sendto(_build_query(qid, name, qtype))
+            return await asyncio.wait_for(future, timeout=QUERY_TIMEOUT)
+        finally:
+            self.pending.pop(qid, None)
+
+
+class _ServerPool:
+    """SOCKETS_PER_SERVER UDP sockets to one server, used round robin."""
+
+    def __init__(self, address: tuple[str, int]) -> None:
+        self.address = address
+        self._sockets: list[_UdpSocket] = []
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    async def _socket(self) -> _UdpSocket:
+        self._sockets = [s for s in self._sockets if s.transport is not None]
+        if len(self._sockets) < SOCKETS_PER_SERVER:
+            async with self._lock:
+                if len(self._sockets) < SOCKETS_PER_SERVER:
+                    _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                        _UdpSocket, remote_addr=self.address
+                    )
+                    self._sockets.append(protocol)
+                    return protocol
+        self._next = (self._next + 1) % len(self._sockets)
+        return self._sockets[self._next]
+
+    async def exchange_udp(self, name: str, qtype: int) -> bytes:
+        return await (await self._socket()).exchange(name, qtype)
+
+    async def exchange_tcp(self, name: str, qtype: int) -> bytes:
+        query = _build_query(random.getrandbits(16), name, qtype)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(*self.address), timeout=QUERY_TIMEOUT
+        )
+        try:
+            writer.write(struct.pack("!H", len(query)) + query)
+            await writer.drain()
+            length = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), QUERY_TIMEOUT))[0]
+            return await asyncio.wait_for(reader.readexactly(length), timeout=QUERY_TIMEOUT)
+        except asyncio.IncompleteReadError as e:
+            raise DnsError(f"{self.address[0]} closed the TCP connection") from e
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        for sock in self._sockets:
+            if sock.transport is not None:
+                sock.transport.close()
+        self._sockets.clear()
+
+
+def _parse_server(value: str) -> tuple[str, int]:
+    value = value.strip()
+    if value.startswith("["):  # [v6]:port
+        host, _, port = value[1:].partition("]")
+        return host, int(port.lstrip(":") or DNS_PORT)
+    if value.count(":") == 1:
+        host, port = value.split(":")
+        return host, int(port)
+    return value, DNS_PORT
+
+
+def _configured_servers() -> list[tuple[str, int]]:
+    configured = os.environ.get("DNS_SERVERS", "")
+    if configured:
+        return [_parse_server(s) for s in configured.split(",") if s.strip()]
+    servers = []
+    try:
+        with open(RESOLV_CONF) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    servers.append((parts[1].split("%", 1)[0], DNS_PORT))
+    except OSError:
+        pass
+    return servers or [("127.0.0.1", DNS_PORT)]
+
+
+_pools: dict[tuple[str, int], _ServerPool] = {}
+_pools_loop: asyncio.AbstractEventLoop | None = None
+_cache: OrderedDict[tuple[str, int], tuple[float, dict[str, list[str]]]] = OrderedDict()
+_in_flight: dict[tuple[str, int], asyncio.Task] = {}
+
+
+def _server_pools() -> list[_ServerPool]:
+    global _pools_loop
+    loop = asyncio.get_running_loop()
+    if loop is not _pools_loop:  # sockets belong to the loop that made them
+        reset()
+        _pools_loop = loop
+    if not _pools:
+        for address in _configured_servers():
+            _pools[address] = _ServerPool(address)
+    return list(_pools.values())
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+
+async def _exchange(pool: _ServerPool, name: str, qtype: int) -> tuple[int, int, dict[str, list[str]], int | None]:
+    reply = _parse_response(await pool.exchange_udp(name, qtype), name, qtype)
+    if reply[0] & FLAG_TC:
+        reply = _parse_response(await pool.exchange_tcp(name, qtype), name, qtype)
+    return reply
+
+
+async def _lookup(name: str, qtype: int) -> dict[str, list[str]]:
+    errors: list[str] = []
+    for _ in range(ATTEMPTS):
+        for pool in _server_pools():
+            try:
+                flags, ttl, records, negative_ttl = await _exchange(pool, name, qtype)
+            except (OSError, asyncio.TimeoutError, DnsError) as e:
+                errors.append(f"{pool.address[0]}: {e or 'timed out'}")
+                continue
+            rcode = flags & 0x000F
+            if rcode not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+                errors.append(f"{pool.address[0]}: rcode {rcode}")
+                continue
+            if rcode == RCODE_NXDOMAIN or TYPE_NAMES[qtype] not in records:
+                ttl = negative_ttl if negative_ttl is not None else NEGATIVE_TTL
+            _remember((name, qtype), min(ttl, MAX_TTL), records)
+            return records
+    raise DnsError(f"no answer for {name} {TYPE_NAMES[qtype]}: " + "; ".join(errors[-3:]))
+
+
+def _forget(task: asyncio.Task) -> None:
+    for key, running in list(_in_flight.items()):
+        if running is task:
+            del _in_flight[key]
+    if not task.cancelled():
+        task.exception()  # retrieved even when every waiter gave up
+
+
+def _cached(key: tuple[str, int]) -> dict[str, list[str]] | None:
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def _remember(key: tuple[str, int], ttl: float, records: dict[str, list[str]]) -> None:
+    if ttl <= 0:
+        return
+    _cache[key] = (time.monotonic() + ttl, records)
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def query(name: str, rtype: str) -> dict[str, list[str]]:
+    """Answer section of a ``rtype`` query for ``name``, grouped by record type.
+
+    The CNAME chain a recursive server returns with an A/AAAA answer is
+    included. An empty dict means NXDOMAIN or no records of that type.
+    """
+    key = (name.rstrip(".").lower(), RECORD_TYPES[rtype])
+    records = _cached(key)
+    if records is not None:
+        return records
+    task = _in_flight.get(key)
+    if task is None:
+        task = _in_flight[key] = asyncio.ensure_future(_lookup(*key))
+        task.add_done_callback(_forget)
+    # A caller giving up leaves the exchange to the others waiting on it
+    return await asyncio.shield(task)
+
+
+async def resolve(name: str, rtypes: tuple[str, ...] = ("A", "AAAA", "CNAME", "NS", "MX")) -> dict[str, list[str]]:
+    """{record type: values} for ``name``, all types queried concurrently.
+
+    CNAME holds the aliases found in any of the answers. Raises DnsError
+    when the A query fails; other failed types come back empty.
+    """
+    answers = await asyncio.gather(*(query(name, rtype) for rtype in rtypes), return_exceptions=True)
+    result: dict[str, list[str]] = {rtype: [] for rtype in rtypes}
+    aliases: list[str] = []
+    for rtype, answer in zip(rtypes, answers):
+        if isinstance(answer, BaseException):
+            if rtype == "A" or not isinstance(answer, DnsError):
+                raise answer
+            continue
+        result[rtype] = list(answer.get(rtype, []))
+        aliases.extend(alias for alias in answer.get("CNAME", []) if alias not in aliases)
+    if "CNAME" in result:
+        result["CNAME"] = aliases
+    return result
+
+
+def reset() -> None:
+    """Close the sockets and forget cached answers."""
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
+    _cache.clear()
+    _in_flight.clear()
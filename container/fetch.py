@@ -0,0 +1,212 @@
+"""Shared landing-page fetch: one GET per target for every tool that reads it.
+
+Header analysis, WAF detection and technology fingerprinting all start from
+the same response to ``GET target``. ``get`` fetches it once with a pooled
+HTTP client (keep-alive connections are reused across scans), following
+redirects by hand so every hop is recorded, and hands the captured page to
+each tool's ``analyze_page``; only extra probes (wafw00f's attack requests)
+still go to the network. Concurrent and repeated calls for the same URL
+within PAGE_TTL share one fetch.
+
+A page is a plain dict, so it can be sent to worker processes::
+
+    {"url", "final_url", "status_code", "reason", "http_version",
+     "headers": [[name, value], ...], "body", "body_bytes", "truncated",
+     "chain": [{"url", "status_code", "location", "headers"}, ...],
+     "timing": {"ttfb_ms", "total_ms"}, "error"}
+
+``error`` is set (and the rest left empty) when the site could not be
+fetched; tools treat that like their own connection failure. Kept pages are
+bounded by count and by total size (MAX_CACHED_BYTES), oldest dropped first;
+``for_worker`` strips a page to what the worker-side analyzers read before
+it is pickled to a worker.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urljoin
+
+import httpx
+
+import metrics
+
+FETCH_TIMEOUT = 10  # seconds per hop
+MAX_REDIRECTS = 10
+MAX_BODY_BYTES = 2 * 1024 * 1024  # body kept for fingerprinting
+PAGE_TTL = 60  # seconds a fetched page is shared between tools
+MAX_PAGES = 256  # pages kept at once
+MAX_CACHED_BYTES = int(os.environ.get("FETCH_CACHE_BYTES", str(64 * 1024 * 1024)))  # bodies and headers kept at once
+MAX_CONNECTIONS = int(os.environ.get("FETCH_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = 20  # idle connections kept open for reuse
+
+# A regular browser request, as wafw00f sends (its generic detection compares
+# this response with one to a request without User-Agent)
+REQUEST_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US,en;q=0.9",
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Upgrade-Insecure-Requests": "1",
+}
+
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+_pages: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+_cached_bytes = 0  # _size() of every page in _pages
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:  # connections belong to their loop
+        _client = httpx.AsyncClient(
+            verify=False,  # fingerprint whatever is served, as the tools do
+            follow_redirects=False,
+            timeout=FETCH_TIMEOUT,
+            headers=REQUEST_HEADERS,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+        )
+        _client_loop = loop
+    return _client
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _empty_page(url: str) -> dict[str, Any]:
+    return {
+        "url": url,
+        "final_url": "",
+        "status_code": 0,
+        "reason": "",
+        "http_version": "",
+        "headers": [],
+        "body": "",
+        "body_bytes": 0,
+        "truncated": False,
+        "chain": [],
+        "timing": {"ttfb_ms": None, "total_ms": None},
+        "error": None,
+    }
+
+
+async def _fetch(url: str) -> dict[str, Any]:
+    page = _empty_page(url)
+    client = _get_client()
+    started = time.perf_counter()
+    current = url
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await client.send(client.build_request("GET", current), stream=True)
+            try:
+                headers = [
+                    [name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers.raw
+                ]
+                location = response.headers.get("location", "")
+                page["chain"].append({
+                    "url": current,
+                    "status_code": response.status_code,
+                    "location": location,
+                    "headers": headers,
+                })
+                if response.is_redirect and location:
+                    current = urljoin(current, location)
+                    continue
+
+                page["timing"]["ttfb_ms"] = _ms(time.perf_counter() - started)
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= MAX_BODY_BYTES:
+                        page["truncated"] = True
+                        break
+                page.update(
+                    final_url=current,
+                    status_code=response.status_code,
+                    reason=response.reason_phrase,
+                    http_version=response.http_version,
+                    headers=headers,
+                    body=bytes(body[:MAX_BODY_BYTES]).decode(response.encoding or "utf-8", errors="replace"),
+                    body_bytes=len(body),
+                )
+                break
+            finally:
+                await response.aclose()
+        else:
+            page["error"] = f"More than {MAX_REDIRECTS} redirects"
+    except (httpx.HTTPError, OSError, UnicodeError, LookupError) as e:
+        page["error"] = f"{type(e).__name__}: {e}"
+    page["timing"]["total_ms"] = _ms(time.perf_counter() - started)
+    return page
+
+
+def _size(page: dict[str, Any]) -> int:
+    """Approximate memory held by a page: body text plus every hop's headers."""
+    hops = [page["headers"]] + [hop["headers"] for hop in page["chain"]]
+    return len(page["body"]) + sum(len(name) + len(value) for headers in hops for name, value in headers)
+
+
+def _drop(url: str) -> None:
+    global _cached_bytes
+    _cached_bytes -= _size(_pages.pop(url)[1])
+
+
+def for_worker(page: dict[str, Any]) -> dict[str, Any]:
+    """``page`` without the redirect chain and timing, which no worker-side analyzer reads."""
+    return {key: value for key, value in page.items() if key not in ("chain", "timing")}
+
+
+def _forget(task: asyncio.Task) -> None:
+    for url, running in list(_in_flight.items()):
+        if running is task:
+            del _in_flight[url]
+    if not task.cancelled():
+        task.exception()  # retrieved even when every waiter gave up
+
+
+async def _fetch_and_keep(url: str) -> dict[str, Any]:
+    page = await _fetch(url)
+    metrics.PAGE_FETCHES.inc("error" if page["error"] else "fetched")
+    global _cached_bytes
+    if url in _pages:
+        _drop(url)
+    _pages[url] = (time.monotonic() + PAGE_TTL, page)
+    _cached_bytes += _size(page)
+    while _pages and (len(_pages) > MAX_PAGES or _cached_bytes > MAX_CACHED_BYTES):
+        _drop(next(iter(_pages)))
+    return page
+
+
+async def get(url: str) -> dict[str, Any]:
+    """The captured response to ``GET url`` (see module docstring); never raises on fetch errors."""
+    entry = _pages.get(url)
+    if entry is not None:
+        if entry[0] > time.monotonic():
+            metrics.PAGE_FETCHES.inc("cached")
+            return entry[1]
+        _drop(url)
+    task = _in_flight.get(url)
+    if task is None:
+        task = _in_flight[url] = asyncio.ensure_future(_fetch_and_keep(url))
+        task.add_done_callback(_forget)
+    else:
+        metrics.PAGE_FETCHES.inc("coalesced")
+    # One tool giving up (timeout) leaves the fetch to the others
+    return await asyncio.shield(task)
+
+
+async def shutdown() -> None:
+    global _client, _cached_bytes
+    client, _client = _client, None
+    _pages.clear()
+    _cached_bytes = 0
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,178 @@
+"""Long-lived line-protocol helpers (dnsx, httpx) shared by all scans.
+
+A parser module opts in by defining ``STREAM_COMMAND`` (argv of a process that
+reads one input per stdin line and writes one JSON object per stdout line),
+``stream_key(record)`` (which input a JSON record answers) and
+``STREAM_TIMEOUT``. The helper writes ``module.input_key(target)`` to stdin
+and hands the matching output line back to the waiting scan, so a scan pays
+one pipe write instead of a shell fork plus a Go binary start.
+
+Helpers are restarted on the next query after a crash or unreadable output
+(with a short backoff), and the number of in-flight inputs per helper is
+bounded so a burst of scans queues here instead of flooding the child's
+stdin. A query that gets no line within STREAM_TIMEOUT raises HelperTimeout
+rather than passing for an empty answer.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import time
+from typing import Any
+
+HELPERS_ENABLED = os.environ.get("STREAM_HELPERS", "1") != "0"
+MAX_IN_FLIGHT = 64  # inputs awaiting output, per helper
+RESTART_BACKOFF = 1.0  # seconds between consecutive starts
+STDERR_TAIL = 500  # bytes of stderr kept for error messages
+LINE_LIMIT = 4 * 1024 * 1024  # longest output line read; a longer one restarts the helper
+
+
+class HelperUnavailable(Exception):
+    """The helper could not be started or died with the query in flight."""
+
+
+class HelperTimeout(HelperUnavailable):
+    """No output line for the input arrived within the tool's STREAM_TIMEOUT."""
+
+
+class StreamHelper:
+    def __init__(self, name: str, module: Any) -> None:
+        self.name = name
+        self.module = module
+        self._proc: asyncio.subprocess.Process | None = None
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._start_lock = asyncio.Lock()
+        self._last_start = 0.0
+        self._stderr_tail = b""
+        self.restarts = 0
+
+    async def query(self, key: str) -> str:
+        """Return the helper's output line for ``key``; HelperTimeout if none arrives in time."""
+        async with self._slots:
+            proc = await self._ensure_running()
+            pending = self._waiters  # belongs to this process instance
+            future = asyncio.get_running_loop().create_future()
+            pending.setdefault(key, []).append(future)
+            try:
+                assert proc.stdin is not None
+                proc.stdin.write(key.encode() + b"\n")
+                await proc.stdin.drain()
+                return await asyncio.wait_for(future, timeout=self.module.STREAM_TIMEOUT)
+            except asyncio.TimeoutError as e:
+                # Not an empty answer: the caller falls back to a one-off run
+                raise HelperTimeout(
+                    f"{self.name} helper gave no output for {key} in {self.module.STREAM_TIMEOUT}s"
+                ) from e
+            except (BrokenPipeError, ConnectionResetError) as e:
+                raise HelperUnavailable(f"{self.name} helper pipe closed: {e}") from e
+            finally:
+                waiters = pending.get(key)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del pending[key]
+
+    async def _ensure_running(self) -> asyncio.subprocess.Process:
+        async with self._start_lock:
+            if self._proc is not None and self._proc.returncode is None:
+                return self._proc
+
+            wait = self._last_start + RESTART_BACKOFF - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._proc is not None:
+                self.restarts += 1
+            self._last_start = time.monotonic()
+
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *self.module.STREAM_COMMAND,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=LINE_LIMIT,
+                )
+            except OSError as e:
+                raise HelperUnavailable(f"{self.name} helper failed to start: {e}") from e
+
+            self._proc = proc
+            self._waiters = {}
+            asyncio.create_task(self._read_stdout(proc, self._waiters))
+            asyncio.create_task(self._read_stderr(proc))
+            return proc
+
+    async def _read_stdout(
+        self, proc: asyncio.subprocess.Process, pending: dict[str, list[asyncio.Future]]
+    ) -> None:
+        assert proc.stdout is not None
+        reason = ""
+        try:
+            while True:
+                raw = await proc.stdout.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="replace").strip()
+                try:
+                    key = self.module.stream_key(json.loads(line))
+                except (json.JSONDecodeError, AttributeError, TypeError):
+                    continue
+                waiters = pending.get(key)
+                while waiters:
+                    future = waiters.pop(0)
+                    if not future.done():
+                        future.set_result(line)
+                        break
+        except Exception as e:
+            # e.g. a line over LINE_LIMIT: the stream is out of sync, so the
+            # helper is killed and restarted by the next query
+            reason = f"output unreadable ({type(e).__name__}: {e}); "
+            if proc.returncode is None:
+                proc.kill()
+
+        # EOF: the helper exited; fail everything still waiting on it
+        await proc.wait()
+        error = HelperUnavailable(
+            f"{self.name} helper exited with {proc.returncode}: {reason}"
+            + self._stderr_tail.decode("utf-8", errors="replace")
+        )
+        for waiters in pending.values():
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _read_stderr(self, proc: asyncio.subprocess.Process) -> None:
+        assert proc.stderr is not None
+        while chunk := await proc.stderr.read(4096):
+            self._stderr_tail = (self._stderr_tail + chunk)[-STDERR_TAIL:]
+
+    async def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+_helpers: dict[str, StreamHelper] = {}
+
+
+def supports(module: Any) -> bool:
+    """True if ``module`` declares a stream helper whose binary is installed."""
+    if not HELPERS_ENABLED or not hasattr(module, "STREAM_COMMAND"):
+        return False
+    return shutil.which(module.STREAM_COMMAND[0]) is not None
+
+
+async def query(name: str, module: Any, target: str) -> str:
+    """Feed ``target`` to the tool's shared helper and return its output line."""
+    helper = _helpers.get(name)
+    if helper is None:
+        helper = _helpers[name] = StreamHelper(name, module)
+    return await helper.query(module.input_key(target))
+
+
+async def shutdown() -> None:
+    for helper in list(_helpers.values()):
+        await helper.close()
+    _helpers.clear()
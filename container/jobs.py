@@ -0,0 +1,275 @@
+"""Asynchronous scan jobs backed by a local SQLite table and a bounded worker pool.
+
+``submit`` stores a job and returns its id at once; JOB_WORKERS worker tasks
+claim queued jobs oldest first and run them through ``stream_scan``, saving
+each finished section as the partial result. The table lives in
+SCAN_JOBS_DB, so queued jobs and partial results survive a restart: jobs
+that were running when the process stopped are queued again on ``start``,
+up to MAX_ATTEMPTS claims per job, so a job that keeps taking the process
+down is failed instead of cycling forever. A worker that hits an error
+outside its job (e.g. a locked database) logs it and carries on, and one
+that dies anyway is replaced.
+
+Jobs run in the lane they were submitted with (bulk by default) and
+therefore share the per-tool concurrency budgets with interactive scans
+without ever getting ahead of them; admission control does not apply, the
+pool size is the throughput limit.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any
+
+import metrics
+from scanner import ScanRejected, stream_scan
+
+JOBS_DB_PATH = os.environ.get("SCAN_JOBS_DB", "scan_jobs.db")
+JOB_WORKERS = int(os.environ.get("SCAN_JOB_WORKERS", "4"))
+MAX_QUEUED_JOBS = int(os.environ.get("SCAN_JOBS_MAX_QUEUED", "10000"))
+JOB_RETENTION = 24 * 60 * 60  # seconds finished jobs are kept
+PURGE_EVERY = 256  # finished jobs between sweeps of expired rows
+MAX_WAIT = 60  # longest wait= a GET may ask for, seconds
+MAX_ATTEMPTS = 3  # claims per job before an interrupted job is failed
+ERROR_BACKOFF = 1.0  # seconds a worker pauses after an error outside a job
+
+log = logging.getLogger(__name__)
+
+_db: sqlite3.Connection | None = None
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+_finished: dict[str, asyncio.Event] = {}  # job id -> set when it finishes
+_finished_count = 0
+
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(JOBS_DB_PATH, isolation_level=None)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL,"
+            " partial TEXT, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in _db.execute("PRAGMA table_info(jobs)")}
+        if "attempts" not in columns:  # a table from before attempts were counted
+            _db.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        _db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, created_at)")
+    return _db
+
+
+def _timestamp(epoch: float | None) -> str | None:
+    if epoch is None:
+        return None
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+
+
+def submit(request: dict[str, Any]) -> str:
+    """Queue a scan; ``request`` holds run_scan's keyword arguments. Returns the job id."""
+    db = _connect()
+    queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    if queued >= MAX_QUEUED_JOBS:
+        raise ScanRejected("jobs", 60)
+    job_id = uuid.uuid4().hex
+    db.execute(
+        "INSERT INTO jobs (id, status, request, created_at) VALUES (?, 'queued', ?, ?)",
+        (job_id, json.dumps(request, default=str), time.time()),
+    )
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+
+def get(job_id: str) -> dict[str, Any] | None:
+    """Job status with its result when done, or the sections finished so far."""
+    row = _connect().execute(
+        "SELECT status, request, partial, result, error, created_at, started_at, finished_at"
+        " FROM jobs WHERE id = ?",
+        (job_id,),
+    ).fetchone()
+    if row is None:
+        return None
+    status, request, partial, result, error, created_at, started_at, finished_at = row
+    job: dict[str, Any] = {
+        "id": job_id,
+        "status": status,
+        "target": json.loads(request)["target"],
+        "created_at": _timestamp(created_at),
+        "started_at": _timestamp(started_at),
+        "finished_at": _timestamp(finished_at),
+    }
+    if result is not None:
+        job["result"] = json.loads(result)
+    elif partial is not None:
+        job["partial"] = json.loads(partial)
+    if error is not None:
+        job["error"] = error
+    return job
+
+
+async def wait(job_id: str, timeout: float) -> dict[str, Any] | None:
+    """``get`` once the job has finished or ``timeout`` seconds have passed."""
+    job = get(job_id)
+    if job is None or job["status"] in ("done", "failed") or timeout <= 0:
+        return job
+    event = _finished.setdefault(job_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout=min(timeout, MAX_WAIT))
+    except asyncio.TimeoutError:
+        pass
+    return get(job_id)
+
+
+def _claim() -> tuple[str, dict[str, Any]] | None:
+    db = _connect()
+    while True:
+        row = db.execute(
+            "SELECT id, request FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        claimed = db.execute(
+            "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1"
+            " WHERE id = ? AND status = 'queued'",
+            (time.time(), row[0]),
+        ).rowcount
+        if claimed:
+            return row[0], json.loads(row[1])
+
+
+def _finish(job_id: str, status: str, result: dict[str, Any] | None, error: str | None) -> None:
+    global _finished_count
+    now = time.time()
+    db = _connect()
+    db.execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, partial = NULL, finished_at = ?"
+        " WHERE id = ?",
+        (status, None if result is None else json.dumps(result, default=str), error, now, job_id),
+    )
+    _finished_count += 1
+    if _finished_count % PURGE_EVERY == 0:
+        db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at <= ?",
+            (now - JOB_RETENTION,),
+        )
+    event = _finished.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+
+async def _run_job(job_id: str, request: dict[str, Any]) -> None:
+    db = _connect()
+    partial: dict[str, Any] = {}
+    try:
+        async for event in stream_scan(**request):
+            if event["type"] == "section":
+                partial[event["section"]] = event["data"]
+                db.execute(
+                    "UPDATE jobs SET partial = ? WHERE id = ?",
+                    (json.dumps(partial, default=str), job_id),
+                )
+            elif event["type"] == "complete":
+                _finish(job_id, "done", event["data"], None)
+                return
+        _finish(job_id, "failed", None, "Scan ended without a result")
+    except asyncio.CancelledError:
+        # Shutting down: run it again after the restart, without counting
+        # this claim against MAX_ATTEMPTS
+        db.execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, attempts = attempts - 1 WHERE id = ?",
+            (job_id,),
+        )
+        raise
+    except Exception as e:
+        _finish(job_id, "failed", None, f"Scan failed: {str(e)}")
+
+
+def _requeue(job_id: str | None = None) -> None:
+    """Queue interrupted jobs (``job_id``, or every running one) again.
+
+    Jobs already claimed MAX_ATTEMPTS times are failed instead.
+    """
+    db = _connect()
+    match, args = ("status = 'running' AND id = ?", (job_id,)) if job_id else ("status = 'running'", ())
+    db.execute(
+        f"UPDATE jobs SET status = 'failed', partial = NULL, finished_at = ?, error = ?"
+        f" WHERE {match} AND attempts >= ?",
+        (time.time(), f"Scan interrupted {MAX_ATTEMPTS} times", *args, MAX_ATTEMPTS),
+    )
+    db.execute(f"UPDATE jobs SET status = 'queued', started_at = NULL WHERE {match}", args)
+
+
+async def _worker() -> None:
+    assert _wakeup is not None
+    while True:
+        job_id = None
+        try:
+            claimed = _claim()
+            if claimed is None:
+                _wakeup.clear()
+                await _wakeup.wait()
+                continue
+            job_id = claimed[0]
+            await _run_job(*claimed)
+        except Exception:
+            # e.g. the database was locked while recording the outcome
+            log.exception("scan job worker error (job %s)", job_id)
+            await asyncio.sleep(ERROR_BACKOFF)
+            if job_id is not None:
+                with contextlib.suppress(sqlite3.Error):
+                    _requeue(job_id)  # else it is requeued on the next start
+
+
+def _start_worker() -> None:
+    task = asyncio.create_task(_worker())
+    task.add_done_callback(_replace_worker)
+    _workers.append(task)
+
+
+def _replace_worker(task: asyncio.Task) -> None:
+    """Supervisor: start a new worker when one ends other than by shutdown."""
+    if task not in _workers:
+        return  # shut down
+    _workers.remove(task)
+    if task.cancelled():
+        return
+    log.error("scan job worker died, restarting", exc_info=task.exception())
+    _start_worker()
+
+
+def queue_depth() -> dict[str, int]:
+    """Job counts per status, for /metrics."""
+    rows = _connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    return dict(rows)
+
+
+metrics.Gauge(
+    "scanner_jobs", "Scan jobs per status.", ("status",),
+    lambda: {(status,): n for status, n in queue_depth().items()},
+)
+
+
+def start() -> None:
+    """Requeue jobs interrupted by a restart and start the worker pool."""
+    global _wakeup
+    _requeue()
+    _wakeup = asyncio.Event()
+    _wakeup.set()
+    for _ in range(JOB_WORKERS):
+        _start_worker()
+
+
+async def shutdown() -> None:
+    workers = list(_workers)
+    _workers.clear()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
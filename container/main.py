@@ -1,14 +1,62 @@
-"""FastAPI server — exposes /scan and /health endpoints on port 8080."""
+"""FastAPI server — exposes /scan, /scan/stream, /scan/batch, /jobs, /metrics and /health endpoints on port 8080."""
 
+import asyncio
+import json
 import re
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Literal
 from urllib.parse import urlparse
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, field_validator
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+
+import compact
+import fetch
+import helpers
+import jobs
+import metrics
+import workers
+from scanner import (
+    PROFILES,
+    TOOLS,
+    TOTAL_TIMEOUT,
+    ScanRejected,
+    SingleFlight,
+    admission,
+    get_asn_index,
+    run_batch_scan,
+    run_scan,
+    stream_scan,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Pre-start the in-process tool workers so the first scan is already warm
+    workers.start(list(TOOLS.values()))
+    get_asn_index()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    jobs.start()
+    yield
+    lag_monitor.cancel()
+    await jobs.shutdown()
+    await fetch.shutdown()
+    await helpers.shutdown()
+    workers.shutdown()
 
-from scanner import run_scan
 
-app = FastAPI(title="Site Intelligence Scanner", version="1.0.0")
+app = FastAPI(title="Site Intelligence Scanner", version="1.0.0", lifespan=lifespan)
+
+
+@app.exception_handler(ScanRejected)
+async def scan_rejected(request: Request, exc: ScanRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # Strict hostname regex: alphanumeric, hyphens, dots only (prevents shell injection)
 HOSTNAME_RE = re.compile(
@@ -19,6 +67,8 @@ HOSTNAME_RE = re.compile(
 BLOCKED_HOSTNAMES = {"localhost", "metadata.google.internal"}
 BLOCKED_HOSTNAME_SUFFIXES = (".localhost", ".internal")
 
+MAX_BATCH_TARGETS = 500
+
 
 def _is_blocked_hostname(hostname: str) -> bool:
     lower = hostname.lower()
@@ -27,31 +77,117 @@ def _is_blocked_hostname(hostname: str) -> bool:
     return any(lower.endswith(s) for s in BLOCKED_HOSTNAME_SUFFIXES)
 
 
-class ScanRequest(BaseModel):
+def _normalize_target(v: str) -> str:
+    v = v.strip()
+    if not v:
+        raise ValueError("Target URL cannot be empty")
+
+    # Add scheme if missing
+    if not v.startswith(("http://", "https://")):
+        v = f"https://{v}"
+
+    parsed = urlparse(v)
+    if not parsed.hostname:
+        raise ValueError("Invalid URL: no hostname found")
+
+    if not HOSTNAME_RE.match(parsed.hostname):
+        raise ValueError("Invalid hostname format")
+
+    if _is_blocked_hostname(parsed.hostname):
+        raise ValueError("Scanning internal or reserved hostnames is not allowed")
+
+    return v
+
+
+class ScanOptions(BaseModel):
+    """Options shared by single and batch scan requests."""
+
+    use_cache: bool = True
+    profile: Literal["quick", "full"] = "full"
+    sections: list[str] | None = None  # explicit section list, overrides profile
+    # "compact": columnar subdomains, compressed per Accept-Encoding (see compact.py)
+    format: Literal["json", "compact"] = "json"
+    # TLS section engine: "fast" handshake probes or "full" sslyze; None = server default
+    tls_engine: Literal["fast", "full"] | None = None
+    # Run the change-detection probes so the report can seed a later rescan
+    fingerprint: bool = False
+
+    @field_validator("sections")
+    @classmethod
+    def validate_sections(cls, v: list[str] | None) -> list[str] | None:
+        if v is None:
+            return v
+        if not v:
+            raise ValueError("Sections list cannot be empty")
+        unknown = sorted(set(v) - TOOLS.keys())
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+        return v
+
+    def selected_sections(self) -> tuple[str, ...]:
+        return tuple(self.sections) if self.sections is not None else PROFILES[self.profile]
+
+    def engines(self) -> dict[str, str] | None:
+        return {"tls": self.tls_engine} if self.tls_engine is not None else None
+
+
+class ScanRequest(ScanOptions):
     target: str
+    # An earlier report for this target (or its fingerprints and section_times): rescan
+    previous: dict[str, Any] | None = None
+    priority: Literal["interactive", "bulk"] = "interactive"
+    # Seconds the whole scan may take; tools still running then are cut off
+    time_budget_s: float | None = Field(default=None, gt=0, le=TOTAL_TIMEOUT)
 
     @field_validator("target")
     @classmethod
     def validate_target(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("Target URL cannot be empty")
+        return _normalize_target(v)
 
-        # Add scheme if missing
-        if not v.startswith(("http://", "https://")):
-            v = f"https://{v}"
+    def scan_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for run_scan / stream_scan."""
+        return {
+            "target": self.target,
+            "use_cache": self.use_cache,
+            "lane": self.priority,
+            "budget": self.time_budget_s,
+            "sections": self.selected_sections(),
+            "previous": self.previous,
+            "engines": self.engines(),
+            "fingerprint": self.fingerprint,
+        }
 
-        parsed = urlparse(v)
-        if not parsed.hostname:
-            raise ValueError("Invalid URL: no hostname found")
+    def flight_key(self) -> tuple | None:
+        """Key under which identical scans are coalesced; None for rescans."""
+        if self.previous is not None:
+            return None
+        return (
+            self.target,
+            self.selected_sections(),
+            self.use_cache,
+            self.priority,
+            self.time_budget_s,
+            self.tls_engine,
+            self.fingerprint,
+        )
 
-        if not HOSTNAME_RE.match(parsed.hostname):
-            raise ValueError("Invalid hostname format")
 
-        if _is_blocked_hostname(parsed.hostname):
-            raise ValueError("Scanning internal or reserved hostnames is not allowed")
+class JobRequest(ScanRequest):
+    priority: Literal["interactive", "bulk"] = "bulk"
 
-        return v
+
+class BatchScanRequest(ScanOptions):
+    targets: list[str]
+    previous: list[dict[str, Any]] | None = None  # earlier reports, matched by "target"
+
+    @field_validator("targets")
+    @classmethod
+    def validate_targets(cls, v: list[str]) -> list[str]:
+        if not v:
+            raise ValueError("Targets list cannot be empty")
+        if len(v) > MAX_BATCH_TARGETS:
+            raise ValueError(f"At most {MAX_BATCH_TARGETS} targets per batch")
+        return [_normalize_target(t) for t in v]
 
 
 @app.get("/health")
@@ -59,10 +195,124 @@ async def health() -> dict:
     return {"status": "ok", "service": "site-intelligence-scanner"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Tool timing histograms, queue depths and event-loop lag for Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _compact_response(http_request: Request, content: dict[str, Any]) -> Response:
+    """``content`` (already compact-encoded) serialized and compressed for the client."""
+    encoding, body = compact.compress(
+        compact.dumps(content), http_request.headers.get("accept-encoding", "")
+    )
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+scan_flights = SingleFlight()  # ScanRequest.flight_key() -> in-flight /scan
+
+
 @app.post("/scan")
-async def scan(request: ScanRequest) -> dict:
-    try:
-        result = await run_scan(request.target)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
+async def scan(request: ScanRequest, http_request: Request) -> Any:
+    # Identical concurrent scans share one run and one admission slot
+    key = request.flight_key()
+    if key is None:
+        result = await _scan(request)
+    else:
+        result = await scan_flights.run(key, lambda: _scan(request))
+    if request.format == "compact":
+        return _compact_response(http_request, compact.encode_report(result))
+    return result
+
+
+async def _scan(request: ScanRequest) -> dict:
+    async with admission.admitted(request.priority):
+        try:
+            result = await run_scan(**request.scan_kwargs())
+            return result
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
+
+
+class AdmittedStream(StreamingResponse):
+    """StreamingResponse that gives its admission slot back however the response ends.
+
+    The body generator's own ``finally`` is not enough: Starlette never
+    starts it when the client disconnects before the headers are sent.
+    """
+
+    def __init__(self, content: AsyncIterator[str], lane: str, started: float, **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.lane = lane
+        self.started = started
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()  # stops the scan if the client left mid-way
+            finally:
+                admission.release(self.lane, self.started)
+
+
+@app.post("/scan/stream")
+async def scan_stream(request: ScanRequest) -> StreamingResponse:
+    """Stream scan events as NDJSON, one line per finished section."""
+    # Admit before the response starts so a full queue is still a plain 429
+    started = await admission.acquire(request.priority)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in stream_scan(**request.scan_kwargs()):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": f"Scan failed: {str(e)}"}) + "\n"
+
+    return AdmittedStream(events(), request.priority, started, media_type="application/x-ndjson")
+
+
+@app.post("/scan/batch")
+async def scan_batch(request: BatchScanRequest, http_request: Request) -> Any:
+    # A whole batch takes one bulk-lane slot; its scans share the tool budgets
+    async with admission.admitted("bulk"):
+        try:
+            batch = await run_batch_scan(
+                request.targets,
+                use_cache=request.use_cache,
+                sections=request.selected_sections(),
+                previous=request.previous,
+                engines=request.engines(),
+                fingerprint=request.fingerprint,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch scan failed: {str(e)}")
+    if request.format == "compact":
+        batch = {**batch, "results": [compact.encode_report(r) for r in batch["results"]]}
+        return _compact_response(http_request, batch)
+    return batch
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest) -> dict:
+    """Queue a scan and return its job id without waiting for it."""
+    return {"id": jobs.submit(request.scan_kwargs()), "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str, http_request: Request, wait: float = 0, format: Literal["json", "compact"] = "json"
+) -> Any:
+    """Job status and result; ``wait`` holds the request up to that many seconds for it to finish."""
+    job = await jobs.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if format == "compact":
+        for key in ("result", "partial"):
+            if key in job:
+                job[key] = compact.encode_report(job[key])
+        return _compact_response(http_request, job)
+    return job
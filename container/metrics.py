@@ -0,0 +1,195 @@
+"""In-process metrics exposed in the Prometheus text format on GET /metrics.
+
+No client library: histograms and counters are plain dicts keyed by label
+values, and gauges (queue depths, slot usage) are read from callbacks at
+scrape time so they never go stale.
+"""
+
+import asyncio
+import bisect
+import math
+from typing import Callable
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)  # seconds
+PARSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)  # seconds
+BYTES_BUCKETS = tuple(1024 * 4**i for i in range(10))  # 1 KiB .. 256 MiB
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)  # seconds
+LAG_INTERVAL = 0.5  # seconds between event-loop lag samples
+
+_registry: list["Histogram | Counter | Gauge"] = []
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for n, v in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+        _registry.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples come from ``read()``: {label values: value}."""
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...],
+        read: Callable[[], dict[tuple[str, ...], float]],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.read = read
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for values, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_labels(self.labels, values)} {_number(value)}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Tool runs and scans
+# ---------------------------------------------------------------------------
+
+TOOL_DURATION = Histogram(
+    "scanner_tool_duration_seconds", "Wall time of one tool run.", ("tool", "path"), DURATION_BUCKETS
+)
+TOOL_QUEUE = Histogram(
+    "scanner_tool_queue_seconds", "Time a tool run waited for a concurrency slot.", ("tool", "lane"),
+    DURATION_BUCKETS,
+)
+TOOL_TTFB = Histogram(
+    "scanner_tool_ttfb_seconds", "Time from tool start to its first stdout byte.", ("tool",),
+    DURATION_BUCKETS,
+)
+TOOL_PARSE = Histogram(
+    "scanner_tool_parse_seconds", "Time spent parsing one tool run's output.", ("tool",), PARSE_BUCKETS
+)
+TOOL_OUTPUT = Histogram(
+    "scanner_tool_output_bytes", "Bytes a tool wrote per run.", ("tool", "stream"), BYTES_BUCKETS
+)
+TOOL_CPU = Histogram(
+    "scanner_tool_cpu_seconds", "User plus system CPU time of a tool child.", ("tool",), DURATION_BUCKETS
+)
+TOOL_RSS = Histogram(
+    "scanner_tool_max_rss_bytes", "Peak resident set size of a tool child.", ("tool",), BYTES_BUCKETS
+)
+TOOL_RUNS = Counter(
+    "scanner_tool_runs_total", "Tool runs by outcome (ok, error, timeout, cached, coalesced).",
+    ("tool", "outcome"),
+)
+PAGE_FETCHES = Counter(
+    "scanner_page_fetches_total",
+    "Shared landing-page fetches by outcome (fetched, error, cached, coalesced).", ("outcome",),
+)
+SCAN_DURATION = Histogram(
+    "scanner_scan_duration_seconds", "Wall time of one scan.", ("lane",), DURATION_BUCKETS
+)
+
+
+def observe_tool(name: str, lane: str, timing: dict, error: str | None) -> None:
+    """Fold one run_tool timing record into the tool histograms."""
+    TOOL_DURATION.observe(timing["wall_ms"] / 1000, name, timing["path"])
+    TOOL_QUEUE.observe(timing["queue_ms"] / 1000, name, lane)
+    if timing["ttfb_ms"] is not None:
+        TOOL_TTFB.observe(timing["ttfb_ms"] / 1000, name)
+    if timing["parse_ms"] is not None:
+        TOOL_PARSE.observe(timing["parse_ms"] / 1000, name)
+    for stream in ("stdout", "stderr"):
+        if timing[f"{stream}_bytes"] is not None:
+            TOOL_OUTPUT.observe(timing[f"{stream}_bytes"], name, stream)
+    if timing["cpu_user_ms"] is not None:
+        TOOL_CPU.observe((timing["cpu_user_ms"] + timing["cpu_sys_ms"]) / 1000, name)
+    if timing["max_rss_kib"] is not None:
+        TOOL_RSS.observe(timing["max_rss_kib"] * 1024, name)
+    outcome = "timeout" if timing["timed_out"] else "error" if error else "ok"
+    TOOL_RUNS.inc(name, outcome)
+
+
+# ---------------------------------------------------------------------------
+# Event-loop lag
+# ---------------------------------------------------------------------------
+
+LOOP_LAG = Histogram(
+    "scanner_event_loop_lag_seconds", "How late a timer on the event loop fired.", (), LAG_BUCKETS
+)
+_last_lag = 0.0
+Gauge(
+    "scanner_event_loop_lag_last_seconds", "Most recent event-loop lag sample.", (),
+    lambda: {(): _last_lag},
+)
+
+
+async def monitor_event_loop(interval: float = LAG_INTERVAL) -> None:
+    """Sample event-loop lag forever: how late a ``sleep(interval)`` wakes up."""
+    global _last_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        _last_lag = max(0.0, loop.time() - started - interval)
+        LOOP_LAG.observe(_last_lag)
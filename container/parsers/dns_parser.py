@@ -1,24 +1,100 @@
-"""Parser for dnsx (ProjectDiscovery) — DNS resolution and CDN detection."""
+"""Parser for dnsx (ProjectDiscovery) — DNS resolution and CDN detection.
 
+Records are resolved in-process by dns_client (see ``run_async``); dnsx's
+CDN and ASN detection is then an optional enrichment from its helper.
+"""
+
+import asyncio
 import json
-import shlex
+import os
+import sys
 from urllib.parse import urlparse
 from typing import Any
 
+import dns_client
+import helpers
+from parsers import first_line
 
-def build_command(target: str) -> list[str]:
+CACHE_TTL = 5 * 60  # seconds
+
+# Long-lived dnsx fed one host per stdin line (see helpers.py)
+STREAM_COMMAND = [
+    "dnsx", "-json", "-a", "-aaaa", "-cname", "-ns", "-mx", "-resp", "-cdn", "-asn", "-silent", "-stream",
+]
+STREAM_TIMEOUT = 10  # seconds; dnsx prints nothing for hosts that do not resolve
+
+CDN_ENRICHMENT = os.environ.get("DNS_CDN_ENRICHMENT", "1") != "0"  # dnsx -cdn/-asn after run_async
+ENRICHMENT_WAIT = 3  # seconds run_async waits for dnsx once the records are in
+
+
+def input_key(target: str) -> str:
     parsed = urlparse(target)
-    host = parsed.hostname or target
-    safe_host = shlex.quote(host)
-    return [
-        "sh", "-c",
-        f"echo {safe_host} | dnsx -json -a -cname -ns -mx -resp -cdn -asn -silent",
-    ]
+    return parsed.hostname or target
 
 
-def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
-    result: dict[str, Any] = {
+def build_command(target: str) -> list[str]:
+    return ["dnsx", "-json", "-a", "-aaaa", "-cname", "-ns", "-mx", "-resp", "-cdn", "-asn", "-silent"]
+
+
+def build_stdin(target: str) -> str:
+    # dnsx reads hosts from stdin; piping it directly needs no shell
+    return input_key(target) + "\n"
+
+
+def stream_key(record: dict[str, Any]) -> str:
+    return record.get("host", "")
+
+
+async def run_async(target: str) -> dict[str, Any]:
+    """Resolve the host with the in-process stub resolver instead of forking dnsx.
+
+    When the dnsx helper is available it still runs alongside for CDN and
+    ASN detection, and its answer is merged if it arrives within
+    ENRICHMENT_WAIT seconds of the records.
+    """
+    module = sys.modules[__name__]
+    enrichment = None
+    if CDN_ENRICHMENT and helpers.supports(module):
+        enrichment = asyncio.ensure_future(helpers.query("dns", module, target))
+    try:
+        records = await dns_client.resolve(input_key(target))
+    except BaseException:
+        if enrichment is not None:
+            enrichment.cancel()
+        raise
+
+    result = _empty_result()
+    result["a_records"] = records["A"]
+    result["aaaa_records"] = records["AAAA"]
+    result["cname_records"] = records["CNAME"]
+    result["ns_records"] = records["NS"]
+    result["mx_records"] = records["MX"]
+    if enrichment is not None:
+        try:
+            extra = parse_output(await asyncio.wait_for(enrichment, ENRICHMENT_WAIT), "")
+        except (asyncio.TimeoutError, helpers.HelperUnavailable):
+            return result
+        for key in ("cdn_detected", "hosting_provider", "asn"):
+            if extra.get(key):
+                result[key] = extra[key]
+    return result
+
+
+# Line-streaming interface (see run_tool and parsers/first_line.py)
+MAX_OUTPUT_LINES = 100
+MAX_OUTPUT_BYTES = 1024 * 1024
+new_state = first_line.new_state
+feed_line = first_line.feed_line
+
+
+def finish(state: dict[str, Any], stderr: str) -> dict[str, Any]:
+    return parse_output(state["line"], stderr)
+
+
+def _empty_result() -> dict[str, Any]:
+    return {
         "a_records": [],
+        "aaaa_records": [],
         "cname_records": [],
         "ns_records": [],
         "mx_records": [],
@@ -26,6 +102,10 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
         "hosting_provider": "",
     }
 
+
+def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
+    result = _empty_result()
+
     try:
         for line in stdout.strip().splitlines():
             if not line.strip():
@@ -33,6 +113,7 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
             data = json.loads(line)
 
             result["a_records"] = data.get("a", []) or []
+            result["aaaa_records"] = data.get("aaaa", []) or []
             result["cname_records"] = data.get("cname", []) or []
             result["ns_records"] = data.get("ns", []) or []
             result["mx_records"] = data.get("mx", []) or []
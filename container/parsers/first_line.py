@@ -0,0 +1,18 @@
+"""Line-streaming hooks for tools that answer one input with one JSON line.
+
+dnsx and httpx print one JSON line per input, so ``run_tool`` only keeps the
+first non-empty line; the parser's MAX_OUTPUT_LINES / MAX_OUTPUT_BYTES still
+kill a child that keeps printing. A parser binds ``new_state`` and
+``feed_line`` from here and parses ``state["line"]`` in its own ``finish``.
+"""
+
+from typing import Any
+
+
+def new_state() -> dict[str, Any]:
+    return {"line": ""}
+
+
+def feed_line(state: dict[str, Any], line: str) -> None:
+    if not state["line"] and line.strip():
+        state["line"] = line
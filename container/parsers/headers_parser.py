@@ -1,10 +1,30 @@
-"""Parser for httpx (ProjectDiscovery) — HTTP probing and header analysis."""
+"""Parser for httpx (ProjectDiscovery) — HTTP probing and header analysis.
+
+Normally the section is built from the shared landing-page fetch (see
+``analyze_page`` and fetch.py); httpx is the fallback.
+"""
 
 import json
-import shlex
+import os
 from urllib.parse import urlparse
 from typing import Any
 
+from parsers import first_line
+
+CACHE_TTL = 10 * 60  # seconds
+# ProjectDiscovery's Go httpx, installed under its own name: the httpx Python
+# package (the shared fetch's client) ships a console script called httpx
+HTTPX_BIN = os.environ.get("HTTPX_BIN", "/usr/local/bin/pd-httpx")
+
+# Long-lived httpx fed one URL per stdin line (see helpers.py); -probe makes
+# it emit a record for failed probes too, so waiters never sit out the timeout
+STREAM_COMMAND = [
+    HTTPX_BIN, "-json", "-silent", "-title", "-server", "-tech-detect", "-status-code",
+    "-follow-redirects", "-include-response-header", "-include-chain", "-location",
+    "-stream", "-probe",
+]
+STREAM_TIMEOUT = 30  # seconds
+
 SECURITY_HEADER_KEYS = [
     "strict-transport-security",
     "content-security-policy",
@@ -16,18 +36,35 @@ SECURITY_HEADER_KEYS = [
 ]
 
 
-def build_command(target: str) -> list[str]:
+def input_key(target: str) -> str:
     parsed = urlparse(target)
     host = parsed.hostname or target
     scheme = parsed.scheme or "https"
-    url = f"{scheme}://{host}"
-    safe_url = shlex.quote(url)
+    return f"{scheme}://{host}"
+
+
+def build_command(target: str) -> list[str]:
     return [
-        "sh", "-c",
-        f"echo {safe_url} | httpx -json -silent -title -server -tech-detect -status-code -follow-redirects -include-response-header -include-chain -location",
+        HTTPX_BIN, "-json", "-silent", "-title", "-server", "-tech-detect", "-status-code",
+        "-follow-redirects", "-include-response-header", "-include-chain", "-location",
     ]
 
 
+def build_stdin(target: str) -> str:
+    # httpx reads URLs from stdin; piping it directly needs no shell
+    return input_key(target) + "\n"
+
+
+def _add_header(headers: dict[str, str], key: str, value: str) -> None:
+    key = key.strip().lower()
+    value = value.strip()
+    # If duplicate header, append with semicolon
+    if key in headers:
+        headers[key] = headers[key] + "; " + value
+    else:
+        headers[key] = value
+
+
 def _parse_raw_headers(raw: str) -> dict[str, str]:
     """Parse raw HTTP response header string into a lowercase dict."""
     headers: dict[str, str] = {}
@@ -37,18 +74,12 @@ def _parse_raw_headers(raw: str) -> dict[str, str]:
             continue
         if ":" in line:
             key, _, value = line.partition(":")
-            key = key.strip().lower()
-            value = value.strip()
-            # If duplicate header, append with semicolon
-            if key in headers:
-                headers[key] = headers[key] + "; " + value
-            else:
-                headers[key] = value
+            _add_header(headers, key, value)
     return headers
 
 
-def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
-    result: dict[str, Any] = {
+def _empty_result() -> dict[str, Any]:
+    return {
         "server": "",
         "security_headers": {k: "missing" for k in SECURITY_HEADER_KEYS},
         "all_headers": {},
@@ -56,6 +87,45 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
         "final_url": "",
     }
 
+
+def analyze_page(target: str, page: dict[str, Any]) -> dict[str, Any]:
+    """Build the section from the shared landing-page fetch instead of running httpx."""
+    result = _empty_result()
+    if page["error"]:
+        return result  # as httpx -probe reports an unreachable site
+    headers: dict[str, str] = {}
+    for key, value in page["headers"]:
+        _add_header(headers, key, value)
+    result["server"] = headers.get("server", "")
+    result["all_headers"] = headers
+    for key in SECURITY_HEADER_KEYS:
+        result["security_headers"][key] = "present" if headers.get(key) else "missing"
+    result["redirect_chain"] = [
+        {"url": hop["url"], "status_code": hop["status_code"], "location": hop["location"]}
+        for hop in page["chain"]
+    ]
+    result["final_url"] = page["final_url"]
+    return result
+
+
+def stream_key(record: dict[str, Any]) -> str:
+    return record.get("input", "")
+
+
+# Line-streaming interface (see run_tool and parsers/first_line.py)
+MAX_OUTPUT_LINES = 100
+MAX_OUTPUT_BYTES = 4 * 1024 * 1024
+new_state = first_line.new_state
+feed_line = first_line.feed_line
+
+
+def finish(state: dict[str, Any], stderr: str) -> dict[str, Any]:
+    return parse_output(state["line"], stderr)
+
+
+def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
+    result = _empty_result()
+
     technologies_from_httpx: list[dict[str, Any]] = []
 
     try:
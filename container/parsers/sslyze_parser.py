@@ -4,15 +4,78 @@ import json
 from urllib.parse import urlparse
 from typing import Any
 
+CACHE_TTL = 60 * 60  # seconds
 
-def build_command(target: str) -> list[str]:
+# Worker processes import these once (see workers.py)
+WARM_IMPORTS = ("sslyze",)
+
+# The only sslyze scan commands parse_data reads
+IN_PROCESS_SCAN_COMMANDS = (
+    "certificate_info",
+    "tls_1_0_cipher_suites",
+    "tls_1_1_cipher_suites",
+    "tls_1_2_cipher_suites",
+    "tls_1_3_cipher_suites",
+)
+
+
+def input_key(target: str) -> str:
     parsed = urlparse(target)
     host = parsed.hostname or target
     port = parsed.port or 443
-    return ["python", "-m", "sslyze", "--json_out=-", f"{host}:{port}"]
+    return f"{host}:{port}"
+
+
+def build_command(target: str) -> list[str]:
+    return ["python", "-m", "sslyze", "--json_out=-", input_key(target)]
+
+
+def warm_up() -> None:
+    import sslyze  # noqa: F401
+    import sslyze.json.json_output  # noqa: F401
+
+
+def run_in_process(target: str) -> dict[str, Any]:
+    """Scan ``target`` through sslyze's Scanner API inside a warm worker.
+
+    Returns the same shape as parse_output without the JSON string round-trip.
+    """
+    from sslyze import Scanner, ScanCommand, ServerNetworkLocation, ServerScanRequest
+    from sslyze.errors import ServerHostnameCouldNotBeResolved
+    from sslyze.json.json_output import ServerScanResultAsJson
+
+    host, _, port = input_key(target).rpartition(":")
+    try:
+        location = ServerNetworkLocation(hostname=host, port=int(port))
+    except ServerHostnameCouldNotBeResolved as e:
+        result = parse_data({})
+        result["_error"] = str(e)[:500]
+        return result
+
+    scanner = Scanner()
+    scanner.queue_scans([
+        ServerScanRequest(
+            server_location=location,
+            scan_commands={ScanCommand(c) for c in IN_PROCESS_SCAN_COMMANDS},
+        )
+    ])
+    server_results = [
+        ServerScanResultAsJson.model_validate(r).model_dump(mode="json")
+        for r in scanner.get_results()
+    ]
+    return parse_data({"server_scan_results": server_results})
 
 
 def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
+    try:
+        data = json.loads(stdout)
+    except json.JSONDecodeError:
+        data = None
+    return parse_data(data, stderr)
+
+
+def parse_data(data: Any, stderr: str = "") -> dict[str, Any]:
+    """Extract protocols, cipher suites and leaf certificate from sslyze JSON data."""
     result: dict[str, Any] = {
         "protocols": [],
         "cipher_suites": [],
@@ -20,13 +83,18 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
     }
 
     try:
-        data = json.loads(stdout)
         server_results = data.get("server_scan_results", [])
         if not server_results:
             return result
 
         scan = server_results[0]
-        commands = scan.get("scan_result", {})
+        status = scan.get("connectivity_status", "COMPLETED")
+        if status != "COMPLETED":
+            # No TLS connection at all: an error, not a server without protocols
+            trace = (scan.get("connectivity_error_trace") or "").strip()
+            result["_error"] = (trace.splitlines()[-1] if trace else f"connectivity {status}")[:500]
+            return result
+        commands = scan.get("scan_result") or {}
 
         # Extract supported TLS protocols
         protocol_map = {
@@ -37,8 +105,9 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
         }
 
         for field_key, proto_name in protocol_map.items():
-            proto_data = commands.get(field_key, {})
-            accepted = proto_data.get("result", {}).get("accepted_cipher_suites", [])
+            # Commands that were not scheduled or errored have a null result
+            proto_data = commands.get(field_key) or {}
+            accepted = (proto_data.get("result") or {}).get("accepted_cipher_suites", [])
             if accepted:
                 result["protocols"].append(proto_name)
                 for cs in accepted:
@@ -47,7 +116,7 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
                         result["cipher_suites"].append(suite_name)
 
         # Extract certificate info
-        cert_info = commands.get("certificate_info", {}).get("result", {})
+        cert_info = (commands.get("certificate_info") or {}).get("result") or {}
         deployments = cert_info.get("certificate_deployments", [])
         if deployments:
             leaf_chain = deployments[0].get("received_certificate_chain", [])
@@ -56,8 +125,8 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
                 result["certificate"]["issuer"] = str(leaf.get("issuer", {}).get("rfc4514_string", ""))
                 result["certificate"]["expiry"] = str(leaf.get("not_valid_after", ""))
                 san = leaf.get("subject_alternative_name", {})
-                result["certificate"]["san"] = san.get("dns", [])
-    except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                result["certificate"]["san"] = san.get("dns_names", san.get("dns", []))
+    except (AttributeError, KeyError, IndexError, TypeError):
         if stderr:
             result["_error"] = stderr[:500]
 
@@ -1,11 +1,19 @@
 """Parser for subfinder (ProjectDiscovery) — passive subdomain enumeration."""
 
 import json
+import os
 import re
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
 from urllib.parse import urlparse
 from typing import Any
 
+CACHE_TTL = 6 * 60 * 60  # seconds
+
+# Output caps for the line-streaming path (see run_tool); past either one the
+# child is killed and the section is marked truncated
+MAX_OUTPUT_LINES = int(os.environ.get("SUBFINDER_MAX_LINES", "50000"))
+MAX_OUTPUT_BYTES = int(os.environ.get("SUBFINDER_MAX_BYTES", str(16 * 1024 * 1024)))
+
 
 # ---------------------------------------------------------------------------
 # CF-aware subdomain classification
@@ -87,53 +95,159 @@ CATEGORIES = [
 DEFAULT_CATEGORY = ("Standard", "General", "low")
 
 
+def _build_matcher(
+    categories: list[tuple[str, str, str, list[str]]],
+) -> tuple[list[dict[str, int]], list[int], list[int]]:
+    """Build an Aho-Corasick automaton over every category keyword.
+
+    Returns (goto, fail, best) indexed by node. ``best[node]`` is the lowest
+    category index of any keyword ending at that node or along its failure
+    chain, so one left-to-right pass yields the first matching category.
+    """
+    no_match = len(categories)
+    goto: list[dict[str, int]] = [{}]
+    best = [no_match]
+    for index, (_, _, _, keywords) in enumerate(categories):
+        for kw in keywords:
+            node = 0
+            for ch in kw:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    best.append(no_match)
+                    nxt = goto[node][ch] = len(goto) - 1
+                node = nxt
+            best[node] = min(best[node], index)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        node = queue.popleft()
+        for ch, child in goto[node].items():
+            queue.append(child)
+            f = fail[node]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            target = goto[f].get(ch, 0)
+            fail[child] = target if target != child else 0
+            best[child] = min(best[child], best[fail[child]])
+    return goto, fail, best
+
+
+# Built once at import; keywords never contain ".", "-" or "_", so a match can
+# never span two labels and the prefix is scanned as a single string
+_GOTO, _FAIL, _BEST = _build_matcher(CATEGORIES)
+_NO_MATCH = len(CATEGORIES)
+
+
 def _classify_one(subdomain: str, base_domain: str) -> tuple[str, str, str]:
-    """Return (category, cf_opportunity, interest) for a single subdomain."""
+    """Return (category, cf_opportunity, interest) for a single subdomain.
+
+    The first category in CATEGORIES with any keyword inside any label wins.
+    """
     # Strip the base domain to get just the prefix labels
     prefix = subdomain
     if subdomain.endswith("." + base_domain):
         prefix = subdomain[: -(len(base_domain) + 1)]
 
-    labels = prefix.lower().replace("-", ".").replace("_", ".").split(".")
+    goto, fail, best = _GOTO, _FAIL, _BEST
+    node = 0
+    found = _NO_MATCH
+    for ch in prefix.lower():
+        nxt = goto[node].get(ch)
+        while nxt is None and node:
+            node = fail[node]
+            nxt = goto[node].get(ch)
+        node = nxt or 0
+        if best[node] < found:
+            found = best[node]
+            if found == 0:
+                break
 
-    for cat_name, cf_opp, interest, keywords in CATEGORIES:
-        for kw in keywords:
-            for label in labels:
-                if kw == label or kw in label:
-                    return cat_name, cf_opp, interest
-    return DEFAULT_CATEGORY
+    if found == _NO_MATCH:
+        return DEFAULT_CATEGORY
+    cat_name, cf_opp, interest, _ = CATEGORIES[found]
+    return cat_name, cf_opp, interest
+
+
+_DIGITS = re.compile(r"\d+")
+
+
+def _stem(label: str, stem_of: dict[str, str]) -> str:
+    """``label`` (or a dotted path) with digit runs collapsed to ``*``, cached."""
+    stem = stem_of.get(label)
+    if stem is None:
+        stem = stem_of[label] = _DIGITS.sub("*", label)
+    return stem
 
 
 def _detect_groups(classified: list[dict], base_domain: str, min_group: int = 3) -> list[dict]:
-    """Find prefix clusters: 3+ subdomains sharing a common prefix pattern."""
-    groups: list[dict] = []
+    """Find clusters of 3+ same-category subdomains, keyed on reversed labels.
+
+    Each host is split once into its first label and parent path and bucketed
+    by (parent, category); stems with digit runs collapsed to ``*`` are cached
+    per distinct label and parent path. Hosts under the same parent form
+    shared-parent groups (``*.eu.api.example.com``), hosts whose stems match
+    form numeric-stem groups (``node-*.example.com``), and each parent's host
+    count is rolled up its ancestors (``eu.api`` -> ``api``). Work is linear
+    in the number of hosts plus distinct parent paths.
+
+    The numeric-stem part alone is as fast as one regex substitution per
+    host; the shared-parent groups, which the regex never found, cost about
+    a third on top (see benchmarks.bench_classify).
+    """
+    suffix = "." + base_domain
+    cut = -len(suffix)
+    stem_of: dict[str, str] = {}
+    by_parent: defaultdict[tuple[str, str], list[str]] = defaultdict(list)  # (path, category) -> hosts
+    by_stem: defaultdict[tuple[str, str], list[str]] = defaultdict(list)  # (stem, category) -> hosts
 
-    # Bucket subdomains by category, then by second-level prefix
-    by_category: dict[str, list[dict]] = defaultdict(list)
     for item in classified:
-        by_category[item["category"]].append(item)
-
-    for category, items in by_category.items():
-        # Extract the "stem" of each subdomain: strip trailing digits/hyphens
-        stems: dict[str, list[dict]] = defaultdict(list)
-        for item in items:
-            sub = item["subdomain"]
-            prefix = sub
-            if sub.endswith("." + base_domain):
-                prefix = sub[: -(len(base_domain) + 1)]
-            # Collapse trailing digits to create a stem  e.g. node-1 -> node-*
-            stem = re.sub(r"[\d]+", "*", prefix)
-            if stem != prefix:  # Only group if there was a numeric component
-                stems[stem].append(item)
-
-        for stem, members in stems.items():
-            if len(members) >= min_group:
-                groups.append({
-                    "prefix": stem + "." + base_domain,
-                    "count": len(members),
-                    "category": category,
-                    "members": [m["subdomain"] for m in members],
-                })
+        sub = item["subdomain"]
+        category = item["category"]
+        leaf, _, above = (sub[:cut] if sub.endswith(suffix) else sub).partition(".")
+        by_parent[above, category].append(sub)
+
+        stem = stem_of.get(leaf) or _stem(leaf, stem_of)
+        parent = stem_of.get(above) or _stem(above, stem_of)
+        if stem != leaf or parent != above:
+            by_stem[f"{stem}.{parent}" if parent else stem, category].append(sub)
+
+    below: Counter[str] = Counter()  # path -> hosts at any depth below it
+    for (path, _), hosts in by_parent.items():
+        while path:
+            below[path] += len(hosts)
+            path = path.partition(".")[2]
+
+    groups: list[dict] = []
+    grouped: set[str] = set()
+
+    for (stem, category), members in by_stem.items():
+        if len(members) >= min_group:
+            groups.append({
+                "prefix": stem + suffix,
+                "count": len(members),
+                "category": category,
+                "kind": "numeric",
+                "members": members,
+            })
+            grouped.update(members)
+
+    # Shared parents; hosts already in a numeric group are left out so no
+    # host is listed twice, and the base domain itself is not a group
+    for (path, category), hosts in by_parent.items():
+        if not path or len(hosts) < min_group:
+            continue
+        members = [h for h in hosts if h not in grouped]
+        if len(members) >= min_group:
+            groups.append({
+                "prefix": f"*.{path}{suffix}",
+                "count": len(members),
+                "category": category,
+                "kind": "parent",
+                "hosts": below[path],
+                "members": members,
+            })
 
     return groups
 
@@ -183,44 +297,53 @@ def classify_subdomains(
 # subfinder command + parser
 # ---------------------------------------------------------------------------
 
-def build_command(target: str) -> list[str]:
+def input_key(target: str) -> str:
     parsed = urlparse(target)
     host = parsed.hostname or target
     # Extract the registrable domain for subdomain enumeration
     parts = host.split(".")
-    domain = ".".join(parts[-2:]) if len(parts) >= 2 else host
-    return ["subfinder", "-d", domain, "-json", "-silent"]
+    return ".".join(parts[-2:]) if len(parts) >= 2 else host
 
 
-def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
+def build_command(target: str) -> list[str]:
+    return ["subfinder", "-d", input_key(target), "-json", "-silent"]
+
+
+def new_state() -> dict[str, Any]:
+    return {"seen": set(), "subdomains": [], "sources": {}}
+
+
+def feed_line(state: dict[str, Any], line: str) -> None:
+    """Consume one line of subfinder output as it arrives."""
+    if not line.strip():
+        return
+    seen = state["seen"]
+    try:
+        data = json.loads(line)
+        host = data.get("host", "").strip().lower()
+        source = data.get("source", "unknown")
+        if host and host not in seen:
+            seen.add(host)
+            state["subdomains"].append(host)
+            state["sources"][host] = source
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError):
+        # Fallback: some versions just output one hostname per line
+        host = line.strip().lower()
+        if host and host not in seen and "." in host:
+            seen.add(host)
+            state["subdomains"].append(host)
+
+
+def finish(state: dict[str, Any], stderr: str) -> dict[str, Any]:
     result: dict[str, Any] = {
-        "subdomains": [],
-        "sources": {},
+        "subdomains": state["subdomains"],
+        "sources": state["sources"],
         "count": 0,
     }
 
-    if not stdout.strip():
+    if not result["subdomains"]:
         return result
 
-    seen = set()
-    for line in stdout.strip().splitlines():
-        if not line.strip():
-            continue
-        try:
-            data = json.loads(line)
-            host = data.get("host", "").strip().lower()
-            source = data.get("source", "unknown")
-            if host and host not in seen:
-                seen.add(host)
-                result["subdomains"].append(host)
-                result["sources"][host] = source
-        except (json.JSONDecodeError, KeyError, TypeError):
-            # Fallback: some versions just output one hostname per line
-            host = line.strip().lower()
-            if host and host not in seen and "." in host:
-                seen.add(host)
-                result["subdomains"].append(host)
-
     result["subdomains"].sort()
     result["count"] = len(result["subdomains"])
 
@@ -239,3 +362,10 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
         result.update(classification)
 
     return result
+
+
+def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
+    state = new_state()
+    for line in stdout.splitlines():
+        feed_line(state, line)
+    return finish(state, stderr)
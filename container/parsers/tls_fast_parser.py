@@ -0,0 +1,19 @@
+"""Fast TLS engine — concurrent stdlib handshakes (see tls_client.py) in sslyze_parser's shape."""
+
+from typing import Any
+
+import tls_client
+from parsers import sslyze_parser
+
+CACHE_TTL = 60 * 60  # seconds
+
+# Same input as the full engine; the subprocess fallback is a full sslyze run
+input_key = sslyze_parser.input_key
+build_command = sslyze_parser.build_command
+parse_output = sslyze_parser.parse_output
+
+
+async def run_async(target: str) -> dict[str, Any]:
+    """Probe each protocol version and the weak cipher classes with one handshake apiece."""
+    host, _, port = input_key(target).rpartition(":")
+    return await tls_client.scan(host, int(port))
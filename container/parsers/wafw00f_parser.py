@@ -4,15 +4,107 @@ import json
 from typing import Any
 
 COMMAND = ["wafw00f", "-a", "-o-", "-f", "json"]
+CACHE_TTL = 30 * 60  # seconds
+
+# Worker processes import these once (see workers.py)
+WARM_IMPORTS = ("wafw00f",)
+
+# WAFW00F subclass answering its normal request from the shared fetch (worker processes only)
+_captured_engine: Any = None
+
+
+def input_key(target: str) -> str:
+    return target
 
 
 def build_command(target: str) -> list[str]:
     return COMMAND + [target]
 
 
+def warm_up() -> None:
+    # Importing wafw00f.main loads every detection plugin
+    import wafw00f.main  # noqa: F401
+
+
+def run_in_process(target: str) -> dict[str, Any]:
+    """Run wafw00f's detection engine in a warm worker (same as ``wafw00f -a``)."""
+    from wafw00f.lib.evillib import urlParser
+    from wafw00f.main import WAFW00F, buildResultRecord
+
+    parsed = urlParser(target)
+    if parsed is None:
+        return parse_data(None, f"The url {target} is not well formed")
+
+    attacker = WAFW00F(target, path=parsed[2], followredirect=True)
+    if attacker.rq is None:
+        return parse_data(None, f"Site {parsed[0]} appears to be down")
+
+    records = [buildResultRecord(target, waf) for waf in attacker.identwaf(findall=True)]
+    records.append(buildResultRecord(target, "generic" if attacker.genericdetect() else None))
+    return parse_data(records)
+
+
+def _response(page: dict[str, Any]) -> Any:
+    """A requests.Response holding the captured landing page, as wafw00f's matchers read it."""
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+
+    response = Response()
+    response.status_code = page["status_code"]
+    response.reason = page["reason"]
+    response.url = page["final_url"]
+    response._content = page["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    headers: CaseInsensitiveDict = CaseInsensitiveDict()
+    for name, value in page["headers"]:
+        # Repeated headers are comma-joined, as requests does (Set-Cookie matching relies on it)
+        headers[name] = f"{headers[name]}, {value}" if name in headers else value
+    response.headers = headers
+    return response
+
+
+def analyze_page(target: str, page: dict[str, Any]) -> dict[str, Any]:
+    """``run_in_process`` with the normal request taken from the shared fetch.
+
+    Only wafw00f's attack and no-User-Agent probes go to the network.
+    """
+    global _captured_engine
+    from wafw00f.lib.evillib import urlParser
+    from wafw00f.main import WAFW00F, buildResultRecord
+
+    if _captured_engine is None:
+        class CapturedWAFW00F(WAFW00F):
+            def __init__(self, captured: Any, *args: Any, **kwargs: Any) -> None:
+                self._captured = captured  # before WAFW00F.__init__ makes its normal request
+                super().__init__(*args, **kwargs)
+
+            def normalRequest(self) -> Any:
+                return self._captured
+
+        _captured_engine = CapturedWAFW00F
+
+    parsed = urlParser(target)
+    if parsed is None:
+        return parse_data(None, f"The url {target} is not well formed")
+    if page["error"]:
+        return parse_data(None, f"Site {parsed[0]} appears to be down")
+
+    attacker = _captured_engine(_response(page), target, path=parsed[2], followredirect=True)
+    records = [buildResultRecord(target, waf) for waf in attacker.identwaf(findall=True)]
+    records.append(buildResultRecord(target, "generic" if attacker.genericdetect() else None))
+    return parse_data(records)
+
+
 def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
     try:
         data = json.loads(stdout)
+    except json.JSONDecodeError:
+        data = None
+    return parse_data(data, stderr)
+
+
+def parse_data(data: Any, stderr: str = "") -> dict[str, Any]:
+    try:
         if isinstance(data, list) and len(data) > 0:
             entry = data[0]
             firewall = entry.get("firewall", "")
@@ -22,7 +114,7 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
                 "provider": firewall if detected else None,
                 "details": entry,
             }
-    except (json.JSONDecodeError, IndexError, KeyError):
+    except (AttributeError, IndexError, KeyError):
         pass
 
     return {"detected": False, "provider": None, "details": {"raw_stderr": stderr[:500]}}
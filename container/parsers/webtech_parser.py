@@ -3,16 +3,82 @@
 import json
 from typing import Any
 
+CACHE_TTL = 30 * 60  # seconds
+
+# Worker processes import these once (see workers.py)
+WARM_IMPORTS = ("webtech",)
+
+# WebTech instance holding the loaded Wappalyzer database (worker processes only)
+_engine: Any = None
+
+
+def input_key(target: str) -> str:
+    return target
+
 
 def build_command(target: str) -> list[str]:
     return ["webtech", "-u", target]
 
 
+def warm_up() -> None:
+    global _engine
+    if _engine is None:
+        from webtech import WebTech
+
+        _engine = WebTech(options={"json": True})
+        _engine.auto_fallback = True  # as the CLI does
+
+
+def run_in_process(target: str) -> list[dict[str, Any]]:
+    """Fingerprint ``target`` with the worker's already-loaded WebTech engine."""
+    from webtech.utils import ConnectionException, WrongContentTypeException
+
+    warm_up()
+    try:
+        report = _engine.start_from_url(target)
+    except (ConnectionException, WrongContentTypeException, ValueError):
+        return []
+    return parse_data(report)
+
+
+def analyze_page(target: str, page: dict[str, Any]) -> list[dict[str, Any]]:
+    """Fingerprint the shared landing-page fetch instead of fetching ``target`` again."""
+    from webtech.target import Target
+
+    warm_up()
+    headers: dict[str, tuple[str, str]] = {}  # lowercase name -> (value, name), as webtech keeps them
+    cookies: dict[str, str] = {}
+    for name, value in page["headers"]:
+        key = name.lower()
+        headers[key] = (f"{headers[key][0]}, {value}", name) if key in headers else (value, name)
+        if key == "set-cookie":
+            cookie_name, _, cookie_value = value.split(";", 1)[0].partition("=")
+            cookies[cookie_name.strip()] = cookie_value.strip()
+    # webtech only fingerprints HTML (and fails the same way on a dead site)
+    if page["error"] or "text/html" not in headers.get("content-type", ("", ""))[0]:
+        return []
+
+    fetched = Target()
+    fetched.data["url"] = target
+    fetched.data["html"] = page["body"]
+    fetched.data["headers"] = headers
+    fetched.data["cookies"] = cookies
+    fetched.parse_html_page()
+    return parse_data(_engine.perform(fetched))
+
+
 def parse_output(stdout: str, stderr: str) -> list[dict[str, Any]]:
+    try:
+        data = json.loads(stdout)
+    except json.JSONDecodeError:
+        return _parse_text(stdout)
+    return parse_data(data)
+
+
+def parse_data(data: Any) -> list[dict[str, Any]]:
     technologies: list[dict[str, Any]] = []
 
     try:
-        data = json.loads(stdout)
         tech_list = data.get("tech", [])
         # webtech may return tech as a list of dicts or a dict
         if isinstance(tech_list, dict):
@@ -39,16 +105,22 @@ def parse_output(stdout: str, stderr: str) -> list[dict[str, Any]]:
                         "version": None,
                         "confidence": None,
                     })
-    except (json.JSONDecodeError, KeyError, AttributeError):
-        # Fallback: try line-by-line parsing of non-JSON output
-        for line in stdout.strip().splitlines():
-            line = line.strip("- \t")
-            if line and not line.startswith(("{", "[", "Target", "http")):
-                technologies.append({
-                    "name": line,
-                    "category": "Unknown",
-                    "version": None,
-                    "confidence": None,
-                })
+    except (KeyError, AttributeError):
+        pass
+
+    return technologies
+
 
+def _parse_text(stdout: str) -> list[dict[str, Any]]:
+    """Fallback: try line-by-line parsing of non-JSON output."""
+    technologies: list[dict[str, Any]] = []
+    for line in stdout.strip().splitlines():
+        line = line.strip("- \t")
+        if line and not line.startswith(("{", "[", "Target", "http")):
+            technologies.append({
+                "name": line,
+                "category": "Unknown",
+                "version": None,
+                "confidence": None,
+            })
     return technologies
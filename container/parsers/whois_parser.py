@@ -4,14 +4,74 @@ import re
 from urllib.parse import urlparse
 from typing import Any
 
+import whois_client
 
-def build_command(target: str) -> list[str]:
+CACHE_TTL = 6 * 60 * 60  # seconds
+
+
+def input_key(target: str) -> str:
     parsed = urlparse(target)
     host = parsed.hostname or target
     # Extract the registrable domain (last two parts) for WHOIS
     parts = host.split(".")
-    domain = ".".join(parts[-2:]) if len(parts) >= 2 else host
-    return ["whois", domain]
+    return ".".join(parts[-2:]) if len(parts) >= 2 else host
+
+
+def build_command(target: str) -> list[str]:
+    return ["whois", input_key(target)]
+
+
+async def run_async(target: str) -> dict[str, Any]:
+    """Look the domain up over port 43 directly instead of via the CLI."""
+    return parse_output(await whois_client.lookup(input_key(target)), "")
+
+
+# Field patterns (matched case-insensitively at the start of a line), in
+# priority order within each field. The first line that matches a field wins.
+FIELD_PATTERNS: dict[str, list[str]] = {
+    "registrar": [
+        r"registrar\s*:",
+        r"registrar name\s*:",
+        r"sponsoring registrar\s*:",
+    ],
+    "creation_date": [
+        r"creat(?:ion|ed)\s*date\s*:",
+        r"registration\s*date\s*:",
+    ],
+    "expiry_date": [
+        r"(?:registry\s*)?expir(?:y|ation)\s*date\s*:",
+        r"paid-till\s*:",
+        r"registrar\s*registration\s*expiration\s*date\s*:",  # registrar record of a thin registry
+    ],
+    "updated_date": [
+        r"updated?\s*date\s*:",
+        r"last[\s-]*(?:updated?|modified)\s*:",
+    ],
+    "registrant_org": [
+        r"registrant\s*organi[sz]ation\s*:",
+        r"registrant\s*:",
+        r"org(?:anization)?\s*:",
+    ],
+    # Collected on every matching line rather than first-wins
+    "nameservers": [r"name\s*server\s*:"],
+    "status": [r"(?:domain\s*)?status\s*:"],
+}
+
+
+def _build_dispatcher(field_patterns: dict[str, list[str]]) -> tuple[re.Pattern, dict[str, str]]:
+    """Compile every pattern into one alternation; each branch captures its
+    value in a named group that maps back to the field."""
+    branches = []
+    group_field: dict[str, str] = {}
+    for field, patterns in field_patterns.items():
+        for i, pattern in enumerate(patterns):
+            group = f"{field}_{i}"
+            group_field[group] = field
+            branches.append(f"{pattern}\\s*(?P<{group}>.+)")
+    return re.compile("|".join(branches), re.IGNORECASE), group_field
+
+
+_DISPATCH, _GROUP_FIELD = _build_dispatcher(FIELD_PATTERNS)
 
 
 def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
@@ -28,60 +88,27 @@ def parse_output(stdout: str, stderr: str) -> dict[str, Any]:
     if not stdout.strip():
         return result
 
-    lines = stdout.strip().splitlines()
-
-    # Common WHOIS field patterns (case-insensitive)
-    patterns = {
-        "registrar": [
-            r"(?i)registrar\s*:\s*(.+)",
-            r"(?i)registrar name\s*:\s*(.+)",
-            r"(?i)sponsoring registrar\s*:\s*(.+)",
-        ],
-        "creation_date": [
-            r"(?i)creat(?:ion|ed)\s*date\s*:\s*(.+)",
-            r"(?i)registration\s*date\s*:\s*(.+)",
-        ],
-        "expiry_date": [
-            r"(?i)(?:registry\s*)?expir(?:y|ation)\s*date\s*:\s*(.+)",
-            r"(?i)paid-till\s*:\s*(.+)",
-        ],
-        "updated_date": [
-            r"(?i)updated?\s*date\s*:\s*(.+)",
-            r"(?i)last[\s-]*(?:updated?|modified)\s*:\s*(.+)",
-        ],
-        "registrant_org": [
-            r"(?i)registrant\s*organi[sz]ation\s*:\s*(.+)",
-            r"(?i)registrant\s*:\s*(.+)",
-            r"(?i)org(?:anization)?\s*:\s*(.+)",
-        ],
-    }
-
-    for line in lines:
+    for line in stdout.strip().splitlines():
         line = line.strip()
         if not line or line.startswith("%") or line.startswith("#"):
             continue
 
-        for field, regexes in patterns.items():
-            if result[field]:
-                continue
-            for regex in regexes:
-                match = re.match(regex, line)
-                if match:
-                    result[field] = match.group(1).strip()
-                    break
-
-        # Nameservers
-        ns_match = re.match(r"(?i)name\s*server\s*:\s*(.+)", line)
-        if ns_match:
-            ns = ns_match.group(1).strip().lower().rstrip(".")
+        match = _DISPATCH.match(line)
+        if match is None:
+            continue
+        group = match.lastgroup
+        field = _GROUP_FIELD[group]
+        value = match.group(group).strip()
+
+        if field == "nameservers":
+            ns = value.lower().rstrip(".")
             if ns and ns not in result["nameservers"]:
                 result["nameservers"].append(ns)
-
-        # Domain status
-        status_match = re.match(r"(?i)(?:domain\s*)?status\s*:\s*(.+)", line)
-        if status_match:
-            s = status_match.group(1).strip().split()[0]  # Take first word (e.g., clientTransferProhibited)
+        elif field == "status":
+            s = value.split()[0]  # Take first word (e.g., clientTransferProhibited)
             if s and s not in result["status"] and len(result["status"]) < 10:
                 result["status"].append(s)
+        elif not result[field]:
+            result[field] = value
 
     return result
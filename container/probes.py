@@ -0,0 +1,123 @@
+"""Cheap change-detection probes used to fingerprint a target between scans.
+
+Three fingerprints, all from stdlib calls on the event loop:
+
+* ``dns``  — canonical name and sorted addresses from one getaddrinfo call
+* ``tls``  — SHA-256 of the leaf certificate from a single handshake
+* ``http`` — status, validators (ETag, Last-Modified) and other stable
+  response headers of a HEAD / sent over that same connection
+
+A rescan compares them with the previous report's fingerprints to decide
+which expensive tools need to run again (see scanner.RESCAN_RULES). A probe
+that fails yields None, which never matches, so failures only cost a rerun.
+"""
+
+import asyncio
+import hashlib
+import socket
+import ssl
+from urllib.parse import urlparse
+
+PROBE_TIMEOUT = 5  # seconds for all probes of one target
+MAX_HEAD_BYTES = 64 * 1024  # response head read from the HEAD probe
+
+# Headers whose values identify the served content or stack; the rest (Date,
+# Set-Cookie, Age, request ids, ...) come and go per request and are ignored
+STABLE_HEADERS = (
+    "etag",
+    "last-modified",
+    "location",
+    "server",
+    "x-powered-by",
+    "content-type",
+    "strict-transport-security",
+    "content-security-policy",
+)
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+async def _dns(host: str) -> str | None:
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(
+            host, None, type=socket.SOCK_STREAM, flags=socket.AI_CANONNAME
+        )
+    except (OSError, UnicodeError):
+        return None
+    canonical = next((info[3] for info in infos if info[3]), host).lower()
+    addresses = sorted({info[4][0] for info in infos})
+    return _digest(canonical, *addresses)
+
+
+def _http_fingerprint(head: bytes) -> str | None:
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        return None
+    values: list[str] = []
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        name = name.strip().lower()
+        if sep and name in STABLE_HEADERS:
+            values.append(f"{name}: {value.strip()}")
+    return _digest(parts[1], *sorted(values))
+
+
+async def _tls_and_http(host: str, port: int, use_tls: bool) -> tuple[str | None, str | None]:
+    context = None
+    if use_tls:
+        # Fingerprint whatever certificate is served, valid or not
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    try:
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=context, server_hostname=host if use_tls else None,
+            limit=MAX_HEAD_BYTES,
+        )
+    except (OSError, ssl.SSLError):
+        return None, None
+
+    tls_print = None
+    http_print = None
+    try:
+        if use_tls:
+            der = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+            tls_print = hashlib.sha256(der).hexdigest() if der else None
+        writer.write(
+            f"HEAD / HTTP/1.1\r\nHost: {host}\r\nUser-Agent: site-intelligence/1.0\r\n"
+            "Accept: */*\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        http_print = _http_fingerprint(await reader.readuntil(b"\r\n\r\n"))
+    except (OSError, ssl.SSLError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+    return tls_print, http_print
+
+
+async def fingerprints(target: str, timeout: float = PROBE_TIMEOUT) -> dict[str, str | None]:
+    """Return {"dns", "tls", "http"} fingerprints for ``target`` (None where a probe failed).
+
+    Takes at most ``timeout`` seconds (capped at PROBE_TIMEOUT).
+    """
+    parsed = urlparse(target)
+    host = parsed.hostname or target
+    use_tls = parsed.scheme != "http"
+    port = parsed.port or (443 if use_tls else 80)
+
+    prints: dict[str, str | None] = {"dns": None, "tls": None, "http": None}
+    dns_task = asyncio.create_task(_dns(host))
+    conn_task = asyncio.create_task(_tls_and_http(host, port, use_tls))
+    done, pending = await asyncio.wait((dns_task, conn_task), timeout=max(0.0, min(timeout, PROBE_TIMEOUT)))
+    for task in pending:
+        task.cancel()
+    if dns_task in done and dns_task.exception() is None:
+        prints["dns"] = dns_task.result()
+    if conn_task in done and conn_task.exception() is None:
+        prints["tls"], prints["http"] = conn_task.result()
+    return prints
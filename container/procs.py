@@ -0,0 +1,202 @@
+"""Tool process supervisor: process groups, rlimits and per-child accounting.
+
+Every tool child is started directly (no ``sh -c`` hop) with its input, if
+any, written to stdin, as the leader of its own process group, and with the
+caller's CPU / address-space / open-file limits applied. ``close`` kills the
+whole group, so helpers a tool forks die with it on timeout or cancellation
+instead of outliving the scan; a child still unreaped then is reaped in the
+background.
+
+asyncio's own subprocess support reaps children through its child watcher,
+which throws away the rusage the kernel reports at exit. ``spawn`` starts the
+child with ``subprocess.Popen`` (in an executor thread, so the fork/exec never
+stalls the event loop), attaches its pipes to the event loop, and
+reaps it with ``os.wait4`` once its pidfd becomes readable (a thread on
+systems without pidfd), so every run reports its CPU time and peak RSS.
+
+The stdout/stderr readers also count bytes and note when the first stdout
+byte arrived, which is the tool's time to first byte.
+"""
+
+import asyncio
+import contextlib
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+
+_reapers: set[asyncio.Task] = set()  # background waits for killed children
+
+
+class CountingReader(asyncio.StreamReader):
+    """StreamReader that counts bytes fed to it and when the first one came."""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(limit=limit)
+        self.nbytes = 0
+        self.first_byte_at: float | None = None  # time.perf_counter()
+
+    def feed_data(self, data: bytes) -> None:
+        if data and self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+        self.nbytes += len(data)
+        super().feed_data(data)
+
+
+class ChildProcess:
+    """A running tool child: counted pipes, group kill, and rusage-recording reap."""
+
+    def __init__(self, popen: subprocess.Popen, stdout: CountingReader, stderr: CountingReader) -> None:
+        self._popen = popen
+        self.pid = popen.pid  # also its process group id
+        self.stdout = stdout
+        self.stderr = stderr
+        self.started_at = time.perf_counter()
+        self.returncode: int | None = None
+        self.rusage: resource.struct_rusage | None = None
+        self.killed = False
+        self._transports: list[asyncio.BaseTransport] = []
+
+    def kill(self) -> None:
+        """SIGKILL the child's whole process group."""
+        if self.returncode is None:
+            self.killed = True
+        try:
+            # Not Popen.kill(): its poll() would reap the child and lose the rusage
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass  # group already gone
+
+    async def wait(self) -> int:
+        """Reap the child, recording its exit status and rusage."""
+        if self.returncode is not None:
+            return self.returncode
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            _, status, self.rusage = await asyncio.to_thread(os.wait4, self.pid, 0)
+        else:
+            loop = asyncio.get_running_loop()
+            exited = loop.create_future()
+            loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(pidfd)
+                os.close(pidfd)
+            _, status, self.rusage = os.wait4(self.pid, 0)
+        self.returncode = os.waitstatus_to_exitcode(status)
+        self._popen.returncode = self.returncode  # so Popen never tries to reap it
+        return self.returncode
+
+    async def communicate(self) -> tuple[bytes, bytes]:
+        """Read both pipes to EOF, then reap the child."""
+        stdout, stderr = await asyncio.gather(self.stdout.read(), self.stderr.read())
+        await self.wait()
+        return stdout, stderr
+
+    def close(self) -> None:
+        """Kill the child's process group and detach its pipes from the loop.
+
+        Safe in a ``finally`` on cancellation: an unreaped child is waited
+        for by a background task.
+        """
+        running = self.returncode is None
+        self.kill()  # after a clean exit: anything the tool left in its group
+        if running:
+            reaper = asyncio.get_running_loop().create_task(self.wait())
+            _reapers.add(reaper)
+            reaper.add_done_callback(_reapers.discard)
+        for transport in self._transports:
+            transport.close()
+
+
+def _apply_limits(pid: int, cpu_s: int, memory: int, files: int) -> None:
+    """Set RLIMIT_CPU/AS/NOFILE on a started child; 0 leaves a limit alone."""
+    if not hasattr(resource, "prlimit"):
+        return
+    for which, value in (
+        (resource.RLIMIT_CPU, cpu_s),
+        (resource.RLIMIT_AS, memory),
+        (resource.RLIMIT_NOFILE, files),
+    ):
+        if value:
+            try:
+                resource.prlimit(pid, which, (value, value))
+            except (OSError, ValueError):
+                pass  # above our own hard limit, or the child already exited
+
+
+def _start(argv: list[str], stdin: bytes | None, rlimits: tuple[int, int, int]) -> subprocess.Popen:
+    """Blocking part of ``spawn``: fork/exec, limits and stdin, run in an executor thread."""
+    popen = subprocess.Popen(
+        argv,
+        stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    try:
+        # Set from outside right after exec; unlike a preexec_fn this is
+        # safe with the executor threads this process runs
+        _apply_limits(popen.pid, *rlimits)
+        if stdin is not None:
+            assert popen.stdin is not None
+            # One input line, well under the pipe buffer; a tool that exited
+            # early (BrokenPipeError) says why on stderr
+            with contextlib.suppress(BrokenPipeError), popen.stdin:
+                popen.stdin.write(stdin)
+    except BaseException:
+        _discard(popen)
+        raise
+    return popen
+
+
+def _discard(popen: subprocess.Popen) -> None:
+    """Kill a child nobody will read and reap it in the background."""
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(popen.pid, signal.SIGKILL)
+    for pipe in (popen.stdin, popen.stdout, popen.stderr):
+        if pipe is not None:
+            pipe.close()
+    threading.Thread(target=popen.wait, daemon=True).start()
+
+
+def _discard_started(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        _discard(future.result())
+
+
+async def spawn(
+    argv: list[str],
+    limit: int,
+    stdin: bytes | None = None,
+    rlimits: tuple[int, int, int] = (0, 0, 0),
+) -> ChildProcess:
+    """Start ``argv`` in a new process group with piped stdout/stderr.
+
+    ``stdin`` is written to the child and closed (otherwise stdin is
+    /dev/null). ``rlimits`` is (CPU seconds, address-space bytes, open
+    files), 0 for no limit.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.run_in_executor(None, _start, argv, stdin, rlimits)
+    try:
+        popen = await asyncio.shield(started)
+    except asyncio.CancelledError:
+        started.add_done_callback(_discard_started)  # still starting: kill it once it has
+        raise
+    stdout, stderr = CountingReader(limit), CountingReader(limit)
+    child = ChildProcess(popen, stdout, stderr)
+    try:
+        for reader, pipe in ((stdout, popen.stdout), (stderr, popen.stderr)):
+            transport, _ = await loop.connect_read_pipe(
+                lambda reader=reader: asyncio.StreamReaderProtocol(reader), pipe
+            )
+            child._transports.append(transport)
+    except BaseException:
+        child.close()
+        raise
+    return child
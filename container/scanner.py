@@ -1,10 +1,24 @@
 """Scan orchestrator — runs all recon tools concurrently and returns unified results."""
 
 import asyncio
-import re
+import calendar
+import ipaddress
+import math
+import os
 import time
-from typing import Any
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Collection, Hashable
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
 
+import fetch
+import helpers
+import metrics
+import probes
+import procs
+import workers
+from asn_index import AsnIndex
+from cache import CACHE_ENABLED, tool_cache
 from parsers import (
     wafw00f_parser,
     webtech_parser,
@@ -13,10 +27,29 @@ from parsers import (
     headers_parser,
     whois_parser,
     subdomain_parser,
+    tls_fast_parser,
 )
 
-TOOL_TIMEOUT = 60  # seconds per tool
-TOTAL_TIMEOUT = 120  # seconds for entire scan
+TOOL_TIMEOUT = 60  # seconds per tool, the ceiling for adaptive deadlines
+TOTAL_TIMEOUT = 120  # seconds for entire scan, the ceiling for a request's budget
+STREAM_LINE_LIMIT = 4 * 1024 * 1024  # longest single output line for line-streamed tools
+STDERR_CAP = 64 * 1024  # stderr bytes kept from line-streamed tools
+BATCH_CONCURRENCY = 4  # targets scanned at once by run_batch_scan
+
+NATIVE_TOOLS = os.environ.get("NATIVE_TOOLS", "1") != "0"  # parsers' run_async clients
+SHARED_FETCH = os.environ.get("SHARED_FETCH", "1") != "0"  # parsers' analyze_page, see fetch.py
+TLS_ENGINE = os.environ.get("TLS_ENGINE", "fast")  # default engine for the tls section, see ENGINES
+
+# Per-tool deadlines follow observed run time: mean + DEADLINE_DEVIATIONS *
+# mean deviation (the TCP retransmit-timer estimator), kept within
+# [DEADLINE_FLOOR, TOOL_TIMEOUT] and used once a tool has DEADLINE_MIN_SAMPLES runs
+ADAPTIVE_DEADLINES = os.environ.get("ADAPTIVE_DEADLINES", "1") != "0"
+DEADLINE_FLOOR = 5.0  # seconds
+DEADLINE_DEVIATIONS = 4
+DEADLINE_MIN_SAMPLES = 5
+
+ASN_DB_PATH = os.environ.get("ASN_DB_PATH", "")  # compiled index or iptoasn TSV
+ASN_REMOTE_LOOKUP = os.environ.get("ASN_REMOTE_LOOKUP", "1") != "0"
 
 # Registry: key = unified schema section name, value = parser module
 TOOLS: dict[str, Any] = {
@@ -29,52 +62,614 @@ TOOLS: dict[str, Any] = {
     "subdomains": subdomain_parser,
 }
 
+# Sections with more than one engine: per engine, the tool (name and parser)
+# that fills the section. Tools keep their own cache, budget and deadline.
+# "fast" (tls_client.py) finds the same protocols and certificate as "full"
+# (sslyze) but only the cipher suites its few handshakes negotiate.
+ENGINES: dict[str, dict[str, tuple[str, Any]]] = {
+    "tls": {"full": ("tls", sslyze_parser), "fast": ("tls_fast", tls_fast_parser)},
+}
+DEFAULT_ENGINES = {"tls": TLS_ENGINE if TLS_ENGINE in ENGINES["tls"] else "fast"}
+# Engine whose sections can stand in for any other engine's (rescans)
+COMPLETE_ENGINE = "full"
+
+# Tool name -> section it fills, for tools that are not a TOOLS entry themselves
+TOOL_SECTIONS = {
+    tool: section
+    for section, engines in ENGINES.items()
+    for tool, _ in engines.values()
+    if tool != section
+}
+
+# Named section sets a scan request can ask for instead of listing sections
+PROFILES: dict[str, tuple[str, ...]] = {
+    "quick": ("dns", "headers", "waf"),
+    "full": tuple(TOOLS),
+}
+
+# Rescans (stream_scan ``previous``): per tool, the probe fingerprints (see
+# probes.py) that must be unchanged and the maximum age in seconds for the
+# previous section to be reused. dns and headers are as cheap as the probes
+# themselves and always run.
+RESCAN_RULES: dict[str, tuple[tuple[str, ...], int]] = {
+    "tls": (("tls",), 7 * 86400),
+    "technologies": (("http",), 7 * 86400),
+    "waf": (("dns", "http"), 7 * 86400),
+    "whois": ((), 7 * 86400),
+    "subdomains": ((), 86400),
+}
+
+# Scheduling lanes, highest priority first: UI scans never queue behind sweeps
+LANES = ("interactive", "bulk")
+
+# Concurrent runs allowed per tool across all scans (sslyze/subfinder are heavy)
+TOOL_CONCURRENCY = {
+    "waf": 6,
+    "technologies": 6,
+    "tls": 3,
+    "tls_fast": 12,
+    "dns": 16,
+    "headers": 12,
+    "whois": 6,
+    "subdomains": 2,
+}
+
+# Per tool subprocess: (CPU seconds, address space bytes, open files); see
+# procs.spawn. Go tools (dnsx, httpx, subfinder) reserve more address space.
+GiB = 1024**3
+TOOL_RLIMITS = {
+    "waf": (90, 1 * GiB, 256),
+    "technologies": (90, 1 * GiB, 256),
+    "tls": (180, 2 * GiB, 1024),
+    "tls_fast": (180, 2 * GiB, 1024),  # falls back to the sslyze CLI
+    "dns": (60, 4 * GiB, 256),
+    "headers": (90, 4 * GiB, 1024),
+    "whois": (30, 512 * 1024**2, 64),
+    "subdomains": (180, 4 * GiB, 1024),
+}
+
+# Per lane: (scans running at once, scans allowed to wait before rejecting)
+LANE_LIMITS = {
+    "interactive": (6, 24),
+    "bulk": (2, 8),
+}
+
+_asn_index: AsnIndex | None = None
+_asn_index_loaded = False
+
+
+# ---------------------------------------------------------------------------
+# Scheduler: admission control per lane + per-tool concurrency budget
+# ---------------------------------------------------------------------------
+
+class ScanRejected(Exception):
+    """Raised when a lane's wait queue is full; carries a Retry-After hint."""
+
+    def __init__(self, lane: str, retry_after: int) -> None:
+        super().__init__(f"Scanner busy: {lane} queue is full")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+class PrioritySemaphore:
+    """Counting semaphore that wakes waiters lane by lane in LANES order."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+
+    def waiting(self, lane: str | None = None) -> int:
+        if lane is not None:
+            return len(self._waiters[lane])
+        return sum(len(q) for q in self._waiters.values())
+
+    async def acquire(self, lane: str) -> None:
+        if self.active < self.limit and not self.waiting():
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # slot was handed over as we were cancelled
+            else:
+                self._waiters[lane].remove(future)
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        while self.active < self.limit:
+            future = self._next_waiter()
+            if future is None:
+                return
+            self.active += 1
+            future.set_result(None)
+
+    def _next_waiter(self) -> asyncio.Future | None:
+        for lane in LANES:
+            queue = self._waiters[lane]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    return future
+        return None
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """One in-flight task per key, shared by every concurrent caller.
+
+    A caller that is cancelled only detaches; the shared task is cancelled
+    when its last waiter has gone.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, tuple[asyncio.Task, list[int]]] = {}  # key -> (task, [waiters])
+
+    def running(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def run(self, key: Hashable, start: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(start())
+            call = self._calls[key] = (task, [0])
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        task, waiters = call
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            waiters[0] -= 1
+            if not waiters[0] and not task.done():
+                task.cancel()
+
+
+class Admission:
+    """Bounded running/waiting scan counts per lane with fast rejection."""
+
+    def __init__(self, limits: dict[str, tuple[int, int]]) -> None:
+        self._limits = limits
+        self._slots = {lane: asyncio.Semaphore(running) for lane, (running, _) in limits.items()}
+        self.running = {lane: 0 for lane in limits}
+        self.queued = {lane: 0 for lane in limits}
+        self._avg_duration = 30.0  # seconds, EWMA of admitted scan time
+
+    def retry_after(self, lane: str) -> int:
+        running, _ = self._limits[lane]
+        return max(1, math.ceil(self._avg_duration * (self.queued[lane] + 1) / running))
+
+    async def acquire(self, lane: str) -> float:
+        """Wait for a running slot; raise ScanRejected if the wait queue is full."""
+        _, max_queued = self._limits[lane]
+        if self._slots[lane].locked() and self.queued[lane] >= max_queued:
+            raise ScanRejected(lane, self.retry_after(lane))
+        self.queued[lane] += 1
+        try:
+            await self._slots[lane].acquire()
+        finally:
+            self.queued[lane] -= 1
+        self.running[lane] += 1
+        return time.monotonic()
+
+    def release(self, lane: str, started: float) -> None:
+        self.running[lane] -= 1
+        self._slots[lane].release()
+        self._avg_duration += 0.2 * ((time.monotonic() - started) - self._avg_duration)
+
+    @asynccontextmanager
+    async def admitted(self, lane: str) -> AsyncIterator[None]:
+        started = await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane, started)
+
+
+class LatencyTracker:
+    """Per-tool EWMA of run time and of its deviation, turned into deadlines."""
+
+    def __init__(self) -> None:
+        self._stats: dict[str, tuple[float, float, int]] = {}  # name -> (mean, deviation, samples)
+
+    def observe(self, name: str, seconds: float) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = (seconds, seconds / 2, 1)
+            return
+        mean, deviation, samples = stats
+        deviation += 0.25 * (abs(seconds - mean) - deviation)
+        mean += 0.125 * (seconds - mean)
+        self._stats[name] = (mean, deviation, samples + 1)
+
+    def deadline(self, name: str, floor: float = DEADLINE_FLOOR, ceiling: float = TOOL_TIMEOUT) -> float:
+        """Seconds to allow ``name``'s next run, within [floor, ceiling]."""
+        stats = self._stats.get(name)
+        if not ADAPTIVE_DEADLINES or stats is None or stats[2] < DEADLINE_MIN_SAMPLES:
+            return ceiling
+        mean, deviation, _ = stats
+        return min(ceiling, max(floor, mean + DEADLINE_DEVIATIONS * deviation))
+
+
+admission = Admission(LANE_LIMITS)
+latency = LatencyTracker()
+_tool_slots = {
+    name: PrioritySemaphore(TOOL_CONCURRENCY.get(name, 8)) for name in (*TOOLS, *TOOL_SECTIONS)
+}
+_tool_flights = SingleFlight()  # (tool, input_key, lane) -> in-flight run
+
+metrics.Gauge(
+    "scanner_scans_running", "Admitted scans running per lane.", ("lane",),
+    lambda: {(lane,): n for lane, n in admission.running.items()},
+)
+metrics.Gauge(
+    "scanner_scans_queued", "Scans waiting for admission per lane.", ("lane",),
+    lambda: {(lane,): n for lane, n in admission.queued.items()},
+)
+metrics.Gauge(
+    "scanner_tool_slots_active", "Tool runs holding a concurrency slot.", ("tool",),
+    lambda: {(name,): slot.active for name, slot in _tool_slots.items()},
+)
+metrics.Gauge(
+    "scanner_tool_deadline_seconds", "Deadline the next run of each tool gets.", ("tool",),
+    lambda: {(name,): latency.deadline(name) for name in _tool_slots},
+)
+metrics.Gauge(
+    "scanner_tool_slots_waiting", "Tool runs waiting for a concurrency slot.", ("tool", "lane"),
+    lambda: {(name, lane): slot.waiting(lane) for name, slot in _tool_slots.items() for lane in LANES},
+)
+
 
-async def run_tool(name: str, module: Any, target: str) -> tuple[str, Any, str | None]:
-    """Run a single recon tool as a subprocess with timeout.
+async def _run_tool_scheduled(
+    name: str, module: Any, target: str, lane: str, deadline: float | None = None
+) -> tuple[str, Any, str | None, dict[str, Any]]:
+    """run_tool once the tool's concurrency budget has a slot for this lane.
 
-    Returns (tool_name, parsed_result_or_None, error_message_or_None).
+    The run gets the tool's adaptive deadline, cut short by ``deadline`` (a
+    time.monotonic() instant, normally the end of the scan's budget).
     """
-    cmd = module.build_command(target)
+    slot = _tool_slots[name]
+    queued = time.perf_counter()
+    await slot.acquire(lane)
+    try:
+        queue_s = time.perf_counter() - queued
+        adaptive = timeout = latency.deadline(name)
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+        name, result, error, timing = await run_tool(name, module, target, timeout)
+    finally:
+        slot.release()
+    timing["queue_ms"] = _ms(queue_s)
+    if timing["timed_out"]:
+        if timeout >= adaptive:
+            latency.observe(name, adaptive)  # the run took at least this long
+    elif error is None:
+        latency.observe(name, timing["wall_ms"] / 1000)
+    metrics.observe_tool(name, lane, timing, error)
+    return (name, result, error, timing)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _new_timing() -> dict[str, Any]:
+    """Timing record for one run_tool call; None where the path cannot tell."""
+    return {
+        "path": "",  # fetch, worker, native, helper or subprocess
+        "wall_ms": 0.0,
+        "queue_ms": 0.0,
+        "ttfb_ms": None,
+        "parse_ms": None,
+        "stdout_bytes": None,
+        "stderr_bytes": None,
+        "exit_status": None,
+        "deadline_s": None,
+        "timed_out": False,
+        "killed": False,
+        "cpu_user_ms": None,
+        "cpu_sys_ms": None,
+        "max_rss_kib": None,
+    }
+
 
+def _record_child(timing: dict[str, Any], child: procs.ChildProcess) -> None:
+    """Copy a subprocess's output sizes, exit status and rusage into ``timing``."""
+    if child.stdout.first_byte_at is not None:
+        timing["ttfb_ms"] = _ms(child.stdout.first_byte_at - child.started_at)
+    timing["stdout_bytes"] = child.stdout.nbytes
+    timing["stderr_bytes"] = child.stderr.nbytes
+    timing["exit_status"] = child.returncode
+    timing["killed"] = child.killed
+    if child.rusage is not None:
+        timing["cpu_user_ms"] = _ms(child.rusage.ru_utime)
+        timing["cpu_sys_ms"] = _ms(child.rusage.ru_stime)
+        timing["max_rss_kib"] = child.rusage.ru_maxrss  # KiB on Linux
+
+
+async def _read_capped(stream: asyncio.StreamReader, cap: int) -> bytes:
+    """Drain ``stream`` to EOF, keeping only the first ``cap`` bytes."""
+    kept = b""
+    while chunk := await stream.read(65536):
+        if len(kept) < cap:
+            kept += chunk[: cap - len(kept)]
+    return kept
+
+
+async def _stream_lines(module: Any, child: procs.ChildProcess, state: Any) -> tuple[bool, str, float]:
+    """Feed the child's stdout to ``module.feed_line`` one line at a time.
+
+    Kills the child once MAX_OUTPUT_LINES or MAX_OUTPUT_BYTES is exceeded.
+    Returns (truncated, stderr, seconds spent in feed_line).
+    """
+    stderr_task = asyncio.create_task(_read_capped(child.stderr, STDERR_CAP))
+    lines = size = 0
+    parse_s = 0.0
+    truncated = False
     try:
-        if isinstance(cmd, list) and len(cmd) >= 3 and cmd[0] == "sh" and cmd[1] == "-c":
-            proc = await asyncio.create_subprocess_shell(
-                cmd[2],
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-        else:
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
+        while True:
+            try:
+                raw = await child.stdout.readline()
+            except ValueError:  # a single line longer than STREAM_LINE_LIMIT
+                truncated = True
+                break
+            if not raw:
+                break
+            lines += 1
+            size += len(raw)
+            if lines > module.MAX_OUTPUT_LINES or size > module.MAX_OUTPUT_BYTES:
+                truncated = True
+                break
+            started = time.perf_counter()
+            module.feed_line(state, raw.decode("utf-8", errors="replace"))
+            parse_s += time.perf_counter() - started
+
+        if truncated:
+            child.kill()
+        await child.wait()
+        stderr = await stderr_task
+    finally:
+        stderr_task.cancel()
+    return truncated, stderr.decode("utf-8", errors="replace"), parse_s
+
+
+async def run_tool(
+    name: str, module: Any, target: str, timeout: float = TOOL_TIMEOUT
+) -> tuple[str, Any, str | None, dict[str, Any]]:
+    """Run a single recon tool as a subprocess, giving up after ``timeout`` seconds.
+
+    Tools that analyze the landing page (``analyze_page``) are handed the
+    shared fetch of it (see fetch.py), analyzed in the warm worker pool when
+    they need their package. Otherwise tools that support in-process
+    execution (see workers.py) run in the worker pool, tools with a native
+    asyncio client (``run_async``) run on the event loop, and line-protocol tools (see helpers.py) are fed
+    to their long-lived helper; all fall back to a subprocess on failure.
+
+    Line-oriented tools (parsers with ``feed_line``) are parsed as output
+    arrives rather than buffered, with per-tool output caps; a capped or timed
+    out run keeps what was parsed so far and is marked ``truncated``.
+
+    Returns (tool_name, parsed_result_or_None, error_message_or_None, timing)
+    where timing is the _new_timing record: wall time, and for subprocess
+    runs time to first byte, output sizes, parse time, exit status and the
+    child's CPU time and peak RSS.
+    """
+    timing = _new_timing()
+    timing["deadline_s"] = round(timeout, 1)
+    started = time.perf_counter()
+    try:
+        name, result, error = await _run_tool(name, module, target, timeout, timing)
+    finally:
+        timing["wall_ms"] = _ms(time.perf_counter() - started)
+    return (name, result, error, timing)
+
+
+async def _run_tool(
+    name: str, module: Any, target: str, timeout: float, timing: dict[str, Any]
+) -> tuple[str, Any, str | None]:
+    timed_out = f"{name} timed out after {timeout:.3g}s"
+    # One deadline for the whole call: a path that fails hands the fallback
+    # only the time left, so the tool never outlasts ``timeout``
+    ends = time.monotonic() + timeout
+
+    def left() -> float:
+        return max(0.0, ends - time.monotonic())
+
+    if SHARED_FETCH and hasattr(module, "analyze_page"):
+        # Pure-Python analyzers run inline; package-backed ones need the pool
+        in_worker = hasattr(module, "WARM_IMPORTS")
+        if not in_worker or workers.supports(module):
+            timing["path"] = "fetch"
+            try:
+                page = await asyncio.wait_for(fetch.get(target), timeout=left())
+                if not in_worker:
+                    return (name, module.analyze_page(target, page), None)
+                result = await workers.run(module.analyze_page, target, ends, fetch.for_worker(page))
+                return (name, result, None)
+            except asyncio.TimeoutError:
+                timing["timed_out"] = True
+                return (name, None, timed_out)
+            except Exception:
+                pass  # broken pool or analysis failure: let the tool fetch for itself
+
+    if workers.supports(module):
+        timing["path"] = "worker"
+        try:
+            result = await workers.run(module.run_in_process, target, ends)
+            return (name, result, None)
+        except asyncio.TimeoutError:
+            timing["timed_out"] = True
+            return (name, None, timed_out)
+        except Exception:
+            pass  # broken pool or in-process failure: use the subprocess path
+
+    if NATIVE_TOOLS and hasattr(module, "run_async"):
+        timing["path"] = "native"
+        try:
+            result = await asyncio.wait_for(module.run_async(target), timeout=left())
+            return (name, result, None)
+        except asyncio.TimeoutError:
+            timing["timed_out"] = True
+            return (name, None, timed_out)
+        except Exception:
+            pass  # e.g. port 43 blocked: use the subprocess path
+
+    if helpers.supports(module):
+        timing["path"] = "helper"
+        try:
+            line = await asyncio.wait_for(helpers.query(name, module, target), timeout=left())
+            timing["stdout_bytes"] = len(line.encode())
+            parse_started = time.perf_counter()
+            result = module.parse_output(line, "")
+            timing["parse_ms"] = _ms(time.perf_counter() - parse_started)
+            return (name, result, None)
+        except asyncio.TimeoutError:
+            timing["timed_out"] = True
+            return (name, None, timed_out)
+        except Exception:
+            # helper crashed, gave no answer in time or unparseable output:
+            # use the subprocess path
+            pass
+
+    if left() <= 0:
+        timing["timed_out"] = True  # the failed paths used up the deadline
+        return (name, None, timed_out)
+
+    timing["path"] = "subprocess"
+    stdin = module.build_stdin(target).encode() if hasattr(module, "build_stdin") else None
+    line_mode = hasattr(module, "feed_line")
+    state = module.new_state() if line_mode else None
+    child: procs.ChildProcess | None = None
+
+    try:
+        child = await procs.spawn(
+            module.build_command(target),
+            limit=STREAM_LINE_LIMIT,
+            stdin=stdin,
+            rlimits=TOOL_RLIMITS.get(name, (0, 0, 0)),
+        )
+
+        if line_mode:
+            truncated, stderr, parse_s = await asyncio.wait_for(
+                _stream_lines(module, child, state), timeout=left()
             )
+            parse_started = time.perf_counter()
+            result = module.finish(state, stderr)
+            timing["parse_ms"] = _ms(parse_s + time.perf_counter() - parse_started)
+            if truncated and isinstance(result, dict):
+                result["truncated"] = True
+            return (name, result, None)
 
         stdout_bytes, stderr_bytes = await asyncio.wait_for(
-            proc.communicate(), timeout=TOOL_TIMEOUT
+            child.communicate(), timeout=left()
         )
 
         stdout = stdout_bytes.decode("utf-8", errors="replace")
         stderr = stderr_bytes.decode("utf-8", errors="replace")
 
+        parse_started = time.perf_counter()
         result = module.parse_output(stdout, stderr)
+        timing["parse_ms"] = _ms(time.perf_counter() - parse_started)
         return (name, result, None)
 
     except asyncio.TimeoutError:
-        try:
-            proc.kill()  # type: ignore[possibly-undefined]
-            await proc.wait()  # type: ignore[possibly-undefined]
-        except Exception:
-            pass
-        return (name, None, f"{name} timed out after {TOOL_TIMEOUT}s")
+        timing["timed_out"] = True
+        if child is not None:
+            try:
+                child.kill()
+                await child.wait()
+            except Exception:
+                pass
+        if line_mode:
+            # Keep whatever was parsed before the deadline
+            partial = module.finish(state, "")
+            if isinstance(partial, dict):
+                partial["truncated"] = True
+            return (name, partial, timed_out)
+        return (name, None, timed_out)
 
     except Exception as e:
         return (name, None, f"{name} failed: {str(e)}")
 
+    finally:
+        if child is not None:
+            child.close()  # kills the tool's process group, even on cancellation
+            _record_child(timing, child)
+
+
+async def run_tool_cached(
+    name: str,
+    module: Any,
+    target: str,
+    use_cache: bool = True,
+    lane: str = "interactive",
+    deadline: float | None = None,
+) -> tuple[str, Any, str | None, dict[str, Any] | None, dict[str, Any] | None]:
+    """run_tool behind the per-tool result cache and the tool's concurrency budget.
+
+    Returns (tool_name, parsed_result_or_None, error_message_or_None,
+    cache_info, timing) where cache_info is {"hit": True, "age_s": ...} for a
+    cache hit, else None, and timing is run_tool's record (None for a hit).
+    ``deadline`` (time.monotonic()) bounds the run, see _run_tool_scheduled.
+    Only clean results (no error, no parser "_error") are stored.
+
+    Concurrent calls for the same tool, input and lane share one run (with
+    the first caller's deadline) and get the same result and timing objects;
+    cancelling one caller does not cancel the run for the others. A caller
+    whose shared run was cut short by that earlier deadline runs the tool
+    again within its own.
+    """
+    ttl = getattr(module, "CACHE_TTL", 0)
+    cacheable = use_cache and CACHE_ENABLED and ttl > 0
+    key = module.input_key(target)
+    if cacheable:
+        hit = tool_cache.get(name, key)
+        if hit is not None:
+            value, age = hit
+            metrics.TOOL_RUNS.inc(name, "cached")
+            return (name, value, None, {"hit": True, "age_s": int(age)}, None)
+
+    async def run() -> tuple[tuple[str, Any, str | None, dict[str, Any]], bool]:
+        outcome = await _run_tool_scheduled(name, module, target, lane, deadline)
+        _, result, error, timing = outcome
+        if cacheable and error is None and result is not None and not (
+            isinstance(result, dict) and "_error" in result
+        ):
+            tool_cache.put(name, key, result, ttl)
+        # Stopped by this caller's deadline rather than the tool's own timeout
+        cut_short = timing["timed_out"] and deadline is not None and time.monotonic() >= deadline
+        return outcome, cut_short
+
+    flight = (name, key, lane)
+    if _tool_flights.running(flight):
+        metrics.TOOL_RUNS.inc(name, "coalesced")
+    (_, result, error, timing), cut_short = await _tool_flights.run(flight, run)
+    if cut_short and (deadline is None or deadline > time.monotonic()):
+        # Joined a run with an earlier deadline: run again within ours
+        (_, result, error, timing), _ = await _tool_flights.run(flight, run)
+    return (name, result, error, None, timing)
+
 
-async def _lookup_asn(ip: str) -> tuple[str, str]:
-    """Look up ASN info for an IP using ipapi.co (free, HTTPS).
+def get_asn_index() -> AsnIndex | None:
+    """Load the offline IP→ASN index from ASN_DB_PATH once; None if unavailable."""
+    global _asn_index, _asn_index_loaded
+    if not _asn_index_loaded:
+        _asn_index_loaded = True
+        if ASN_DB_PATH and os.path.exists(ASN_DB_PATH):
+            try:
+                _asn_index = AsnIndex.open(ASN_DB_PATH)
+            except (OSError, ValueError):
+                _asn_index = None
+    return _asn_index
+
+
+def _lookup_asn_remote(ip: str) -> tuple[str, str]:
+    """Look up ASN info for an IP using ipapi.co (free, HTTPS). Blocking.
 
     Returns (asn_string, org_name). Falls back to ("", "") on failure.
     """
@@ -83,8 +678,7 @@ async def _lookup_asn(ip: str) -> tuple[str, str]:
         import json
 
         # Validate IP format to prevent injection
-        if not re.match(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$", ip):
-            return ("", "")
+        ip = str(ipaddress.ip_address(ip))
 
         url = f"https://ipapi.co/{ip}/json/"
         req = urllib.request.Request(url, headers={"User-Agent": "site-intelligence/1.0"})
@@ -98,38 +692,71 @@ async def _lookup_asn(ip: str) -> tuple[str, str]:
         return ("", "")
 
 
-async def run_scan(target: str) -> dict[str, Any]:
-    """Run all recon tools concurrently and return the unified report."""
-    start_time = time.time()
+async def _lookup_asns(ips: list[str], remote: bool = True) -> list[tuple[str, str]]:
+    """Return (asn, org) per IP, ("", "") where unknown.
 
-    async_tasks = [
-        asyncio.create_task(run_tool(name, module, target))
-        for name, module in TOOLS.items()
-    ]
+    Uses the local index for every address. Without one, only the first
+    address is looked up remotely (if ``remote``), in a thread so the event
+    loop never blocks.
+    """
+    index = get_asn_index()
+    if index is not None:
+        return [index.lookup(ip) or ("", "") for ip in ips]
 
-    # Wait with total timeout — preserves partial results from completed tools
-    done, pending = await asyncio.wait(async_tasks, timeout=TOTAL_TIMEOUT)
+    results = [("", "")] * len(ips)
+    if ips and remote and ASN_REMOTE_LOOKUP:
+        results[0] = await asyncio.to_thread(_lookup_asn_remote, ips[0])
+    return results
 
-    for task in pending:
-        task.cancel()
 
-    completed: list[Any] = []
-    for task in done:
-        exc = task.exception()
-        if exc is not None:
-            completed.append(exc)
-        else:
-            completed.append(task.result())
+def _timestamp(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
 
-    if pending:
-        completed.append(
-            ("_timeout", None, f"Total scan timeout ({TOTAL_TIMEOUT}s) — {len(pending)} tool(s) still running")
-        )
 
-    # Build unified response with safe defaults
-    scan_result: dict[str, Any] = {
+def _reusable_sections(
+    previous: dict[str, Any],
+    target: str,
+    fingerprints: dict[str, str | None],
+    sections: tuple[str, ...],
+    engines: dict[str, str],
+) -> dict[str, Any]:
+    """Sections of ``previous`` a rescan may carry over, by RESCAN_RULES.
+
+    A section produced by another engine is only reused when that engine is
+    COMPLETE_ENGINE (reports without ``engines`` predate the fast engine).
+    Returns {section: previous data}; the data is None when ``previous``
+    holds only fingerprints and section_times.
+    """
+    if previous.get("target", target) != target:
+        return {}
+    old_prints = previous.get("fingerprints") or {}
+    old_engines = previous.get("engines") or {}
+    times = previous.get("section_times") or {}
+    now = time.time()
+    reusable: dict[str, Any] = {}
+    for name in sections:
+        rule = RESCAN_RULES.get(name)
+        if rule is None or name not in times:
+            continue  # always rerun, or never cleanly scanned
+        if name in engines and old_engines.get(name, COMPLETE_ENGINE) not in (engines[name], COMPLETE_ENGINE):
+            continue
+        probe_names, max_age = rule
+        if any(fingerprints.get(p) is None or fingerprints[p] != old_prints.get(p) for p in probe_names):
+            continue
+        try:
+            scanned_at = calendar.timegm(time.strptime(times[name], "%Y-%m-%dT%H:%M:%SZ"))
+        except (TypeError, ValueError):
+            continue
+        if now - scanned_at <= max_age:
+            reusable[name] = previous.get(name)
+    return reusable
+
+
+def _empty_result(target: str) -> dict[str, Any]:
+    """Unified response skeleton with safe defaults for every section."""
+    return {
         "target": target,
-        "scan_timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "scan_timestamp": _timestamp(time.time()),
         "waf": {"detected": False, "provider": None, "details": {}},
         "technologies": [],
         "tls": {
@@ -139,6 +766,7 @@ async def run_scan(target: str) -> dict[str, Any]:
         },
         "dns": {
             "a_records": [],
+            "aaaa_records": [],
             "cname_records": [],
             "ns_records": [],
             "mx_records": [],
@@ -161,47 +789,385 @@ async def run_scan(target: str) -> dict[str, Any]:
             "status": [],
         },
         "subdomains": {"subdomains": [], "sources": {}, "count": 0},
+        "engines": {},
+        "skipped": [],
+        "reused": [],
+        "fingerprints": {},
+        "section_times": {},
+        "cache": {},
+        "timings": {},
         "errors": [],
         "duration_ms": 0,
     }
 
-    for item in completed:
-        if isinstance(item, BaseException):
-            scan_result["errors"].append(str(item))
-            continue
 
-        name, result, error = item
-        if error:
-            scan_result["errors"].append(error)
-        if result is not None:
-            scan_result[name] = result
-
-    # Merge any extra tech detections from httpx into the technologies list
-    headers_data = scan_result.get("headers", {})
-    extra_techs = headers_data.pop("_extra_technologies", [])
-    if extra_techs:
-        existing_names = {t["name"].lower() for t in scan_result["technologies"]}
-        for tech in extra_techs:
-            if tech["name"].lower() not in existing_names:
-                scan_result["technologies"].append(tech)
-
-    # Populate ip_info from DNS results
+# ---------------------------------------------------------------------------
+# Dependent stages: post-processing started as soon as its inputs are ready
+# ---------------------------------------------------------------------------
+
+async def _fill_ip_info(scan_result: dict[str, Any], extras: dict[str, list[Any]]) -> bool:
+    """Populate ``ip_info`` from the DNS section."""
     dns_data = scan_result.get("dns", {})
     a_records = dns_data.get("a_records", [])
     if a_records:
         scan_result["ip_info"]["ip"] = a_records[0]
 
-    # Use dnsx ASN data if available, otherwise do a Team Cymru DNS lookup
+    # Use dnsx ASN data if available, otherwise the offline index; ipapi.co
+    # only when dnsx left the first address's ASN or org unknown
     asn = dns_data.get("asn", "")
     org = dns_data.get("hosting_provider", "")
-    if a_records and (not asn or not org):
-        cymru_asn, cymru_org = await _lookup_asn(a_records[0])
+    if a_records:
+        lookups = await _lookup_asns(a_records, remote=not asn or not org)
+        scan_result["ip_info"]["addresses"] = [
+            {"ip": ip, "asn": ip_asn, "org": ip_org}
+            for ip, (ip_asn, ip_org) in zip(a_records, lookups)
+        ]
         if not asn:
-            asn = cymru_asn
+            asn = lookups[0][0]
         if not org:
-            org = cymru_org
+            org = lookups[0][1]
     scan_result["ip_info"]["asn"] = asn
     scan_result["ip_info"]["org"] = org
+    return True
+
+
+async def _merge_technologies(scan_result: dict[str, Any], extras: dict[str, list[Any]]) -> bool:
+    """Add httpx's technology detections (from the headers run) missing from ``technologies``."""
+    extra_techs = extras.get("technologies", [])
+    if not extra_techs:
+        return False
+    technologies = list(scan_result["technologies"])
+    existing_names = {t["name"].lower() for t in technologies}
+    for tech in extra_techs:
+        if tech["name"].lower() not in existing_names:
+            technologies.append(tech)
+    scan_result["technologies"] = technologies
+    return True
+
+
+# Per stage: the sections it reads and the function filling the report
+# section of its name, which returns whether it changed it. A stage starts
+# once all its inputs are settled (finished, failed or reused), so ip_info
+# waits for dns only, not for the slowest tool; it does not run unless all
+# its inputs were selected. Tools' ``_extra_<section>`` result keys are
+# collected into ``extras`` for the stage of that section.
+STAGES: dict[str, tuple[tuple[str, ...], Callable[..., Awaitable[bool]]]] = {
+    "ip_info": (("dns",), _fill_ip_info),
+    "technologies": (("technologies", "headers"), _merge_technologies),
+}
+
+
+def _start_tool_tasks(
+    target: str,
+    shared: dict[tuple[str, str], asyncio.Task] | None,
+    use_cache: bool,
+    lane: str,
+    deadline: float,
+    sections: tuple[str, ...],
+    engines: dict[str, str],
+) -> dict[asyncio.Task, str]:
+    """One run_tool_cached task per section to run, mapped to its section."""
+    tasks: dict[asyncio.Task, str] = {}
+    for section, module in TOOLS.items():
+        if section not in sections:
+            continue
+        name = section
+        if section in engines:
+            name, module = ENGINES[section][engines[section]]
+        if shared is None:
+            tasks[asyncio.create_task(
+                run_tool_cached(name, module, target, use_cache, lane, deadline)
+            )] = section
+            continue
+        key = (name, module.input_key(target))
+        if key not in shared:
+            shared[key] = asyncio.create_task(
+                run_tool_cached(name, module, target, use_cache, lane, deadline)
+            )
+        tasks[shared[key]] = section
+    return tasks
+
+
+async def stream_scan(
+    target: str,
+    shared: dict[tuple[str, str], asyncio.Task] | None = None,
+    use_cache: bool = True,
+    lane: str = "interactive",
+    budget: float | None = None,
+    sections: Collection[str] | None = None,
+    previous: dict[str, Any] | None = None,
+    engines: dict[str, str] | None = None,
+    fingerprint: bool = False,
+) -> AsyncIterator[dict[str, Any]]:
+    """Run all recon tools concurrently, yielding events as results arrive.
+
+    Yields ``{"type": "section", "section": name, "data": ..., "error": ...}``
+    as soon as each tool finishes and again for each section a STAGES stage
+    fills (``ip_info`` once dns is in, ``technologies`` with httpx's extra
+    detections once headers is), and finally ``{"type": "complete", "data":
+    report}`` carrying the full unified report.
+
+    When ``shared`` is given, tool runs are looked up (and registered) by
+    ``(tool_name, module.input_key(target))`` so that several scans can reuse
+    one run. Shared tasks are owned by the caller and are never cancelled here.
+
+    Sections served from the tool cache are listed in the report's ``cache``
+    map with their age; ``use_cache=False`` forces every tool to run. Tools
+    that did run have their run_tool timing record in the ``timings`` map.
+
+    ``lane`` picks the priority the scan's tools get in each tool's
+    concurrency budget. Admission (ScanRejected) is the caller's job.
+
+    ``budget`` caps the scan's wall time in seconds (at most TOTAL_TIMEOUT);
+    every tool run is cut off when it runs out, whatever its own deadline.
+    Stages still waiting for inputs then run on whatever those produced.
+
+    ``sections`` limits the scan to those TOOLS entries (see PROFILES). The
+    others are null in the report and listed under ``skipped``, as are stage
+    sections (``ip_info``) whose inputs were skipped, so an unscanned section
+    is never mistaken for an empty one.
+
+    Every report carries, in ``section_times``, when each cleanly scanned
+    section's data was produced. Passing a previous report (or just its
+    ``fingerprints`` and ``section_times``) as ``previous`` makes this a
+    rescan: the change-detection probes run first, and sections whose
+    RESCAN_RULES inputs are unchanged are copied from ``previous`` instead
+    of rerun and listed under ``reused``. The probes only run for rescans
+    and when ``fingerprint`` is set (a scan meant to be rescanned later);
+    their ``fingerprints`` are then in the report, else it is empty. They
+    never outlast the budget.
+
+    ``engines`` picks the engine per ENGINES section (e.g. ``{"tls": "full"}``),
+    DEFAULT_ENGINES otherwise. The report's ``engines`` map records which
+    engine produced each such section, and their ``timings`` name the tool.
+    """
+    start_time = time.time()
+    budget = min(budget or TOTAL_TIMEOUT, TOTAL_TIMEOUT)
+    deadline = time.monotonic() + budget
+    selected = tuple(name for name in TOOLS if sections is None or name in sections)
+    chosen = {
+        section: (engines or {}).get(section) or DEFAULT_ENGINES[section]
+        for section in ENGINES
+        if section in selected
+    }
+
+    scan_result = _empty_result(target)
+    scan_result["engines"] = dict(chosen)
+    for name in TOOLS:
+        if name not in selected:
+            scan_result[name] = None
+            scan_result["skipped"].append(name)
+    waiting_stages: dict[str, tuple[str, ...]] = {}
+    for name, (inputs, _) in STAGES.items():
+        if all(section in selected for section in inputs):
+            waiting_stages[name] = inputs
+        elif name not in TOOLS:
+            scan_result[name] = None
+            scan_result["skipped"].append(name)
+    extras: dict[str, list[Any]] = {}  # _extra_<section> keys of tool results
+    settled: set[str] = set()  # sections whose data is final
+    stage_tasks: dict[asyncio.Task, str] = {}
+
+    def start_stages(ready: bool = True) -> set[asyncio.Task]:
+        """Start the waiting stages whose inputs are settled (all of them if not ``ready``)."""
+        started: set[asyncio.Task] = set()
+        for name, inputs in list(waiting_stages.items()):
+            if ready and not settled.issuperset(inputs):
+                continue
+            del waiting_stages[name]
+            task = asyncio.create_task(STAGES[name][1](scan_result, extras))
+            stage_tasks[task] = name
+            started.add(task)
+        return started
+
+    def stage_event(task: asyncio.Task) -> dict[str, Any] | None:
+        name = stage_tasks[task]
+        if task.cancelled():
+            scan_result["errors"].append(f"{name} stage was cancelled")
+        elif task.exception() is not None:
+            scan_result["errors"].append(f"{name} stage failed: {task.exception()}")
+        elif task.result():
+            return {"type": "section", "section": name, "data": scan_result[name], "error": None}
+        return None
+
+    probe_task: asyncio.Task | None = None
+    if previous is not None or fingerprint:
+        probe_task = asyncio.create_task(probes.fingerprints(target, deadline - time.monotonic()))
+    reused: dict[str, Any] = {}
+    if previous is not None:
+        scan_result["fingerprints"] = await probe_task
+        reused = _reusable_sections(previous, target, scan_result["fingerprints"], selected, chosen)
+        for name, data in reused.items():
+            scan_result[name] = data
+            scan_result["reused"].append(name)
+            if name in chosen:
+                scan_result["engines"][name] = (previous.get("engines") or {}).get(name, COMPLETE_ENGINE)
+            scan_result["section_times"][name] = previous["section_times"][name]
+            yield {"type": "section", "section": name, "data": data, "error": None}
+        settled.update(reused)
+
+    to_run = tuple(name for name in selected if name not in reused)
+    tool_tasks = _start_tool_tasks(target, shared, use_cache, lane, deadline, to_run, chosen)
+    pending = set(tool_tasks) | start_stages()
+    try:
+        # Wait with total timeout — preserves partial results from completed tools
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task in stage_tasks:
+                    event = stage_event(task)
+                    if event is not None:
+                        yield event
+                    continue
+                settled.add(tool_tasks[task])
+                if task.cancelled():
+                    scan_result["errors"].append("tool run was cancelled")
+                    continue
+                exc = task.exception()
+                if exc is not None:
+                    scan_result["errors"].append(str(exc))
+                    continue
+
+                tool, result, error, cache_info, timing = task.result()
+                name = tool_tasks[task]
+                if cache_info is not None:
+                    scan_result["cache"][name] = cache_info
+                if timing is not None:
+                    scan_result["timings"][name] = dict(timing, tool=tool) if tool != name else dict(timing)
+                if error:
+                    scan_result["errors"].append(error)
+                elif result is not None and not (isinstance(result, dict) and "_error" in result):
+                    age = cache_info["age_s"] if cache_info is not None else 0
+                    scan_result["section_times"][name] = _timestamp(time.time() - age)
+                if isinstance(result, dict):
+                    # Copy so shared runs are never mutated by one scan
+                    result = dict(result)
+                    for key in [k for k in result if k.startswith("_extra_")]:
+                        extras.setdefault(key[len("_extra_"):], []).extend(result.pop(key))
+                if result is not None:
+                    scan_result[name] = result
+                yield {"type": "section", "section": name, "data": scan_result[name], "error": error}
+            pending |= start_stages()
+
+        # Out of budget: stages still waiting run on what their inputs produced
+        late_stages = [task for task in pending if task in stage_tasks] + list(start_stages(ready=False))
+        for task in late_stages:
+            await asyncio.wait([task])
+            event = stage_event(task)
+            if event is not None:
+                yield event
+    except BaseException:
+        if probe_task is not None:
+            probe_task.cancel()  # scan abandoned mid-way (GeneratorExit, cancellation)
+        for task in stage_tasks:
+            task.cancel()
+        raise
+    finally:
+        if shared is None:
+            for task in pending:
+                task.cancel()
+
+    still_running = len([task for task in pending if task in tool_tasks])
+    if still_running:
+        scan_result["errors"].append(
+            f"Total scan timeout ({budget:g}s) — {still_running} tool(s) still running"
+        )
+
+    if probe_task is not None and not scan_result["fingerprints"]:
+        scan_result["fingerprints"] = await probe_task  # bounded by the budget
 
     scan_result["duration_ms"] = int((time.time() - start_time) * 1000)
+    metrics.SCAN_DURATION.observe(time.time() - start_time, lane)
+    yield {"type": "complete", "data": scan_result}
+
+
+async def run_scan(
+    target: str,
+    shared: dict[tuple[str, str], asyncio.Task] | None = None,
+    use_cache: bool = True,
+    lane: str = "interactive",
+    budget: float | None = None,
+    sections: Collection[str] | None = None,
+    previous: dict[str, Any] | None = None,
+    engines: dict[str, str] | None = None,
+    fingerprint: bool = False,
+) -> dict[str, Any]:
+    """Run all recon tools (or only ``sections``) concurrently and return the unified report."""
+    scan_result: dict[str, Any] = {}
+    async for event in stream_scan(
+        target,
+        shared=shared,
+        use_cache=use_cache,
+        lane=lane,
+        budget=budget,
+        sections=sections,
+        previous=previous,
+        engines=engines,
+        fingerprint=fingerprint,
+    ):
+        if event["type"] == "complete":
+            scan_result = event["data"]
     return scan_result
+
+
+async def run_batch_scan(
+    targets: list[str],
+    use_cache: bool = True,
+    sections: Collection[str] | None = None,
+    previous: list[dict[str, Any]] | None = None,
+    engines: dict[str, str] | None = None,
+    fingerprint: bool = False,
+) -> dict[str, Any]:
+    """Scan many targets, running each tool once per distinct input.
+
+    Tools keyed by registrable domain (whois, subfinder) therefore run once per
+    apex rather than once per host. At most BATCH_CONCURRENCY targets are
+    scanned at a time, in the bulk lane; results are returned in input order.
+
+    ``previous`` (e.g. an earlier batch's ``results``) makes every target
+    with a report of the same ``target`` in it a rescan, see stream_scan.
+    """
+    start_time = time.time()
+    shared: dict[tuple[str, str], asyncio.Task] = {}
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    previous_by_target = {p["target"]: p for p in previous or [] if p.get("target")}
+
+    async def scan_one(target: str) -> dict[str, Any]:
+        async with semaphore:
+            return await run_scan(
+                target,
+                shared=shared,
+                use_cache=use_cache,
+                lane="bulk",
+                sections=sections,
+                previous=previous_by_target.get(target),
+                engines=engines,
+                fingerprint=fingerprint,
+            )
+
+    try:
+        outcomes = await asyncio.gather(
+            *(scan_one(t) for t in targets), return_exceptions=True
+        )
+    finally:
+        for task in shared.values():
+            task.cancel()
+
+    results: list[dict[str, Any]] = []
+    for target, outcome in zip(targets, outcomes):
+        if isinstance(outcome, BaseException):
+            results.append({"target": target, "errors": [f"Scan failed: {outcome}"]})
+        else:
+            results.append(outcome)
+
+    return {
+        "results": results,
+        "count": len(results),
+        "tool_runs": len(shared),
+        "duration_ms": int((time.time() - start_time) * 1000),
+    }
@@ -0,0 +1,95 @@
+"""asn_index: range boundaries, gaps, IPv6 and the on-disk forms."""
+
+import gzip
+
+import pytest
+
+import asn_index
+from asn_index import AsnIndex
+
+# Out of order, with a not-routed range, malformed rows and a mixed-version row
+TSV = [
+    "8.8.8.0\t8.8.8.255\t15169\tUS\tGOOGLE\n",
+    "1.0.0.0\t1.0.0.255\t13335\tUS\tCLOUDFLARENET\n",
+    "1.0.1.0\t1.0.3.255\t0\tNone\tNot routed\n",
+    "1.0.4.0\t1.0.7.255\t38803\tAU\tGTELECOM-AUSTRALIA Gtelecom Pty Ltd\n",
+    "2606:4700::\t2606:4700:ffff:ffff:ffff:ffff:ffff:ffff\t13335\tUS\tCLOUDFLARENET\n",
+    "2001:4860::\t2001:4860:ffff:ffff:ffff:ffff:ffff:ffff\t15169\tUS\tGOOGLE\n",
+    "::ffff:0:0\t::ffff:ffff:ffff\t64512\tZZ\tmapped\n",
+    "9.9.9.0\t9.9.9.255\tnot-a-number\tCH\tQUAD9\n",
+    "10.0.0.0\t2001:db8::\t65000\tZZ\tmixed\n",
+    "short\tline\n",
+    "193.0.0.0\t193.0.7.255\t3333\tNL\tRIPE-NCC-AS Réseaux IP Européens\n",
+]
+
+
+@pytest.fixture(scope="module")
+def index() -> AsnIndex:
+    return AsnIndex(asn_index.build(TSV))
+
+
+def test_counts_skip_unrouted_and_malformed(index):
+    assert (index.v4_count, index.v6_count) == (4, 3)
+    assert index.org_count == 5
+
+
+@pytest.mark.parametrize("ip, expected", [
+    ("1.0.0.0", ("AS13335", "CLOUDFLARENET")),  # first address of a range
+    ("1.0.0.255", ("AS13335", "CLOUDFLARENET")),  # last address
+    ("1.0.1.0", None),  # not routed
+    ("1.0.3.255", None),
+    ("1.0.4.0", ("AS38803", "GTELECOM-AUSTRALIA Gtelecom Pty Ltd")),
+    ("1.0.7.255", ("AS38803", "GTELECOM-AUSTRALIA Gtelecom Pty Ltd")),
+    ("1.0.8.0", None),  # gap after a range
+    ("0.255.255.255", None),  # before the first range
+    ("8.8.8.8", ("AS15169", "GOOGLE")),
+    ("193.0.3.1", ("AS3333", "RIPE-NCC-AS Réseaux IP Européens")),  # non-ASCII org
+    ("255.255.255.255", None),  # after the last range
+    ("9.9.9.9", None),  # its row was malformed
+])
+def test_ipv4_boundaries(index, ip, expected):
+    assert index.lookup(ip) == expected
+
+
+@pytest.mark.parametrize("ip, expected", [
+    ("2606:4700::", ("AS13335", "CLOUDFLARENET")),
+    ("2606:4700:10::6816:1", ("AS13335", "CLOUDFLARENET")),
+    ("2606:4700:ffff:ffff:ffff:ffff:ffff:ffff", ("AS13335", "CLOUDFLARENET")),
+    ("2606:4701::", None),
+    ("2001:4860:4860::8888", ("AS15169", "GOOGLE")),
+    ("2001:485f:ffff:ffff:ffff:ffff:ffff:ffff", None),
+    ("::1", None),
+    ("::ffff:8.8.8.8", ("AS64512", "mapped")),  # IPv4-mapped is its own IPv6 range
+])
+def test_ipv6_ranges(index, ip, expected):
+    assert index.lookup(ip) == expected
+
+
+@pytest.mark.parametrize("ip", ["", "not-an-ip", "1.2.3", "2606:4700::zz"])
+def test_invalid_addresses(index, ip):
+    assert index.lookup(ip) is None
+
+
+def test_empty_index():
+    empty = AsnIndex(asn_index.build([]))
+    assert empty.lookup("8.8.8.8") is None
+    assert empty.lookup("2001:4860::1") is None
+
+
+def test_rejects_foreign_buffer():
+    with pytest.raises(ValueError):
+        AsnIndex(b"NOTASN00" + bytes(16))
+
+
+def test_open_compiled_file_and_tsv(tmp_path):
+    compiled = tmp_path / "asn.idx"
+    compiled.write_bytes(asn_index.build(TSV))
+    tsv = tmp_path / "ip2asn.tsv.gz"
+    with gzip.open(tsv, "wt", encoding="utf-8") as f:
+        f.writelines(TSV)
+
+    for path in (compiled, tsv):
+        opened = AsnIndex.open(str(path))
+        assert opened.lookup("1.0.0.1") == ("AS13335", "CLOUDFLARENET")
+        assert opened.lookup("2001:4860::1") == ("AS15169", "GOOGLE")
+        assert opened.lookup("1.0.2.0") is None
@@ -0,0 +1,113 @@
+"""compact: columnar subdomains round-trip and negotiated compression."""
+
+import json
+import os
+
+import pytest
+
+import compact
+from parsers import subdomain_parser
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "subfinder.jsonl"
+)
+
+
+def _section_from_fixture() -> dict:
+    with open(FIXTURE, encoding="utf-8") as f:
+        return subdomain_parser.parse_output(f.read(), "")
+
+
+def _section_from_hosts(count: int) -> dict:
+    lines = [json.dumps({"host": f"node-{i}.eu.example.com", "source": "crtsh"}) for i in range(count)]
+    lines += [json.dumps({"host": f"api{i}.example.com", "source": "alienvault"}) for i in range(count)]
+    return subdomain_parser.parse_output("\n".join(lines), "")
+
+
+def _report(section: dict) -> dict:
+    return {"target": "https://example.com", "dns": {"a_records": ["192.0.2.1"]}, "subdomains": section}
+
+
+@pytest.mark.parametrize("section", [_section_from_fixture(), _section_from_hosts(500)], ids=["fixture", "500"])
+def test_round_trip(section):
+    report = _report(section)
+    encoded = compact.encode_report(report)
+    assert encoded["subdomains"]["encoding"] == compact.SECTION_ENCODING
+    assert encoded["dns"] is report["dns"]
+    # Through the wire format as well
+    wire = json.loads(compact.dumps(encoded))
+    assert compact.decode_report(wire) == report
+    assert compact.decode_report(encoded) == report
+
+
+def test_encoded_section_lists_each_host_once():
+    section = _section_from_hosts(200)
+    assert section["groups"]  # node-*.eu and *.eu groups
+    encoded = compact.encode_subdomains(section)
+    assert encoded["hosts"] == section["subdomains"]
+    assert encoded["host_count"] == len(section["subdomains"])
+    assert set(encoded["dicts"]["source"]) == {"crtsh", "alienvault"}
+    columns = [*encoded["sources"].values(), *encoded["classified"].values()]
+    columns += [group["members"] for group in encoded["groups"]]
+    assert all(isinstance(code, int) for column in columns for code in column)
+
+
+def test_member_missing_from_host_list():
+    section = {
+        "subdomains": ["a.example.com"],
+        "sources": {"a.example.com": "crtsh"},
+        "classified": [],
+        "groups": [{"prefix": "*.example.com", "members": ["a.example.com", "b.example.com"]}],
+        "count": 1,
+    }
+    encoded = compact.encode_subdomains(section)
+    assert encoded["hosts"] == ["a.example.com", "b.example.com"]
+    assert encoded["host_count"] == 1
+    assert compact.decode_subdomains(encoded) == section
+
+
+def test_encode_is_idempotent_and_decode_passes_through():
+    section = _section_from_fixture()
+    encoded = compact.encode_subdomains(section)
+    assert compact.encode_subdomains(encoded) is encoded
+    assert compact.decode_subdomains(section) is section
+    report = {"target": "https://example.com", "subdomains": None}
+    assert compact.encode_report(report) is report
+    assert compact.decode_report(report) is report
+
+
+def test_decode_batch_and_job_shapes():
+    report = _report(_section_from_fixture())
+    encoded = compact.encode_report(report)
+    batch = {"results": [encoded, encoded], "count": 2}
+    assert compact.decode_report(batch) == {"results": [report, report], "count": 2}
+    job = {"id": "j1", "status": "done", "result": encoded}
+    assert compact.decode_report(job)["result"] == report
+    running = {"id": "j2", "status": "running", "partial": {"subdomains": encoded["subdomains"]}}
+    assert compact.decode_report(running)["partial"] == {"subdomains": report["subdomains"]}
+
+
+def test_compress_gzip_round_trip():
+    body = compact.dumps(compact.encode_report(_report(_section_from_hosts(300))))
+    coding, compressed = compact.compress(body, "gzip, deflate")
+    assert coding == "gzip" and len(compressed) < len(body)
+    assert compact.decompress(compressed) == body
+
+
+@pytest.mark.skipif(compact.zstandard is None, reason="zstandard not installed")
+def test_compress_prefers_zstd():
+    body = compact.dumps(compact.encode_report(_report(_section_from_hosts(300))))
+    coding, compressed = compact.compress(body, "gzip, zstd")
+    assert coding == "zstd"
+    assert compact.decompress(compressed) == body
+
+
+@pytest.mark.parametrize("accept", ["", "identity", "gzip;q=0", "br"])
+def test_compress_declined(accept):
+    body = b"x" * (compact.MIN_COMPRESS_BYTES * 4)
+    assert compact.compress(body, accept) == (None, body)
+
+
+def test_small_body_sent_as_is():
+    body = b"{}"
+    assert compact.compress(body, "gzip") == (None, body)
@@ -0,0 +1,293 @@
+"""dns_client against stand-in DNS servers (UDP and TCP) on the loopback interface."""
+
+import asyncio
+import socket
+import struct
+import time
+
+import pytest
+
+import dns_client
+
+A, NS, CNAME, SOA, MX, AAAA = (dns_client.RECORD_TYPES[t] for t in ("A", "NS", "CNAME", "SOA", "MX", "AAAA"))
+NOERROR, NXDOMAIN, SERVFAIL = 0, 3, 2
+
+
+def _name(name: str) -> bytes:
+    return b"".join(bytes((len(label),)) + label.encode() for label in name.split(".")) + b"\0"
+
+
+def _rdata(rtype: int, value) -> bytes:
+    if rtype == A:
+        return socket.inet_pton(socket.AF_INET, value)
+    if rtype == AAAA:
+        return socket.inet_pton(socket.AF_INET6, value)
+    if rtype in (NS, CNAME):
+        return _name(value)
+    if rtype == MX:
+        return struct.pack("!H", 10) + _name(value)
+    if rtype == SOA:  # value: negative-caching minimum
+        return (
+            _name("ns1.example.test") + _name("hostmaster.example.test")
+            + struct.pack("!5I", 1, 7200, 900, 86400, value)
+        )
+    raise ValueError(rtype)
+
+
+def _record(name: str, rtype: int, ttl: int, value) -> bytes:
+    rdata = _rdata(rtype, value)
+    return _name(name) + struct.pack("!HHIH", rtype, 1, ttl, len(rdata)) + rdata
+
+
+class StandInDns:
+    """A recursive server stand-in answering from a small zone, over UDP and TCP on one port.
+
+    ``zone`` maps (name, type) to [(owner, type, ttl, value)] answer records
+    (a CNAME chain is listed in order). Names in ``nxdomain`` get NXDOMAIN
+    with an SOA, names or (name, type) pairs in ``servfail`` SERVFAIL, names
+    in ``truncate`` an empty truncated UDP reply; ``silent`` servers log UDP
+    queries but never answer them.
+    """
+
+    def __init__(
+        self, zone=None, nxdomain=(), servfail=(), truncate=(),
+        delay=0.0, silent=False, soa_ttl=300, soa_minimum=30,
+    ):
+        self.zone = zone or {}
+        self.nxdomain, self.servfail, self.truncate = set(nxdomain), set(servfail), set(truncate)
+        self.delay = delay
+        self.silent = silent
+        self.soa = (soa_ttl, soa_minimum)
+        self.queries: list[tuple[str, int, str]] = []  # (name, type, "udp" or "tcp")
+        self.port = 0
+        self._udp = None
+        self._tcp = None
+
+    def reply(self, message: bytes, transport: str) -> bytes:
+        qid, flags = struct.unpack_from("!HH", message)
+        name, offset = dns_client._read_name(message, 12)
+        qtype = struct.unpack_from("!H", message, offset)[0]
+        question = message[12:offset + 4]
+        self.queries.append((name, qtype, transport))
+
+        rcode, answers, authority, tc = NOERROR, [], [], 0
+        if name in self.servfail or (name, qtype) in self.servfail:
+            rcode = SERVFAIL
+        elif name in self.truncate and transport == "udp":
+            tc = dns_client.FLAG_TC
+        elif name in self.nxdomain or (name, qtype) not in self.zone:
+            rcode = NXDOMAIN if name in self.nxdomain else NOERROR
+            authority = [_record("example.test", SOA, self.soa[0], self.soa[1])]
+        else:
+            answers = [_record(*r) for r in self.zone[(name, qtype)]]
+        header = struct.pack(
+            "!HHHHHH", qid, 0x8000 | (flags & dns_client.FLAG_RD) | 0x0080 | tc | rcode,
+            1, len(answers), len(authority), 0,
+        )
+        return header + question + b"".join(answers) + b"".join(authority)
+
+    async def start(self) -> tuple[str, int]:
+        loop = asyncio.get_running_loop()
+        server = self
+
+        class Udp(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                reply = server.reply(data, "udp")
+                if not server.silent:
+                    loop.call_later(server.delay, self.transport.sendto, reply, addr)
+
+        async def tcp(reader, writer):
+            try:
+                length = struct.unpack("!H", await reader.readexactly(2))[0]
+                reply = self.reply(await reader.readexactly(length), "tcp")
+                writer.write(struct.pack("!H", len(reply)) + reply)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        for _ in range(20):  # find a port free for both UDP and TCP
+            self._udp, _ = await loop.create_datagram_endpoint(Udp, local_addr=("127.0.0.1", 0))
+            self.port = self._udp.get_extra_info("sockname")[1]
+            try:
+                self._tcp = await asyncio.start_server(tcp, "127.0.0.1", self.port)
+                return ("127.0.0.1", self.port)
+            except OSError:
+                self._udp.close()
+        raise RuntimeError("no free port")
+
+    def close(self) -> None:
+        self._udp.close()
+        self._tcp.close()
+
+    def count(self, name: str, qtype: int, transport: str | None = None) -> int:
+        return sum(1 for q in self.queries if q[:2] == (name, qtype) and transport in (None, q[2]))
+
+
+ZONE = {
+    ("example.test", A): [("example.test", A, 300, "192.0.2.1")],
+    ("example.test", AAAA): [("example.test", AAAA, 300, "2001:db8::1")],
+    ("example.test", NS): [
+        ("example.test", NS, 3600, "ns1.example.test"),
+        ("example.test", NS, 3600, "ns2.example.test"),
+    ],
+    ("example.test", MX): [("example.test", MX, 3600, "mail.example.test")],
+    ("www.example.test", A): [
+        ("www.example.test", CNAME, 600, "edge.cdn.test"),
+        ("edge.cdn.test", CNAME, 120, "pop1.cdn.test"),
+        ("pop1.cdn.test", A, 60, "198.51.100.7"),
+    ],
+    ("www.example.test", CNAME): [("www.example.test", CNAME, 600, "edge.cdn.test")],
+    ("big.example.test", A): [("big.example.test", A, 300, f"192.0.2.{i}") for i in range(1, 41)],
+}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_resolver(monkeypatch):
+    monkeypatch.setattr(dns_client, "QUERY_TIMEOUT", 0.3)
+    dns_client.reset()
+    yield
+    dns_client.reset()
+
+
+def _run(servers: list[StandInDns], scenario, monkeypatch):
+    async def main():
+        addresses = [await s.start() for s in servers]
+        monkeypatch.setenv("DNS_SERVERS", ",".join(f"{host}:{port}" for host, port in addresses))
+        dns_client.reset()
+        try:
+            return await scenario()
+        finally:
+            for s in servers:
+                s.close()
+            dns_client.reset()
+
+    return asyncio.run(main())
+
+
+def test_resolve_all_types(monkeypatch):
+    server = StandInDns(ZONE)
+    records = _run([server], lambda: dns_client.resolve("example.test"), monkeypatch)
+    assert records == {
+        "A": ["192.0.2.1"],
+        "AAAA": ["2001:db8::1"],
+        "CNAME": [],
+        "NS": ["ns1.example.test", "ns2.example.test"],
+        "MX": ["mail.example.test"],
+    }
+
+
+def test_cname_chain(monkeypatch):
+    server = StandInDns(ZONE)
+
+    async def scenario():
+        return await dns_client.query("www.example.test", "A"), await dns_client.resolve("www.example.test")
+
+    answer, records = _run([server], scenario, monkeypatch)
+    assert answer == {"CNAME": ["edge.cdn.test", "pop1.cdn.test"], "A": ["198.51.100.7"]}
+    assert records["A"] == ["198.51.100.7"]
+    assert records["CNAME"] == ["edge.cdn.test", "pop1.cdn.test"]
+
+
+def test_answer_cached_for_smallest_ttl(monkeypatch):
+    server = StandInDns(ZONE)
+
+    async def scenario():
+        await dns_client.query("www.example.test", "A")
+        await dns_client.query("www.example.test", "A")
+        return dns_client._cache[("www.example.test", A)][0] - time.monotonic()
+
+    remaining = _run([server], scenario, monkeypatch)
+    assert server.count("www.example.test", A) == 1
+    assert 55 < remaining <= 60  # the A record's TTL, not the CNAMEs'
+
+
+def test_truncated_reply_retried_over_tcp(monkeypatch):
+    server = StandInDns(ZONE, truncate={"big.example.test"})
+    answer = _run([server], lambda: dns_client.query("big.example.test", "A"), monkeypatch)
+    assert len(answer["A"]) == 40
+    assert server.count("big.example.test", A, "udp") == 1
+    assert server.count("big.example.test", A, "tcp") == 1
+
+
+def test_nxdomain_cached_for_soa_negative_ttl(monkeypatch):
+    server = StandInDns(ZONE, nxdomain={"missing.example.test"}, soa_ttl=300, soa_minimum=30)
+
+    async def scenario():
+        first = await dns_client.query("missing.example.test", "A")
+        second = await dns_client.query("missing.example.test", "A")
+        return first, second, dns_client._cache[("missing.example.test", A)][0] - time.monotonic()
+
+    first, second, remaining = _run([server], scenario, monkeypatch)
+    assert first == second == {}
+    assert server.count("missing.example.test", A) == 1
+    assert 25 < remaining <= 30  # min(SOA TTL, SOA minimum), RFC 2308
+
+
+def test_nodata_is_empty(monkeypatch):
+    server = StandInDns(ZONE)
+    assert _run([server], lambda: dns_client.query("www.example.test", "MX"), monkeypatch) == {}
+
+
+def test_servfail_on_a_raises(monkeypatch):
+    server = StandInDns(ZONE, servfail={"broken.example.test"})
+
+    async def scenario():
+        with pytest.raises(dns_client.DnsError, match="rcode 2"):
+            await dns_client.resolve("broken.example.test")
+
+    _run([server], scenario, monkeypatch)
+    assert server.count("broken.example.test", A) == dns_client.ATTEMPTS
+    assert ("broken.example.test", A) not in dns_client._cache
+
+
+def test_failed_secondary_type_is_empty(monkeypatch):
+    server = StandInDns(ZONE, servfail={("example.test", MX)})
+    records = _run([server], lambda: dns_client.resolve("example.test"), monkeypatch)
+    assert records["A"] == ["192.0.2.1"]
+    assert records["MX"] == []
+
+
+def test_timeout_moves_on_to_next_server(monkeypatch):
+    silent, working = StandInDns(ZONE, silent=True), StandInDns(ZONE)
+    answer = _run([silent, working], lambda: dns_client.query("example.test", "A"), monkeypatch)
+    assert answer == {"A": ["192.0.2.1"]}
+    assert silent.count("example.test", A) == 1
+    assert working.count("example.test", A) == 1
+
+
+def test_unreachable_servers_raise(monkeypatch):
+    silent = StandInDns(ZONE, silent=True)
+
+    async def scenario():
+        with pytest.raises(dns_client.DnsError, match="no answer"):
+            await dns_client.query("example.test", "A")
+
+    _run([silent], scenario, monkeypatch)
+    assert silent.count("example.test", A) == dns_client.ATTEMPTS
+
+
+def test_concurrent_identical_queries_share_one_exchange(monkeypatch):
+    server = StandInDns(ZONE, delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(dns_client.query("example.test", "A") for _ in range(10)))
+
+    answers = _run([server], scenario, monkeypatch)
+    assert all(answer == {"A": ["192.0.2.1"]} for answer in answers)
+    assert server.count("example.test", A) == 1
+
+
+def test_many_concurrent_names_over_pooled_sockets(monkeypatch):
+    hosts = [f"h{i}.example.test" for i in range(1, 101)]
+    zone = {(host, A): [(host, A, 300, f"192.0.2.{i}")] for i, host in enumerate(hosts, 1)}
+    server = StandInDns(zone, delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(*(dns_client.query(f"h{i}.example.test", "A") for i in range(1, 101)))
+
+    answers = _run([server], scenario, monkeypatch)
+    assert [a["A"] for a in answers] == [[f"192.0.2.{i}"] for i in range(1, 101)]
+    assert server.count("h1.example.test", A) == 1
@@ -0,0 +1,136 @@
+"""Scan job workers: surviving database errors and giving up on poison jobs."""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture(autouse=True)
+def _fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobs, "_db", None)
+    monkeypatch.setattr(jobs, "ERROR_BACKOFF", 0.01)
+    monkeypatch.setattr(jobs, "JOB_WORKERS", 1)
+    yield
+    if jobs._db is not None:
+        jobs._db.close()
+
+
+def _complete(**request):
+    async def events():
+        yield {"type": "complete", "data": {"target": request["target"]}}
+
+    return events()
+
+
+async def _until(predicate, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_job_runs_to_done(monkeypatch):
+    monkeypatch.setattr(jobs, "stream_scan", _complete)
+
+    async def scenario():
+        jobs.start()
+        try:
+            job_id = jobs.submit({"target": "https://example.com"})
+            return await jobs.wait(job_id, 2)
+        finally:
+            await jobs.shutdown()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "done"
+    assert job["result"] == {"target": "https://example.com"}
+
+
+def test_worker_survives_database_error(monkeypatch):
+    monkeypatch.setattr(jobs, "stream_scan", _complete)
+    real_finish = jobs._finish
+    failures = []
+
+    def flaky_finish(*args):
+        # The first run's result and then its error branch both hit a locked database
+        if len(failures) < 2:
+            failures.append(args[0])
+            raise sqlite3.OperationalError("database is locked")
+        real_finish(*args)
+
+    monkeypatch.setattr(jobs, "_finish", flaky_finish)
+
+    async def scenario():
+        jobs.start()
+        try:
+            job_id = jobs.submit({"target": "https://example.com"})
+            await _until(lambda: jobs.get(job_id)["status"] == "done")
+            return job_id, len(jobs._workers)
+        finally:
+            await jobs.shutdown()
+
+    job_id, workers = asyncio.run(scenario())
+    assert failures == [job_id, job_id]  # requeued after the errors, then finished
+    assert workers == 1
+
+
+def test_dead_worker_is_replaced(monkeypatch):
+    monkeypatch.setattr(jobs, "stream_scan", _complete)
+
+    async def crash():
+        raise RuntimeError("worker bug")
+
+    async def scenario():
+        jobs.start()
+        try:
+            # A worker that dies despite its guard, registered as _start_worker does
+            dead = asyncio.create_task(crash())
+            dead.add_done_callback(jobs._replace_worker)
+            jobs._workers.append(dead)
+            await _until(lambda: dead not in jobs._workers)
+            job = await jobs.wait(jobs.submit({"target": "https://example.com"}), 2)
+            return job, list(jobs._workers)
+        finally:
+            await jobs.shutdown()
+
+    job, workers = asyncio.run(scenario())
+    assert job["status"] == "done"
+    assert len(workers) == 2  # the original worker and the replacement
+
+
+def test_interrupted_job_failed_after_max_attempts():
+    db = jobs._connect()
+    job_id = jobs.submit({"target": "https://example.com"})
+    for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+        assert jobs._claim()[0] == job_id  # the process then dies mid-scan
+        jobs._requeue()  # the next start
+        status = jobs.get(job_id)["status"]
+        assert status == ("failed" if attempt == jobs.MAX_ATTEMPTS else "queued")
+    assert db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == jobs.MAX_ATTEMPTS
+    assert "interrupted" in jobs.get(job_id)["error"]
+
+
+def test_shutdown_requeue_does_not_count(monkeypatch):
+    def slow(**request):
+        async def events():
+            await asyncio.sleep(10)
+            yield {"type": "complete", "data": {}}
+
+        return events()
+
+    monkeypatch.setattr(jobs, "stream_scan", slow)
+
+    async def scenario():
+        jobs.start()
+        job_id = jobs.submit({"target": "https://example.com"})
+        await _until(lambda: jobs.get(job_id)["status"] == "running")
+        await jobs.shutdown()
+        return job_id
+
+    job_id = asyncio.run(scenario())
+    assert jobs.get(job_id)["status"] == "queued"
+    assert jobs._connect().execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == 0
@@ -0,0 +1,322 @@
+"""Scheduler pieces: admission control, priority lanes and shared runs."""
+
+import asyncio
+import math
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import scanner
+from scanner import Admission, PrioritySemaphore, ScanRejected
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+# ---------------------------------------------------------------------------
+# Admission
+# ---------------------------------------------------------------------------
+
+def test_admission_queues_then_rejects_with_retry_after():
+    admission = Admission({"interactive": (2, 1), "bulk": (1, 0)})
+
+    async def scenario():
+        first = await admission.acquire("interactive")
+        await admission.acquire("interactive")
+        waiter = asyncio.create_task(admission.acquire("interactive"))
+        await _settle()
+        assert (admission.running["interactive"], admission.queued["interactive"]) == (2, 1)
+
+        with pytest.raises(ScanRejected) as rejected:
+            await admission.acquire("interactive")
+        assert rejected.value.lane == "interactive"
+        # Initial 30s average scan time x (1 queued + this one) / 2 running slots
+        assert rejected.value.retry_after == 30
+
+        # The bulk lane has its own slots
+        await admission.acquire("bulk")
+        with pytest.raises(ScanRejected):
+            await admission.acquire("bulk")
+
+        admission.release("interactive", first)
+        await waiter
+        assert (admission.running["interactive"], admission.queued["interactive"]) == (2, 0)
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_follows_observed_scan_time():
+    admission = Admission({"interactive": (1, 0), "bulk": (1, 0)})
+
+    async def scenario():
+        for _ in range(20):
+            admission.release("interactive", await admission.acquire("interactive"))
+        # Near-instant scans pull the average towards 0; the hint stays >= 1
+        assert admission.retry_after("interactive") == 1
+        admission._avg_duration = 100.0
+        assert admission.retry_after("interactive") == math.ceil(100.0 * 1 / 1)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    admission = Admission({"interactive": (1, 1), "bulk": (1, 0)})
+
+    async def scenario():
+        started = await admission.acquire("interactive")
+        waiter = asyncio.create_task(admission.acquire("interactive"))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.queued["interactive"] == 0
+        admission.release("interactive", started)
+        # The slot went back, not to the cancelled waiter
+        await asyncio.wait_for(admission.acquire("interactive"), 1)
+
+    asyncio.run(scenario())
+
+
+def test_admitted_releases_on_error():
+    admission = Admission({"interactive": (1, 0), "bulk": (1, 0)})
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with admission.admitted("interactive"):
+                raise RuntimeError("scan failed")
+        assert admission.running["interactive"] == 0
+        async with admission.admitted("interactive"):
+            assert admission.running["interactive"] == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("path", ["/scan", "/scan/stream"])
+def test_full_queue_is_http_429(monkeypatch, path):
+    full = Admission({"interactive": (1, 0), "bulk": (1, 0)})
+    asyncio.run(full.acquire("interactive"))  # the only slot, and no queue
+    monkeypatch.setattr(main, "admission", full)
+
+    response = TestClient(main.app).post(path, json={"target": "example.com"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert "interactive queue is full" in response.json()["detail"]
+
+
+# ---------------------------------------------------------------------------
+# PrioritySemaphore
+# ---------------------------------------------------------------------------
+
+def test_priority_semaphore_wakes_interactive_first():
+    semaphore = PrioritySemaphore(1)
+    order: list[str] = []
+
+    async def take(name: str, lane: str) -> None:
+        await semaphore.acquire(lane)
+        order.append(name)
+
+    async def scenario():
+        await semaphore.acquire("interactive")
+        # Bulk waiters queued first, interactive ones after
+        tasks = [asyncio.create_task(take(f"bulk{i}", "bulk")) for i in range(2)]
+        await _settle()
+        tasks += [asyncio.create_task(take(f"ui{i}", "interactive")) for i in range(2)]
+        await _settle()
+        assert semaphore.waiting("bulk") == 2 and semaphore.waiting("interactive") == 2
+        for _ in range(4):
+            semaphore.release()
+            await _settle()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["ui0", "ui1", "bulk0", "bulk1"]  # by lane, FIFO within a lane
+
+
+def test_priority_semaphore_limit_and_no_queue_jumping():
+    semaphore = PrioritySemaphore(2)
+
+    async def scenario():
+        await semaphore.acquire("bulk")
+        await semaphore.acquire("bulk")
+        waiter = asyncio.create_task(semaphore.acquire("bulk"))
+        await _settle()
+        assert semaphore.active == 2 and semaphore.waiting() == 1
+        semaphore.release()
+        await waiter
+        assert semaphore.active == 2 and semaphore.waiting() == 0
+
+    asyncio.run(scenario())
+
+
+def test_priority_semaphore_cancelled_waiters():
+    semaphore = PrioritySemaphore(1)
+
+    async def scenario():
+        await semaphore.acquire("interactive")
+
+        # Cancelled while waiting: removed from its lane
+        waiting = asyncio.create_task(semaphore.acquire("bulk"))
+        await _settle()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert semaphore.waiting() == 0
+
+        # Cancelled right after the slot was handed over: the slot comes back
+        handed = asyncio.create_task(semaphore.acquire("bulk"))
+        await _settle()
+        semaphore.release()
+        handed.cancel()
+        await asyncio.gather(handed, return_exceptions=True)
+        assert semaphore.active == 0
+        await asyncio.wait_for(semaphore.acquire("interactive"), 1)
+
+    asyncio.run(scenario())
+
+
+def test_tool_slots_cover_every_tool():
+    assert set(scanner._tool_slots) == set(scanner.TOOLS) | set(scanner.TOOL_SECTIONS)
+
+
+# ---------------------------------------------------------------------------
+# SingleFlight
+# ---------------------------------------------------------------------------
+
+def test_single_flight_shares_one_run():
+    flights = scanner.SingleFlight()
+    calls = 0
+
+    async def start() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("k", start) for _ in range(3)))
+        assert results == [1, 1, 1]
+        assert not flights.running("k")
+        assert await flights.run("k", start) == 2  # a finished run is not reused
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_survives_one_waiter_leaving():
+    flights = scanner.SingleFlight()
+    release = None
+
+    async def start() -> str:
+        await release.wait()
+        return "done"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        leaving = asyncio.create_task(flights.run("k", start))
+        staying = asyncio.create_task(flights.run("k", start))
+        await _settle()
+        leaving.cancel()
+        await asyncio.gather(leaving, return_exceptions=True)
+        assert flights.running("k")
+        release.set()
+        assert await staying == "done"
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_cancelled_when_every_waiter_leaves():
+    flights = scanner.SingleFlight()
+    cancelled = False
+
+    async def start() -> None:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def scenario():
+        waiters = [asyncio.create_task(flights.run("k", start)) for _ in range(2)]
+        await _settle()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await _settle()
+        assert cancelled
+        assert not flights.running("k")
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_error_reaches_every_waiter():
+    flights = scanner.SingleFlight()
+
+    async def start() -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("tool crashed")
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.run("k", start) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not flights.running("k")
+
+    asyncio.run(scenario())
+
+
+class _StubTool:
+    CACHE_TTL = 0
+
+    @staticmethod
+    def input_key(target: str) -> str:
+        return target
+
+
+def _stub_scheduled(monkeypatch, runs: list) -> None:
+    async def scheduled(name, module, target, lane, deadline):
+        runs.append((lane, deadline))
+        loop = asyncio.get_running_loop()
+        # Stands in for a tool that takes 50ms unless the deadline stops it first
+        stop = loop.time() + 0.05 if deadline is None else min(loop.time() + 0.05, deadline)
+        await asyncio.sleep(max(0.0, stop - loop.time()))
+        timed_out = deadline is not None and loop.time() >= deadline
+        return name, None if timed_out else {"ok": lane}, "timed out" if timed_out else None, {"timed_out": timed_out}
+
+    monkeypatch.setattr(scanner, "_run_tool_scheduled", scheduled)
+
+
+def test_tool_runs_are_not_shared_across_lanes(monkeypatch):
+    runs: list = []
+    _stub_scheduled(monkeypatch, runs)
+
+    async def scenario():
+        return await asyncio.gather(
+            scanner.run_tool_cached("stub", _StubTool, "example.com", lane="bulk"),
+            scanner.run_tool_cached("stub", _StubTool, "example.com", lane="bulk"),
+            scanner.run_tool_cached("stub", _StubTool, "example.com", lane="interactive"),
+        )
+
+    bulk, joined, interactive = asyncio.run(scenario())
+    assert sorted(lane for lane, _ in runs) == ["bulk", "interactive"]
+    assert bulk[1] == joined[1] == {"ok": "bulk"}
+    assert interactive[1] == {"ok": "interactive"}
+
+
+def test_joiner_reruns_after_earlier_deadline(monkeypatch):
+    runs: list = []
+    _stub_scheduled(monkeypatch, runs)
+
+    async def scenario():
+        now = time.monotonic()
+        return await asyncio.gather(
+            scanner.run_tool_cached("stub", _StubTool, "example.com", lane="bulk", deadline=now + 0.01),
+            scanner.run_tool_cached("stub", _StubTool, "example.com", lane="bulk", deadline=now + 5),
+        )
+
+    short, joined = asyncio.run(scenario())
+    assert short[2] == "timed out"
+    assert joined[2] is None and joined[1] == {"ok": "bulk"}
+    assert len(runs) == 2 and runs[1][1] > runs[0][1]  # second run under the joiner's deadline
@@ -0,0 +1,46 @@
+"""sslyze_parser.parse_data on recorded and unreachable-server results."""
+
+import json
+import os
+
+from parsers import sslyze_parser
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "sslyze.json"
+)
+
+
+def _recorded() -> dict:
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_recorded_scan_is_clean():
+    result = sslyze_parser.parse_data(_recorded())
+    assert "_error" not in result
+    assert result["protocols"]
+    assert result["cipher_suites"]
+
+
+def test_no_connectivity_is_an_error():
+    data = _recorded()
+    scan = data["server_scan_results"][0]
+    scan.update(
+        connectivity_status="ERROR",
+        connectivity_error_trace=(
+            "Traceback (most recent call last):\n  ...\n"
+            'sslyze.errors.ServerRejectedConnection: example.com:443 -> "Server rejected the connection".\n'
+        ),
+        connectivity_result=None,
+        scan_status="ERROR_NO_CONNECTIVITY",
+        scan_result=None,
+    )
+    result = sslyze_parser.parse_data(data)
+    assert result["_error"].startswith("sslyze.errors.ServerRejectedConnection")
+    assert result["protocols"] == [] and result["cipher_suites"] == []
+
+
+def test_no_connectivity_without_trace():
+    data = _recorded()
+    data["server_scan_results"][0].update(connectivity_status="ERROR", connectivity_error_trace=None, scan_result=None)
+    assert sslyze_parser.parse_data(data)["_error"] == "connectivity ERROR"
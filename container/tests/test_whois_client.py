@@ -0,0 +1,161 @@
+"""whois_client against stand-in port-43 servers on loopback addresses."""
+
+import asyncio
+import os
+
+import pytest
+
+import whois_client
+from parsers import whois_parser
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "whois_com.txt"
+)
+
+# IANA, a thin registry and a registrar, all on one port
+IANA, REGISTRY, REGISTRAR = "127.0.0.1", "127.0.0.2", "127.0.0.3"
+
+
+def _records() -> tuple[str, str]:
+    """(registry record, registrar record) of the recorded .com lookup, referring to REGISTRAR."""
+    with open(FIXTURE, encoding="utf-8") as f:
+        text = f.read()
+    split = text.index("Domain Name: example.com")
+    return text[:split].replace("whois.markmonitor.com", REGISTRAR), text[split:]
+
+
+def _thin_registry(*domains: str) -> dict[tuple[str, str], str]:
+    registry, registrar = _records()
+    answers = {(IANA, "com"): f"refer:        {REGISTRY}\n"}
+    for domain in domains or ("example.com",):
+        answers[(REGISTRY, domain)] = registry
+        answers[(REGISTRAR, domain)] = registrar
+    return answers
+
+
+class StandIn:
+    """Port-43 servers answering ``answers[(address, request)]``; records requests and peak load."""
+
+    def __init__(self, answers: dict[tuple[str, str], str], delay: float = 0) -> None:
+        self.answers = answers
+        self.delay = delay
+        self.requests: list[tuple[str, str]] = []
+        self.open = self.peak = 0
+        self._servers: list[asyncio.Server] = []
+
+    async def start(self) -> int:
+        port = 0
+        for address in (IANA, REGISTRY, REGISTRAR):
+            server = await asyncio.start_server(self._handle, address, port)
+            port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        return port
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.open += 1
+        self.peak = max(self.peak, self.open)
+        try:
+            address = writer.get_extra_info("sockname")[0]
+            request = (await reader.readline()).decode().strip()
+            self.requests.append((address, request))
+            await asyncio.sleep(self.delay)
+            writer.write(self.answers.get((address, request), "No match\r\n").encode())
+            await writer.drain()
+        finally:
+            self.open -= 1
+            writer.close()
+
+    def close(self) -> None:
+        for server in self._servers:
+            server.close()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_client(monkeypatch):
+    monkeypatch.setattr(whois_client, "IANA_SERVER", IANA)
+    monkeypatch.setattr(whois_client, "SERVER_INTERVAL", 0)
+    monkeypatch.setattr(whois_client, "WHOIS_PORT", whois_client.WHOIS_PORT)  # restored afterwards
+    whois_client.reset()
+    yield
+    whois_client.reset()
+
+
+def _run(stand_in: StandIn, scenario):
+    async def main():
+        whois_client.WHOIS_PORT = await stand_in.start()
+        try:
+            return await scenario()
+        finally:
+            stand_in.close()
+
+    return asyncio.run(main())
+
+
+def test_follows_registrar_referral():
+    registry, registrar = _records()
+    stand_in = StandIn(_thin_registry())
+    text = _run(stand_in, lambda: whois_client.lookup("Example.COM."))
+    assert text == registry + "\n" + registrar
+    assert stand_in.requests == [(IANA, "com"), (REGISTRY, "example.com"), (REGISTRAR, "example.com")]
+    assert whois_parser.parse_output(text, "")["expiry_date"] == "2027-08-13T04:00:00Z"
+
+
+def test_cached_referral_skips_registry_but_keeps_its_record():
+    stand_in = StandIn(_thin_registry())
+
+    async def scenario():
+        first = await whois_client.lookup("example.com")
+        stand_in.requests.clear()
+        return first, await whois_client.lookup("example.com")
+
+    first, second = _run(stand_in, scenario)
+    assert stand_in.requests == [(REGISTRAR, "example.com")]
+    assert second == first
+    assert whois_parser.parse_output(second, "")["expiry_date"] == "2027-08-13T04:00:00Z"
+
+
+def test_registrar_record_alone_has_expiry():
+    _, registrar = _records()
+    assert whois_parser.parse_output(registrar, "")["expiry_date"] == "2027-08-13T04:00:00+0000"
+
+
+def test_unreachable_registrar_returns_registry_record():
+    answers = _thin_registry()
+    answers[(REGISTRY, "example.com")] = answers[(REGISTRY, "example.com")].replace(REGISTRAR, "127.0.0.4")
+    text = _run(StandIn(answers), lambda: whois_client.lookup("example.com"))
+    assert text == answers[(REGISTRY, "example.com")]
+    assert whois_parser.parse_output(text, "")["expiry_date"] == "2027-08-13T04:00:00Z"
+
+
+def test_tld_without_registry_raises():
+    stand_in = StandIn({(IANA, "invalid"): "% no such TLD\n"})
+
+    async def scenario():
+        with pytest.raises(whois_client.WhoisError):
+            await whois_client.lookup("example.invalid")
+
+    _run(stand_in, scenario)
+    assert stand_in.requests == [(IANA, "invalid")]
+
+
+def test_tld_registry_is_cached():
+    stand_in = StandIn(_thin_registry("example.com", "other.com"))
+
+    async def scenario():
+        await whois_client.lookup("example.com")
+        await whois_client.lookup("other.com")
+
+    _run(stand_in, scenario)
+    assert stand_in.requests.count((IANA, "com")) == 1
+    assert (REGISTRY, "other.com") in stand_in.requests
+
+
+def test_server_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(whois_client, "SERVER_CONCURRENCY", 1)
+    stand_in = StandIn(_thin_registry(), delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(whois_client.query(REGISTRY, "example.com") for _ in range(4)))
+
+    assert len(set(_run(stand_in, scenario))) == 1
+    assert stand_in.peak == 1
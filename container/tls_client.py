@@ -0,0 +1,201 @@
+"""Fast TLS engine: concurrent single-handshake probes with the stdlib ``ssl`` module.
+
+Instead of enumerating every cipher suite per protocol version (sslyze), this
+fires one handshake per protocol version, each pinned to that version, plus
+one per weak cipher class (offering only that class, up to TLS 1.2). A
+handshake that completes shows the version (or class) is accepted and which
+suite the server picked; the leaf certificate comes from the best one.
+
+The result has sslyze_parser's shape. ``protocols`` should match a full scan;
+``cipher_suites`` holds only the suites seen in these handshakes (each
+version's preferred suite and any weak-class hits), named as sslyze names
+them, so it is a subset of the full list. Versions or classes the local
+OpenSSL cannot offer are not probed.
+"""
+
+import asyncio
+import re
+import socket
+import ssl
+from typing import Any
+
+try:
+    from cryptography import x509
+except ImportError:  # installed with sslyze; without it the certificate is left empty
+    x509 = None
+
+HANDSHAKE_TIMEOUT = 5  # seconds per probe (connect + handshake)
+
+PROTOCOL_VERSIONS = (
+    ("TLSv1.0", ssl.TLSVersion.TLSv1),
+    ("TLSv1.1", ssl.TLSVersion.TLSv1_1),
+    ("TLSv1.2", ssl.TLSVersion.TLSv1_2),
+    ("TLSv1.3", ssl.TLSVersion.TLSv1_3),
+)
+
+# Weak cipher classes, each probed on its own (OpenSSL cipher strings)
+WEAK_CIPHER_PROBES = {
+    "rc4": "RC4",
+    "3des": "3DES",
+    "static_rsa": "kRSA",  # no forward secrecy
+    "cbc_sha1": "SHA1+AES:SHA1+CAMELLIA",
+    "anonymous_or_null": "aNULL:eNULL",
+}
+
+# OpenSSL key-exchange/auth name prefixes -> IANA (RFC) form; none means RSA
+_KEY_EXCHANGE = {
+    "ECDHE-RSA": "ECDHE_RSA",
+    "ECDHE-ECDSA": "ECDHE_ECDSA",
+    "DHE-RSA": "DHE_RSA",
+    "DHE-DSS": "DHE_DSS",
+    "EDH-RSA": "DHE_RSA",
+    "EDH-DSS": "DHE_DSS",
+    "ECDHE": "ECDHE_RSA",  # ECDHE-ARIA*
+    "ECDH-RSA": "ECDH_RSA",
+    "ECDH-ECDSA": "ECDH_ECDSA",
+    "DH-RSA": "DH_RSA",
+    "DH-DSS": "DH_DSS",
+    "AECDH": "ECDH_anon",
+    "ADH": "DH_anon",
+}
+_BLOCK_CIPHER = re.compile(r"(AES|CAMELLIA|ARIA)(128|256)(?:-(GCM|CCM8|CCM))?(?:-(SHA\d*))?")
+_OTHER_CIPHERS = {
+    "CHACHA20-POLY1305": "CHACHA20_POLY1305_SHA256",
+    "DES-CBC3-SHA": "3DES_EDE_CBC_SHA",
+    "DES-CBC-SHA": "DES_CBC_SHA",
+    "RC4-SHA": "RC4_128_SHA",
+    "RC4-MD5": "RC4_128_MD5",
+    "SEED-SHA": "SEED_CBC_SHA",
+    "IDEA-CBC-SHA": "IDEA_CBC_SHA",
+    "NULL-SHA": "NULL_SHA",
+    "NULL-SHA256": "NULL_SHA256",
+    "NULL-MD5": "NULL_MD5",
+}
+
+
+def iana_name(openssl_name: str) -> str:
+    """IANA name of an OpenSSL cipher suite name, as sslyze reports it (unknown names pass through)."""
+    if openssl_name.startswith("TLS_"):  # TLS 1.3 suites share their names
+        return openssl_name
+    key_exchange, rest = "RSA", openssl_name
+    for prefix, name in _KEY_EXCHANGE.items():
+        if rest.startswith(prefix + "-"):
+            key_exchange, rest = name, rest[len(prefix) + 1:]
+            break
+    match = _BLOCK_CIPHER.fullmatch(rest)
+    if match is not None:
+        algorithm, bits, mode, mac = match.groups()
+        mode = {"CCM8": "CCM_8", None: "CBC"}.get(mode, mode)
+        cipher = f"{algorithm}_{bits}_{mode}" + (f"_{mac}" if mac else "")
+    elif rest in _OTHER_CIPHERS:
+        cipher = _OTHER_CIPHERS[rest]
+    else:
+        return openssl_name
+    return f"TLS_{key_exchange}_WITH_{cipher}"
+
+
+def _context(version: ssl.TLSVersion | None, ciphers: str | None) -> ssl.SSLContext | None:
+    """Client context pinned to ``version`` or offering only ``ciphers``; None if OpenSSL can't."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE  # inspect whatever is served
+    try:
+        # Security level 0 so legacy versions and suites can be offered at all
+        context.set_ciphers((ciphers or "ALL:COMPLEMENTOFDEFAULT") + ":@SECLEVEL=0")
+        if version is not None:
+            context.minimum_version = context.maximum_version = version
+        else:
+            context.minimum_version = ssl.TLSVersion.TLSv1
+            context.maximum_version = ssl.TLSVersion.TLSv1_2
+    except (ssl.SSLError, ValueError):
+        return None
+    return context
+
+
+async def _handshake(
+    address: tuple[Any, ...], family: int, host: str, context: ssl.SSLContext
+) -> tuple[str, bytes | None]:
+    """(OpenSSL suite name, leaf DER) of a completed handshake; raises OSError otherwise."""
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.wait_for(asyncio.get_running_loop().sock_connect(sock, address), HANDSHAKE_TIMEOUT)
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(sock=sock, ssl=context, server_hostname=host),
+            HANDSHAKE_TIMEOUT,
+        )
+    except BaseException:
+        sock.close()
+        raise
+    try:
+        ssl_object = writer.get_extra_info("ssl_object")
+        return ssl_object.cipher()[0], ssl_object.getpeercert(binary_form=True)
+    finally:
+        writer.close()
+
+
+def _certificate(der: bytes | None) -> dict[str, Any]:
+    certificate: dict[str, Any] = {"issuer": "", "expiry": "", "san": []}
+    if der is None or x509 is None:
+        return certificate
+    try:
+        cert = x509.load_der_x509_certificate(der)
+        certificate["issuer"] = cert.issuer.rfc4514_string()
+        certificate["expiry"] = cert.not_valid_after_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        certificate["san"] = san.get_values_for_type(x509.DNSName)
+    except (ValueError, x509.ExtensionNotFound):
+        pass
+    return certificate
+
+
+async def scan(host: str, port: int = 443) -> dict[str, Any]:
+    """Protocols, seen cipher suites and leaf certificate of ``host:port`` (sslyze_parser shape)."""
+    result: dict[str, Any] = {
+        "protocols": [],
+        "cipher_suites": [],
+        "certificate": {"issuer": "", "expiry": "", "san": []},
+    }
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError) as e:
+        result["_error"] = f"Could not resolve {host}: {e}"
+        return result
+    family, _, _, _, address = infos[0]  # every probe hits the same address
+
+    probes: list[tuple[str, ssl.SSLContext]] = []
+    for name, version in PROTOCOL_VERSIONS:
+        context = _context(version, None)
+        if context is not None:
+            probes.append((name, context))
+    for name, ciphers in WEAK_CIPHER_PROBES.items():
+        context = _context(None, ciphers)
+        if context is not None:
+            probes.append((name, context))
+
+    outcomes = await asyncio.gather(
+        *(_handshake(address, family, host, context) for _, context in probes),
+        return_exceptions=True,
+    )
+    leaf = None
+    errors: list[str] = []
+    for (name, _), outcome in zip(probes, outcomes):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, (OSError, asyncio.TimeoutError)):
+                raise outcome
+            errors.append(f"{name}: {outcome or 'timed out'}")
+            continue
+        suite, der = outcome
+        if name.startswith("TLSv"):
+            result["protocols"].append(name)
+            leaf = der or leaf  # the highest accepted version's certificate
+        suite = iana_name(suite)
+        if suite not in result["cipher_suites"]:
+            result["cipher_suites"].append(suite)
+
+    if not result["protocols"]:
+        # Nothing negotiated: unreachable, not TLS, or every version refused
+        result["_error"] = "; ".join(errors)[:500]
+    result["certificate"] = _certificate(leaf)
+    return result
@@ -0,0 +1,194 @@
+"""Asyncio port-43 WHOIS client with referral caching and per-server throttling.
+
+A lookup asks IANA which registry serves the TLD (cached for a week), queries
+that registry, and follows a "Registrar WHOIS Server" referral when the
+registry is thin (.com/.net). The registrar a domain was referred to is
+cached together with the registry's record, so a rescan within REFERRAL_TTL
+goes straight to the registrar and leaves the registry alone while still
+returning both records.
+
+Every server gets its own limiter: at most SERVER_CONCURRENCY open queries
+and one query start per SERVER_INTERVAL seconds, so a batch sweep queues here
+instead of being throttled (or banned) by the registries.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+IANA_SERVER = "whois.iana.org"
+WHOIS_PORT = 43
+QUERY_TIMEOUT = 15  # seconds per server round trip
+MAX_RESPONSE = 256 * 1024  # bytes read from one server
+SERVER_CONCURRENCY = int(os.environ.get("WHOIS_SERVER_CONCURRENCY", "2"))
+SERVER_INTERVAL = float(os.environ.get("WHOIS_SERVER_INTERVAL", "0.5"))  # seconds between query starts
+TLD_TTL = 7 * 24 * 60 * 60  # seconds a TLD -> registry answer is reused
+REFERRAL_TTL = 24 * 60 * 60  # seconds a domain -> (registrar, registry record) entry is reused
+REFERRAL_MAX_ENTRIES = 4096
+
+# Servers that need more than the bare domain to return a single record
+QUERY_FORMATS = {
+    "whois.verisign-grs.com": "domain {}",
+    "whois.denic.de": "-T dn,ace {}",
+    "whois.jprs.jp": "{}/e",
+}
+
+# Lines that point at the next server: IANA's "refer:", thin registries'
+# "Registrar WHOIS Server:", ARIN-style "ReferralServer:"
+REFERRAL_FIELDS = ("refer:", "whois:", "registrar whois server:", "referralserver:")
+
+
+class WhoisError(Exception):
+    """No server could be reached or none answered for the domain."""
+
+
+class _ServerLimiter:
+    """Bounds open queries and spaces query starts for one WHOIS server."""
+
+    def __init__(self) -> None:
+        self._slots = asyncio.Semaphore(SERVER_CONCURRENCY)
+        self._next_start = 0.0
+
+    async def __aenter__(self) -> None:
+        await self._slots.acquire()
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + SERVER_INTERVAL
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def __aexit__(self, *exc: object) -> None:
+        self._slots.release()
+
+
+_limiters: dict[str, _ServerLimiter] = {}
+_tld_servers: dict[str, tuple[float, str]] = {}  # tld -> (expires_at, server or "")
+# domain -> (expires_at, registrar server, registry record text)
+_referrals: OrderedDict[str, tuple[float, str, str]] = OrderedDict()
+
+
+def _extract_referral(text: str) -> str:
+    """Return the host of the first referral line in ``text``, or ""."""
+    for line in text.splitlines():
+        lowered = line.strip().lower()
+        for field in REFERRAL_FIELDS:
+            if lowered.startswith(field):
+                value = line.split(":", 1)[1].strip()
+                # "whois://host:43" or "rwhois://..." -> host
+                host = value.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0]
+                if host:
+                    return host.lower().rstrip(".")
+    return ""
+
+
+async def query(server: str, request: str) -> str:
+    """Send one port-43 query to ``server`` and return the decoded response."""
+    limiter = _limiters.get(server)
+    if limiter is None:
+        limiter = _limiters[server] = _ServerLimiter()
+
+    async with limiter:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(server, WHOIS_PORT), timeout=QUERY_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise WhoisError(f"cannot reach {server}: {e or 'timed out'}") from e
+        try:
+            writer.write(request.encode() + b"\r\n")
+            await writer.drain()
+            # The server closes the connection after the record
+            data = b""
+            while len(data) < MAX_RESPONSE:
+                chunk = await asyncio.wait_for(
+                    reader.read(MAX_RESPONSE - len(data)), timeout=QUERY_TIMEOUT
+                )
+                if not chunk:
+                    break
+                data += chunk
+        except (OSError, asyncio.TimeoutError) as e:
+            raise WhoisError(f"{server} query failed: {e or 'timed out'}") from e
+        finally:
+            writer.close()
+
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _format(server: str, domain: str) -> str:
+    return QUERY_FORMATS.get(server, "{}").format(domain)
+
+
+async def _registry_for(tld: str) -> str:
+    now = time.monotonic()
+    cached = _tld_servers.get(tld)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    server = _extract_referral(await query(IANA_SERVER, tld))
+    _tld_servers[tld] = (now + TLD_TTL, server)
+    return server
+
+
+def _cached_referral(domain: str) -> tuple[str, str]:
+    """(registrar server, registry record) remembered for ``domain``, or ("", "")."""
+    entry = _referrals.get(domain)
+    if entry is None:
+        return "", ""
+    if entry[0] <= time.monotonic():
+        del _referrals[domain]
+        return "", ""
+    _referrals.move_to_end(domain)
+    return entry[1], entry[2]
+
+
+def _remember_referral(domain: str, server: str, registry_text: str) -> None:
+    _referrals[domain] = (time.monotonic() + REFERRAL_TTL, server, registry_text)
+    _referrals.move_to_end(domain)
+    while len(_referrals) > REFERRAL_MAX_ENTRIES:
+        _referrals.popitem(last=False)
+
+
+async def lookup(domain: str) -> str:
+    """Return WHOIS text for ``domain``: registry, then registrar when referred.
+
+    The output has the same layout as the ``whois`` CLI (registry record
+    first), so the existing parser applies unchanged; on a cached referral
+    the registry record is the cached one.
+    """
+    domain = domain.strip().lower().rstrip(".")
+    try:
+        domain = domain.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass  # let the server reject it
+
+    registrar, registry_text = _cached_referral(domain)
+    if registrar:
+        try:
+            return registry_text + "\n" + await query(registrar, _format(registrar, domain))
+        except WhoisError:
+            _referrals.pop(domain, None)  # go through the registry again
+
+    registry = await _registry_for(domain.rsplit(".", 1)[-1])
+    if not registry:
+        raise WhoisError(f"no WHOIS server known for {domain}")
+    text = await query(registry, _format(registry, domain))
+
+    referral = _extract_referral(text)
+    if not referral or referral == registry:
+        return text
+    try:
+        referred = await query(referral, _format(referral, domain))
+    except WhoisError:
+        return text  # the registry record alone is still a result
+    _remember_referral(domain, referral, text)
+    return text + "\n" + referred
+
+
+def reset() -> None:
+    """Forget cached servers and limiters (they are bound to the running loop)."""
+    _limiters.clear()
+    _tld_servers.clear()
+    _referrals.clear()
@@ -0,0 +1,164 @@
+"""Warm worker-process pool for tools that can run in-process.
+
+A parser module opts in by defining ``run_in_process(target)``, which runs
+inside a worker and returns the already-parsed section, and ``WARM_IMPORTS``,
+the packages it needs. Each worker imports the opted-in parser modules once at
+startup and calls their optional ``warm_up()`` hook, so package imports and
+rule databases are loaded once per worker rather than once per scan. Tools
+without those hooks (or with INPROCESS_TOOLS=0) keep using subprocesses.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+INPROCESS_ENABLED = os.environ.get("INPROCESS_TOOLS", "1") != "0"
+# Fewer than the worker-backed tools' combined TOOL_CONCURRENCY on purpose:
+# each worker holds sslyze, wafw00f and webtech in memory, and the jobs are
+# CPU-bound, so on a small instance extra workers cost memory without adding
+# throughput. Jobs queue for a worker within their scan's deadline instead.
+WORKER_PROCESSES = int(os.environ.get("TOOL_WORKERS", "2"))
+
+# One single-process executor per worker, so a stuck job can be killed
+# without breaking the jobs running in the other workers
+_executors: list[ProcessPoolExecutor | None] = []
+_idle: list[int] = []  # indexes into _executors not running a job
+_slots: asyncio.Semaphore | None = None
+_slots_loop: asyncio.AbstractEventLoop | None = None
+_warm_modules: tuple[str, ...] = ()
+
+
+def _warm(modules: tuple[str, ...]) -> None:
+    """Worker initializer: import parser modules and load their engines once."""
+    for name in modules:
+        try:
+            module = importlib.import_module(name)
+            warm_up = getattr(module, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+        except Exception:
+            pass
+
+
+def _noop() -> None:
+    return None
+
+
+def supports(module: Any) -> bool:
+    """True if ``module`` can run in the pool and its packages are installed."""
+    if not INPROCESS_ENABLED or not hasattr(module, "run_in_process"):
+        return False
+    return all(importlib.util.find_spec(m) is not None for m in getattr(module, "WARM_IMPORTS", ()))
+
+
+def _ensure_workers() -> None:
+    if not _executors:
+        _executors.extend([None] * WORKER_PROCESSES)
+        _idle.extend(range(WORKER_PROCESSES))
+
+
+def _executor(index: int) -> ProcessPoolExecutor:
+    executor = _executors[index]
+    if executor is None:
+        executor = _executors[index] = ProcessPoolExecutor(
+            max_workers=1,
+            # spawn, not fork: the parent has a running event loop and threads
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm,
+            initargs=(_warm_modules,),
+        )
+    return executor
+
+
+def _kill(index: int) -> None:
+    """Kill one worker (stuck past its deadline or crashed); it is restarted lazily."""
+    executor, _executors[index] = _executors[index], None
+    if executor is None:
+        return
+    for proc in list(getattr(executor, "_processes", {}).values()):
+        try:
+            proc.kill()
+        except Exception:
+            pass
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(WORKER_PROCESSES)
+        _slots_loop = loop
+    return _slots
+
+
+def start(modules: list[Any]) -> None:
+    """Create the workers and pre-start each so the first scan is warm."""
+    global _warm_modules
+    _warm_modules = tuple(m.__name__ for m in modules if supports(m))
+    if not _warm_modules:
+        return
+    _ensure_workers()
+    for index in range(WORKER_PROCESSES):
+        _executor(index).submit(_noop)
+
+
+def reset() -> None:
+    """Kill every worker; they are restarted lazily."""
+    for index in range(len(_executors)):
+        _kill(index)
+
+
+def shutdown() -> None:
+    for index, executor in enumerate(_executors):
+        _executors[index] = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run(func: Callable[..., Any], target: str, deadline: float, *args: Any) -> Any:
+    """Run ``func(target, *args)`` in a warm worker; raises asyncio.TimeoutError past ``deadline``.
+
+    ``deadline`` is a time.monotonic() value, so waiting for an idle worker
+    (one job per worker at a time) and the run share it. A job past the
+    deadline cannot be interrupted: only its worker is killed and replaced.
+    A caller that is cancelled leaves the job to finish, and its worker busy
+    until then.
+    """
+    _ensure_workers()
+    slots = _get_slots()
+    await asyncio.wait_for(slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+    index = _idle.pop()
+    freed = False
+
+    def free(future: asyncio.Future | None = None) -> None:
+        nonlocal freed
+        if future is not None and not future.cancelled():
+            future.exception()  # retrieved even when the caller gave up
+        if not freed:
+            freed = True
+            _idle.append(index)
+            slots.release()
+
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        free()
+        raise asyncio.TimeoutError
+    try:
+        future = asyncio.get_running_loop().run_in_executor(_executor(index), func, target, *args)
+    except BaseException:
+        free()
+        raise
+    future.add_done_callback(free)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        _kill(index)
+        free()
+        raise